@@ -1,24 +1,48 @@
+from src.perfil import iniciar_perfil, etapa, medir_import, importar_tardio, relatorio_perfil, etapas_atuais
+
+iniciar_perfil()
+
+# streamlit e pandas já foram importados pelo próprio Streamlit antes do
+# script rodar: medir aqui daria ~0 ms. O custo real deles é medido em
+# processo novo por benchmarks/bench_cold_start.py
 import streamlit as st
-import streamlit.components.v1 as components
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime, timedelta
 
-from src.layout import (themed_css, pagina_inicial)
-from src.data_loader import load_csv
-from src.preprocessing import preprocess
-from src.analytics import (
-    gasto_mensal,
-    gasto_semestral,
-    gasto_anual,
-    gasto_por_categoria,
-    categorizar_transacao,
-    calcular_metricas_avancadas,
-    identificar_gastos_recorrentes,
-    analisar_tendencias
-)
+# Plotly só é importado quando uma aba monta o primeiro gráfico
+px = importar_tardio('plotly.express')
+go = importar_tardio('plotly.graph_objects')
+
+with medir_import('src (módulos do app)'):
+    from src.layout import (themed_css, pagina_inicial)
+    from src.pipeline import processar_extrato
+    from src.cache import cache_padrao, comerciantes_padrao
+    from src.calendario import COLUNAS_TRANSACAO, atributo_calendario
+    from src.regras_usuario import IndiceTokens, recategorizar, regras_padrao
+    from src.classificador import ClassificadorNB, reclassificar_outros
+    from src.cubo import montar_cubo, entradas_mensais, detalhe_categorias, serie_poupanca
+    from src.metricas import nucleo_metricas
+    from src.indice_temporal import IndiceTemporal, ordenar_por_data
+    from src.anomalias import MotorAnomalias
+    from src.previsao import HORIZONTE_MAXIMO, mes_incompleto, prever_mensal, series_mensais
+    from src.analytics import (
+        gasto_mensal,
+        gasto_semestral,
+        gasto_anual,
+        gasto_por_categoria,
+        calcular_metricas_avancadas,
+        identificar_gastos_recorrentes,
+        analisar_tendencias,
+        serie_saude_financeira
+    )
+
+
+# A série sai só do cubo (poucas linhas por mês): guardada por (cubo,
+# janela). O hash do Streamlit ignora `attrs`, então a escala entra na chave
+@st.cache_data(show_spinner=False, max_entries=32)
+def serie_saude_cacheada(cubo, janela, escala):
+    return serie_saude_financeira(None, janela=janela, cubo=cubo)
+
 
 # Configuração da página
 config_app = st.set_page_config(
@@ -33,6 +57,8 @@ st.markdown(themed_css(), unsafe_allow_html=True)
 # Inicializar session state
 if 'dados_carregados' not in st.session_state:
     st.session_state.dados_carregados = False
+if 'regras' not in st.session_state:
+    st.session_state.regras = regras_padrao()
 
 # Mostrar logo e upload apenas se dados não foram carregados
 if not st.session_state.dados_carregados:
@@ -60,15 +86,36 @@ else:
 if arquivo and not st.session_state.dados_carregados:
     # Carregamento e processamento
     with st.spinner("🔄 Processando extrato..."):
-        df = load_csv(arquivo)
-        df = preprocess(df)
-        
-        # Aplicar categorização automática
-        df['categoria'] = df['descricao'].apply(categorizar_transacao)
+        # Leitura, limpeza e categorização automática (em blocos para
+        # extratos grandes)
+        df = processar_extrato(arquivo, cache=cache_padrao(), comerciantes=comerciantes_padrao())
+
+        # O que as palavras-chave deixaram em 'Outros' passa pelo
+        # classificador treinado com as transações que elas rotularam neste
+        # extrato (o modelo fica só na sessão)
+        with etapa('classificador (Outros)'):
+            classificador = ClassificadorNB.treinar(df['descricao'], df['categoria'])
+            categorias, reclassificadas = reclassificar_outros(df['descricao'], df['categoria'], classificador)
+            df['categoria'] = categorias.astype('category')
+
+        # Regras criadas pelo usuário têm precedência sobre as automáticas
+        if len(st.session_state.regras):
+            with etapa('regras do usuário'):
+                df['categoria'] = st.session_state.regras.categorizar(df['descricao'], df['categoria']).astype('category')
         
-        # Salvar no session state
+        # Salvar no session state (as etapas do processamento vão junto,
+        # porque o perfil é zerado no rerun)
+        st.session_state.etapas_carga = etapas_atuais()
         st.session_state.df = df
+        st.session_state.erros_conversao = df.attrs.get('erros_conversao')
+        st.session_state.leitura = df.attrs.get('leitura')
+        st.session_state.origem_cache = df.attrs.get('cache')
+        st.session_state.categorizacao = df.attrs.get('categorizacao')
+        st.session_state.classificador = classificador
+        st.session_state.reclassificadas = reclassificadas
         st.session_state.arquivo = arquivo
+        st.session_state.indice_tokens = None
+        st.session_state.indice_temporal = None
         st.session_state.dados_carregados = True
         st.rerun()
 
@@ -90,6 +137,43 @@ if st.session_state.dados_carregados:
         st.rerun()
     
     st.sidebar.markdown("---")
+
+    leitura = st.session_state.get('leitura')
+    if leitura:
+        st.sidebar.caption(
+            f"Extrato lido com engine **{leitura['engine']}** "
+            f"em {leitura['tempo_s'] * 1000:.0f} ms"
+        )
+    if st.session_state.get('origem_cache') == 'completo':
+        st.sidebar.caption("Extrato já processado antes — carregado do cache local")
+    categorizacao = st.session_state.get('categorizacao')
+    if categorizacao and categorizacao['linhas']:
+        # Descrições que não precisaram passar pelas regras (memo ou disco)
+        conhecidas = categorizacao['acertos_memo'] + categorizacao.get('acertos_disco', 0)
+        taxa_acerto = conhecidas / max(categorizacao['unicas'], 1)
+        st.sidebar.caption(
+            f"Categorização: {categorizacao['unicas']} descrições únicas em "
+            f"{categorizacao['linhas']} transações "
+            f"({categorizacao['unicas'] / categorizacao['linhas']:.0%}), "
+            f"{taxa_acerto:.0%} já conhecidas"
+        )
+    if st.session_state.get('reclassificadas'):
+        st.sidebar.caption(
+            f"Classificador: {st.session_state.reclassificadas} transações tiradas de 'Outros'"
+        )
+    comerciantes = comerciantes_padrao()
+    if comerciantes is not None and comerciantes.acertos + comerciantes.faltas:
+        estatisticas = comerciantes.estatisticas()
+        st.sidebar.caption(
+            f"Cache de comerciantes: {estatisticas['acertos']} acertos, "
+            f"{estatisticas['faltas']} faltas ({estatisticas['taxa_acerto']:.0%})"
+        )
+
+    # Valores monetários que não puderam ser convertidos no preprocess
+    erros_conversao = st.session_state.get('erros_conversao')
+    if erros_conversao:
+        with st.sidebar.expander(f"⚠️ {len(erros_conversao)} valores não convertidos"):
+            st.dataframe(pd.DataFrame(erros_conversao), use_container_width=True)
     
     # Filtro de data no formato brasileiro
     data_min = df['data'].min().date()
@@ -117,21 +201,34 @@ if st.session_state.dados_carregados:
             format="DD/MM/YYYY"
         )
     
+    # Índice por data (somas de prefixo): o período vira uma fatia por
+    # searchsorted, sem varrer o extrato a cada mudança de data. Refeito
+    # quando as categorias mudam (regras do usuário)
+    if st.session_state.get('indice_temporal') is None:
+        with etapa('índice temporal'):
+            df = st.session_state.df = ordenar_por_data(df)
+            st.session_state.indice_temporal = IndiceTemporal(df)
+            st.session_state.indice_tokens = None
+            st.session_state.anomalias = None
+    indice = st.session_state.indice_temporal
+
     # Filtrar dados pelo período
-    df_filtrado = df[(df['data'] >= pd.Timestamp(data_inicio)) & 
-                     (df['data'] <= pd.Timestamp(data_fim))]
+    inicio_periodo, fim_periodo = pd.Timestamp(data_inicio), pd.Timestamp(data_fim)
+    posicao_inicio, posicao_fim = indice.fatia(inicio_periodo, fim_periodo)
+    df_filtrado = df.iloc[posicao_inicio:posicao_fim]
     
     st.sidebar.markdown("---")
     
     # Filtro de categoria
-    categorias_unicas = sorted(df_filtrado['categoria'].unique())
+    categorias_unicas = sorted(indice.somas_por_categoria(inicio_periodo, fim_periodo).index)
     categorias_selecionadas = st.sidebar.multiselect(
         "Categorias",
         options=categorias_unicas,
         default=categorias_unicas
     )
     
-    if categorias_selecionadas:
+    filtro_categoria = 0 < len(categorias_selecionadas) < len(categorias_unicas)
+    if filtro_categoria:
         df_filtrado = df_filtrado[df_filtrado['categoria'].isin(categorias_selecionadas)]
     
     st.sidebar.markdown("---")
@@ -148,8 +245,20 @@ if st.session_state.dados_carregados:
     elif tipo_transacao == "Apenas Entradas":
         df_filtrado = df_filtrado[df_filtrado['valor'] > 0]
     
-    # Métricas avançadas
-    metricas = calcular_metricas_avancadas(df_filtrado)
+    # Métricas avançadas: todos os KPIs numa passada; os cards, os insights
+    # e o simulador leem do mesmo núcleo. Filtrando só por período, ele sai
+    # direto das somas de prefixo do índice
+    with etapa('métricas avançadas'):
+        if filtro_categoria or tipo_transacao != "Todas":
+            nucleo = nucleo_metricas(df_filtrado)
+        else:
+            nucleo = indice.nucleo(inicio_periodo, fim_periodo)
+        metricas = calcular_metricas_avancadas(df_filtrado, nucleo=nucleo)
+
+    # Somas por (ano, mês, categoria) numa passada; os gráficos mensais e por
+    # categoria das abas saem dele
+    with etapa('cubo de agregação'):
+        cubo = montar_cubo(df_filtrado)
     
     # Abas de análise
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -161,7 +270,7 @@ if st.session_state.dados_carregados:
         "Detalhes"
     ])
     
-    with tab1:
+    with tab1, etapa('aba Início'):
         st.subheader("Visão Geral das Finanças")
 
         col1, col2, col3, col4 = st.columns(4)
@@ -193,7 +302,7 @@ if st.session_state.dados_carregados:
         with col4:
             st.metric(
                 "Transações",
-                f"{len(df_filtrado)}",
+                f"{nucleo['transacoes']}",
                 delta=f"Média: R$ {metricas['ticket_medio']:.2f}"
             )
         
@@ -229,15 +338,15 @@ if st.session_state.dados_carregados:
         col_f1, col_f2, col_f3 = st.columns(3)
 
         with col_f1:
-            st.info(f"📅 **Período analisado:** {(df_filtrado['data'].max() - df_filtrado['data'].min()).days} dias")
+            st.info(f"📅 **Período analisado:** {nucleo['dias_analisados']} dias")
 
         with col_f2:
-            st.info(f"🔢 **Total de transações:** {len(df_filtrado)}")
+            st.info(f"🔢 **Total de transações:** {nucleo['transacoes']}")
 
         with col_f3:
-            st.info(f"📊 **Categorias identificadas:** {df_filtrado['categoria'].nunique()}")
+            st.info(f"📊 **Categorias identificadas:** {nucleo['categorias_presentes']}")
 
-    with tab2:
+    with tab2, etapa('aba Tendências'):
         st.subheader("Análise de Tendências Temporais")
         
         col_t1, col_t2 = st.columns(2)
@@ -245,7 +354,7 @@ if st.session_state.dados_carregados:
         with col_t1:
             # Gasto mensal
             st.markdown("**Evolução Mensal de Gastos**")
-            mensal = gasto_mensal(df_filtrado)
+            mensal = gasto_mensal(df_filtrado, cubo=cubo)
             
             fig_mensal = px.line(
                 mensal,
@@ -277,17 +386,9 @@ if st.session_state.dados_carregados:
             # Comparação Entradas vs Gastos
             st.markdown("**Entradas vs Gastos Mensais**")
             
-            entradas_mensais = (
-                df_filtrado[df_filtrado['valor'] > 0]
-                .groupby('mes_ano')['valor']
-                .sum()
-                .reset_index()
-                .rename(columns={'valor': 'Entradas'})
-            )
-            
             gastos_mensais = mensal.rename(columns={'valor': 'Gastos'})
             
-            comparacao = pd.merge(entradas_mensais, gastos_mensais, on='mes_ano', how='outer').fillna(0)
+            comparacao = pd.merge(entradas_mensais(cubo), gastos_mensais, on='mes_ano', how='outer').fillna({'Entradas': 0, 'Gastos': 0})
             
             fig_comp = go.Figure()
             fig_comp.add_trace(go.Bar(
@@ -318,10 +419,9 @@ if st.session_state.dados_carregados:
         
         # Gráfico de linha do tempo com saldo
         st.markdown("**Evolução do Saldo ao Longo do Tempo**")
-        df_timeline = df_filtrado.sort_values('data').copy()
-        
+        # O extrato já está em ordem cronológica (inclusive dentro do dia)
         fig_saldo = px.line(
-            df_timeline,
+            df_filtrado,
             x='data',
             y='saldo',
             labels={'data': 'Data', 'saldo': 'Saldo (R$)'}
@@ -338,8 +438,90 @@ if st.session_state.dados_carregados:
             yaxis=dict(gridcolor='#333')
         )
         st.plotly_chart(fig_saldo, use_container_width=True)
+
+        # Projeção dos próximos meses (Holt-Winters ajustado por série; os
+        # parâmetros ficam em cache enquanto os dados da série não mudam)
+        st.markdown("**Previsão dos Próximos Meses**")
+
+        col_p1, col_p2 = st.columns([1, 2])
+        with col_p1:
+            horizonte = st.slider("Meses à frente", min_value=3, max_value=HORIZONTE_MAXIMO, value=6, key='horizonte_previsao')
+        previsao = prever_mensal(df_filtrado, horizonte, cubo=cubo)
+
+        if previsao.empty:
+            st.info("Histórico curto demais para projetar: são precisos pelo menos 3 meses completos.")
+        else:
+            nomes_series = {
+                (tipo, serie): f"{'Gastos' if tipo == 'gastos' else 'Entradas'} — {serie}"
+                for tipo, serie in previsao[['tipo', 'serie']].drop_duplicates().itertuples(index=False)
+            }
+            with col_p2:
+                serie_escolhida = st.selectbox(
+                    "Série", options=list(nomes_series), format_func=nomes_series.get, key='serie_previsao'
+                )
+            historico = series_mensais(cubo).loc[serie_escolhida]
+            # Mês em andamento: fica fora do ajuste e do "Realizado", e aparece
+            # à parte, sobre o previsto do mesmo mês
+            parcial = mes_incompleto(df_filtrado)
+            realizado = historico[historico.index != parcial]
+            projecao = previsao[(previsao['tipo'] == serie_escolhida[0]) & (previsao['serie'] == serie_escolhida[1])]
+            cor = '#FF6B6B' if serie_escolhida[0] == 'gastos' else '#51CF66'
+
+            fig_prev = go.Figure()
+            fig_prev.add_trace(go.Scatter(
+                x=list(projecao['mes_ano']) + list(projecao['mes_ano'])[::-1],
+                y=list(projecao['superior']) + list(projecao['inferior'])[::-1],
+                fill='toself',
+                fillcolor='rgba(77, 171, 247, 0.2)',
+                line=dict(color='rgba(0, 0, 0, 0)'),
+                hoverinfo='skip',
+                name='Intervalo de 80%'
+            ))
+            fig_prev.add_trace(go.Scatter(
+                x=realizado.index,
+                y=realizado.values,
+                mode='lines+markers',
+                name='Realizado',
+                line=dict(color=cor, width=2)
+            ))
+            if parcial in historico.index:
+                fig_prev.add_trace(go.Scatter(
+                    x=[parcial],
+                    y=[historico[parcial]],
+                    mode='markers',
+                    name=f"Parcial (até {df_filtrado['data'].max():%d/%m})",
+                    marker=dict(color=cor, size=10, symbol='circle-open', line=dict(width=2))
+                ))
+            fig_prev.add_trace(go.Scatter(
+                x=projecao['mes_ano'],
+                y=projecao['previsto'],
+                mode='lines+markers',
+                name='Previsto',
+                line=dict(color='#4DABF7', width=2, dash='dash')
+            ))
+            fig_prev.update_layout(
+                hovermode='x unified',
+                plot_bgcolor='#0E1117',
+                paper_bgcolor='#0E1117',
+                font=dict(color='#ffffff'),
+                height=350,
+                yaxis_title="Valor (R$)",
+                legend=dict(orientation="h", yanchor="bottom", y=1.02),
+                # Eixo em ordem de mês (a faixa do intervalo, desenhada antes,
+                # traria os meses projetados para o começo)
+                xaxis=dict(
+                    gridcolor='#333', type='category', categoryorder='array',
+                    categoryarray=list(realizado.index) + list(projecao['mes_ano']),
+                ),
+                yaxis=dict(gridcolor='#333')
+            )
+            st.plotly_chart(fig_prev, use_container_width=True)
+            st.caption(
+                f"Próximo mês: R$ {projecao['previsto'].iloc[0]:,.2f} "
+                f"(entre R$ {projecao['inferior'].iloc[0]:,.2f} e R$ {projecao['superior'].iloc[0]:,.2f})"
+            )
     
-    with tab3:
+    with tab3, etapa('aba Categorias'):
         st.subheader("Análise por Categorias")
         
         col_c1, col_c2 = st.columns([1, 1])
@@ -347,8 +529,7 @@ if st.session_state.dados_carregados:
         with col_c1:
             # Gráfico de pizza
             st.markdown("**Distribuição de Gastos**")
-            categorias = gasto_por_categoria(df_filtrado)
-            categorias['valor'] = categorias['valor'].abs()
+            categorias = gasto_por_categoria(df_filtrado, cubo=cubo)
             
             fig_pizza = px.pie(
                 categorias,
@@ -401,17 +582,7 @@ if st.session_state.dados_carregados:
             # Tabela detalhada por categoria
         st.markdown("**Detalhamento por Categoria**")
         
-        df_cat_detalhado = (
-            df_filtrado[df_filtrado['valor'] < 0]
-            .groupby('categoria')
-            .agg({
-                'valor': ['sum', 'count', 'mean'],
-            })
-            .round(2)
-        )
-        df_cat_detalhado.columns = ['Total Gasto', 'Nº Transações', 'Ticket Médio']
-        df_cat_detalhado['Total Gasto'] = df_cat_detalhado['Total Gasto'].abs()
-        df_cat_detalhado['Ticket Médio'] = df_cat_detalhado['Ticket Médio'].abs()
+        df_cat_detalhado = detalhe_categorias(cubo)
         df_cat_detalhado['% do Total'] = (df_cat_detalhado['Total Gasto'] / df_cat_detalhado['Total Gasto'].sum() * 100).round(1)
         df_cat_detalhado = df_cat_detalhado.sort_values('Total Gasto', ascending=False)
         
@@ -425,7 +596,60 @@ if st.session_state.dados_carregados:
             use_container_width=True
         )
 
-    with tab4:
+        # Regras do usuário: só as transações que a regra pode afetar são
+        # recategorizadas (achadas pelo índice de palavras)
+        regras = st.session_state.regras
+
+        def aplicar_alteracao(*textos):
+            if st.session_state.get('indice_tokens') is None:
+                st.session_state.indice_tokens = IndiceTokens(df['descricao'])
+            alteradas = recategorizar(
+                df, regras, st.session_state.indice_tokens, textos,
+                classificador=st.session_state.get('classificador'),
+            )
+            if len(alteradas):
+                st.session_state.indice_temporal = None
+            st.session_state.aviso_regras = f"{len(alteradas)} transações recategorizadas"
+            st.rerun()
+
+        with st.expander("✏️ Regras de categorização"):
+            if st.session_state.get('aviso_regras'):
+                st.success(st.session_state.pop('aviso_regras'))
+
+            with st.form('nova_regra', clear_on_submit=True):
+                col_r1, col_r2, col_r3, col_r4 = st.columns([3, 2, 1, 1])
+                texto_regra = col_r1.text_input("Texto na descrição")
+                categoria_regra = col_r2.text_input("Categoria")
+                prioridade_regra = col_r3.number_input("Prioridade", value=0, step=1)
+                descricao_exata = col_r4.checkbox("Descrição exata")
+                if st.form_submit_button("Adicionar regra"):
+                    try:
+                        regra = regras.adicionar(
+                            texto_regra, categoria_regra, prioridade_regra,
+                            tipo='descricao' if descricao_exata else 'palavra'
+                        )
+                    except ValueError as erro:
+                        st.error(str(erro))
+                    else:
+                        aplicar_alteracao(regra['texto'])
+
+            for regra in sorted(regras.regras, key=lambda r: (-r['prioridade'], -r['id'])):
+                col_r1, col_r2 = st.columns([5, 1])
+                tipo = "descrição exata" if regra['tipo'] == 'descricao' else "contém"
+                col_r1.markdown(
+                    f"**{regra['texto']}** ({tipo}) → {regra['categoria']} · prioridade {regra['prioridade']}"
+                )
+                if col_r2.button("Remover", key=f"remover_regra_{regra['id']}"):
+                    try:
+                        removida = regras.remover(regra['id'])
+                    except KeyError:
+                        # Já removida em outra sessão; a lista foi relida e
+                        # as regras alteradas por lá são aplicadas
+                        aplicar_alteracao()
+                    else:
+                        aplicar_alteracao(removida['texto'])
+
+    with tab4, etapa('aba Recorrências'):
         st.subheader("Gastos Recorrentes e Padrões")
         
         recorrentes = identificar_gastos_recorrentes(df_filtrado)
@@ -463,17 +687,28 @@ if st.session_state.dados_carregados:
             # Tabela detalhada
             st.markdown("**Detalhes dos Gastos Recorrentes**")
             recorrentes_display = recorrentes.copy()
-            recorrentes_display['categoria'] = recorrentes_display['descricao'].apply(categorizar_transacao)
+            # Categoria da última cobrança, já com as regras do usuário e o classificador
+            recorrentes_display['categoria'] = df_filtrado['categoria'].iloc[recorrentes_display['linha']].to_numpy()
+            # Próxima cobrança só para as que continuam ativas no fim do extrato
+            recorrentes_display['proxima_data'] = recorrentes_display['proxima_data'].where(recorrentes_display['ativa'])
             
             st.dataframe(
-                recorrentes_display[['descricao', 'categoria', 'frequencia', 'valor_medio', 'total_gasto']]
+                recorrentes_display[['descricao', 'categoria', 'periodicidade', 'frequencia', 'valor_medio', 'total_gasto', 'proxima_data']]
                 .style.format({
                     'frequencia': '{:.0f}x',
                     'valor_medio': 'R$ {:,.2f}',
-                    'total_gasto': 'R$ {:,.2f}'
+                    'total_gasto': 'R$ {:,.2f}',
+                    'proxima_data': lambda x: x.strftime('%d/%m/%Y') if pd.notna(x) else '—'
                 }),
                 use_container_width=True
             )
+
+            ativas = recorrentes[recorrentes['ativa'] & (recorrentes['periodicidade'] == 'mensal')]
+            if not ativas.empty:
+                st.caption(
+                    f"Recorrências mensais ativas: {len(ativas)}, somando "
+                    f"R$ {ativas['valor_medio'].sum():,.2f} por mês"
+                )
         else:
             st.info("Nenhum gasto recorrente identificado no período selecionado.")
         
@@ -494,10 +729,29 @@ if st.session_state.dados_carregados:
             use_container_width=True
         )
 
-    with tab5:
+    with tab5, etapa('aba Insights'):
         st.subheader("Insights e Recomendações")
         
-        insights = analisar_tendencias(df_filtrado)
+        insights = analisar_tendencias(df_filtrado, nucleo=nucleo)
+
+        # Anomalias do extrato inteiro (cada gasto contra o histórico do seu
+        # grupo), refeitas junto com o índice temporal; aqui só o recorte
+        if st.session_state.get('anomalias') is None:
+            with etapa('detecção de anomalias'):
+                st.session_state.anomalias = MotorAnomalias(df)
+        anomalias = st.session_state.anomalias
+        gastos_anomalos = anomalias.transacoes[
+            anomalias.transacoes['data'].between(inicio_periodo, fim_periodo)
+        ]
+        meses_anomalos = anomalias.meses[
+            anomalias.meses['mes_ano'].between(inicio_periodo.strftime('%Y-%m'), fim_periodo.strftime('%Y-%m'))
+        ]
+        if filtro_categoria:
+            gastos_anomalos = gastos_anomalos[gastos_anomalos['categoria'].isin(categorias_selecionadas)]
+            meses_anomalos = meses_anomalos[meses_anomalos['categoria'].isin(categorias_selecionadas)]
+        if tipo_transacao == "Apenas Entradas":
+            gastos_anomalos = gastos_anomalos.iloc[:0]
+            meses_anomalos = meses_anomalos.iloc[:0]
         
         # Cards de insights com cores customizáveis
         col_i1, col_i2 = st.columns(2)
@@ -519,24 +773,11 @@ if st.session_state.dados_carregados:
                 </div>""", unsafe_allow_html=True)
             
             # Análise de sazonalidade
-            dias_semana = df_filtrado[df_filtrado['valor'] < 0].copy()
-            dias_semana['dia_semana'] = dias_semana['data'].dt.day_name()
-
-            # Dicionário para tradução dos dias da semana
-            traducao_dias = {
-                'Monday': 'Segunda-feira',
-                'Tuesday': 'Terça-feira',
-                'Wednesday': 'Quarta-feira',
-                'Thursday': 'Quinta-feira',
-                'Friday': 'Sexta-feira',
-                'Saturday': 'Sábado',
-                'Sunday': 'Domingo'
-            }
+            # Dia da semana (já em português) vem da tabela de calendário
+            dias_semana = df_filtrado[df_filtrado['valor'] < 0]
+            nome_dia = atributo_calendario(dias_semana['dia'], 'nome_dia_semana')
 
-            # Traduzir os dias para português
-            dias_semana['dia_semana'] = dias_semana['dia_semana'].map(traducao_dias)
-
-            gastos_por_dia = dias_semana.groupby('dia_semana')['valor'].sum().abs()
+            gastos_por_dia = dias_semana['valor'].groupby(nome_dia, observed=True).sum().abs()
 
             if not gastos_por_dia.empty:
                 dia_mais_gasto = gastos_por_dia.idxmax()
@@ -568,27 +809,20 @@ if st.session_state.dados_carregados:
                     Considere reduzir gastos em <strong>{cat_top['categoria']}</strong> (R$ {cat_top['valor']:.2f})
                 </div>""", unsafe_allow_html=True)
             
-            # Alerta de gastos altos
-            if metricas['maior_gasto'] > metricas['ticket_medio'] * 5:
+            # Alerta de gastos fora do padrão da categoria ou do estabelecimento
+            if not gastos_anomalos.empty:
+                pior = gastos_anomalos.loc[gastos_anomalos['escore'].idxmax()]
                 st.markdown(f"""<div class="custom-alert-warning" style="padding: 20px; border-radius: 12px; border-left: 5px solid #FFC107; margin-bottom: 15px;">
-                    Você teve um gasto muito alto de R$ {metricas['maior_gasto']:.2f}. Revise se foi necessário.
+                    {len(gastos_anomalos)} gasto(s) fora do padrão no período. O mais atípico:
+                    <strong>{pior['descricao']}</strong>, R$ {pior['valor']:.2f}
+                    ({pior['valor'] / pior['mediana']:.1f}x o usual {'do estabelecimento' if pior['referencia'] == 'estabelecimento' else 'em ' + str(pior['categoria'])}).
+                    Revise se foi necessário.
                 </div>""", unsafe_allow_html=True)
         
         # Gráfico de evolução da taxa de poupança
         st.markdown("### Evolução da Taxa de Poupança")
         
-        df_mensal_completo = df_filtrado.groupby('mes_ano').agg({
-            'valor': lambda x: x[x < 0].sum()
-        }).reset_index()
-        df_mensal_completo.columns = ['mes_ano', 'gastos']
-        
-        entradas_mes = df_filtrado[df_filtrado['valor'] > 0].groupby('mes_ano')['valor'].sum().reset_index()
-        entradas_mes.columns = ['mes_ano', 'entradas']
-        
-        df_poupanca = pd.merge(df_mensal_completo, entradas_mes, on='mes_ano', how='left').fillna(0)
-        df_poupanca['gastos'] = df_poupanca['gastos'].abs()
-        df_poupanca['saldo'] = df_poupanca['entradas'] - df_poupanca['gastos']
-        df_poupanca['taxa_poupanca'] = (df_poupanca['saldo'] / df_poupanca['entradas'] * 100).fillna(0)
+        df_poupanca = serie_poupanca(cubo)
         
         fig_poup = go.Figure()
         fig_poup.add_trace(go.Scatter(
@@ -616,6 +850,84 @@ if st.session_state.dados_carregados:
         )
         st.plotly_chart(fig_poup, use_container_width=True)
 
+        # Score de saúde financeira mês a mês ou em janelas móveis
+        st.markdown("### Evolução da Saúde Financeira")
+
+        janela_saude = st.select_slider(
+            "Janela (meses)", options=[1, 3, 6, 12], value=3, key='janela_saude'
+        )
+        df_saude = serie_saude_cacheada(cubo, janela_saude, cubo.attrs.get('escala', 1))
+
+        if df_saude.empty:
+            st.info(f"Período menor que {janela_saude} meses: sem janelas completas para o score.")
+        else:
+            fig_saude = go.Figure()
+            for coluna, nome, cor in [
+                ('pontos_poupanca', 'Poupança', '#51CF66'),
+                ('pontos_diversificacao', 'Diversificação', '#ACD9E6'),
+                ('pontos_consistencia', 'Consistência', '#FFC107'),
+            ]:
+                fig_saude.add_trace(go.Bar(
+                    x=df_saude['mes_ano'], y=df_saude[coluna], name=nome, marker_color=cor
+                ))
+            fig_saude.add_trace(go.Scatter(
+                x=df_saude['mes_ano'],
+                y=df_saude['score'],
+                mode='lines+markers',
+                name='Score',
+                line=dict(color='#ffffff', width=3),
+                marker=dict(size=8)
+            ))
+            fig_saude.update_layout(
+                barmode='stack',
+                hovermode='x unified',
+                plot_bgcolor='#0E1117',
+                paper_bgcolor='#0E1117',
+                font=dict(color='#ffffff'),
+                height=300,
+                yaxis_title="Score (0-100)",
+                xaxis_title="Mês" if janela_saude == 1 else f"Fim da janela de {janela_saude} meses",
+                xaxis=dict(gridcolor='#333'),
+                yaxis=dict(gridcolor='#333', range=[0, 100])
+            )
+            st.plotly_chart(fig_saude, use_container_width=True)
+
+        # Gastos e meses fora do padrão (mediana e MAD dos anteriores do grupo)
+        st.markdown("### Gastos Fora do Padrão")
+
+        col_a1, col_a2 = st.columns(2)
+
+        with col_a1:
+            st.markdown("**Transações atípicas**")
+            if gastos_anomalos.empty:
+                st.info("Nenhum gasto fora do padrão no período selecionado.")
+            else:
+                st.dataframe(
+                    gastos_anomalos.nlargest(10, 'escore')[['data', 'descricao', 'categoria', 'valor', 'mediana', 'referencia']]
+                    .style.format({
+                        'data': lambda x: x.strftime('%d/%m/%Y'),
+                        'valor': 'R$ {:,.2f}',
+                        'mediana': 'R$ {:,.2f}',
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+        with col_a2:
+            st.markdown("**Meses atípicos por categoria**")
+            if meses_anomalos.empty:
+                st.info("Nenhum mês fora do padrão no período selecionado.")
+            else:
+                st.dataframe(
+                    meses_anomalos[['mes_ano', 'categoria', 'gasto', 'mediana']]
+                    .style.format({
+                        'gasto': 'R$ {:,.2f}',
+                        'mediana': 'R$ {:,.2f}',
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
         
         st.subheader("Próximas ações (com impacto estimado)")
 
@@ -663,8 +975,8 @@ if st.session_state.dados_carregados:
         # =========================================================
         st.subheader("Simulador: e se eu reduzir algumas categorias?")
 
-        entradas_totais = df_filtrado.loc[df_filtrado['valor'] > 0, 'valor'].sum()
-        gastos_totais = df_filtrado.loc[df_filtrado['valor'] < 0, 'valor'].abs().sum()
+        entradas_totais = metricas['total_entradas']
+        gastos_totais = metricas['total_gastos']
         taxa_atual = ((entradas_totais - gastos_totais) / entradas_totais * 100) if entradas_totais > 0 else 0.0
 
         # Sugere até 6 categorias mais relevantes; usuário escolhe as que quer simular
@@ -696,7 +1008,7 @@ if st.session_state.dados_carregados:
             f"📊 **Taxa de poupança atual:** {taxa_atual:.1f}% → **projetada:** {taxa_proj:.1f}%"
         )
 
-    with tab6:
+    with tab6, etapa('aba Detalhes'):
         st.subheader("Detalhes das Transações")
         
         # Filtros adicionais
@@ -749,7 +1061,15 @@ if st.session_state.dados_carregados:
         )
         
         # Botão de download
-        csv = df_display.to_csv(index=False).encode('utf-8')
+        # Exporta as colunas do extrato processado, com valores em reais: os
+        # centavos inteiros e o dia (chave da tabela de calendário) são só
+        # representação interna
+        colunas_exportadas = ['data', 'historico', 'descricao', 'valor', 'saldo', *COLUNAS_TRANSACAO, 'categoria']
+        csv = (
+            df_display[[c for c in colunas_exportadas if c in df_display.columns]]
+            .to_csv(index=False)
+            .encode('utf-8')
+        )
         st.download_button(
             label="Baixar dados filtrados (CSV)",
             data=csv,
@@ -758,3 +1078,10 @@ if st.session_state.dados_carregados:
         )
 
     st.divider()
+
+    # Perfil de inicialização: imports, etapas do processamento do extrato e
+    # desta execução do script
+    with st.sidebar.expander("⏱️ Tempo de inicialização"):
+        perfil = pd.DataFrame(relatorio_perfil(st.session_state.get('etapas_carga', [])))
+        st.dataframe(perfil.round({'tempo_ms': 1}), hide_index=True, use_container_width=True)
+        st.caption("Imports contam só na primeira execução do processo; o processamento, só no upload.")
@@ -0,0 +1,45 @@
+"""
+Benchmark da categorização de transações.
+
+Compara `Series.apply(categorizar_transacao)` linha a linha com o
+`categorizar_serie`, que roda o autômato de palavras-chave na Series
+inteira, e com o `categorizar_unicas`, que categoriza só as descrições
+distintas (com memo vazio e com memo já preenchido). Confere se todos dão
+as mesmas categorias.
+
+Uso:
+    python -m benchmarks.bench_categorizacao --linhas 100000 1000000
+"""
+import argparse
+
+from benchmarks.dados import cronometrar, gerar_descricoes
+from src.categorizacao import MemoCategorias, categorizar_serie, categorizar_transacao, categorizar_unicas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.linhas:
+        descricoes = gerar_descricoes(n)
+        t_apply, por_linha = cronometrar(lambda: descricoes.apply(categorizar_transacao), args.repeticoes)
+        t_serie, vetorizado = cronometrar(lambda: categorizar_serie(descricoes), args.repeticoes)
+        t_frio, unicas = cronometrar(lambda: categorizar_unicas(descricoes, memo=MemoCategorias()), args.repeticoes)
+        memo = MemoCategorias()
+        categorizar_unicas(descricoes, memo=memo)
+        t_quente, quente = cronometrar(lambda: categorizar_unicas(descricoes, memo=memo), args.repeticoes)
+
+        iguais = por_linha.equals(vetorizado) and por_linha.equals(unicas)
+        estatisticas = unicas.attrs['categorizacao']
+        acerto = quente.attrs['categorizacao']['acertos_memo'] / quente.attrs['categorizacao']['consultas_memo']
+        print(f"{n:>10} linhas | apply: {t_apply:7.3f}s | serie: {t_serie:7.3f}s ({t_apply / t_serie:5.1f}x) | "
+              f"únicas: {t_frio:6.3f}s ({t_apply / t_frio:5.1f}x) | memo quente: {t_quente:6.3f}s "
+              f"({t_apply / t_quente:5.1f}x) | únicas/linhas: {estatisticas['unicas'] / n:.2%} | "
+              f"acerto memo quente: {acerto:.0%} | "
+              f"resultados iguais: {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
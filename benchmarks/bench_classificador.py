@@ -0,0 +1,87 @@
+"""
+Benchmark do classificador de fallback para 'Outros'.
+
+Treina o naive Bayes com as descrições que as regras de palavra-chave já
+rotulam e mede a inferência em lote sobre todas as linhas (sem tirar
+duplicadas, para medir o pior caso). As operações são NumPy puro sem
+BLAS, então rodam num único núcleo. A meta é passar de 1 milhão de
+descrições por minuto.
+
+Também mede a qualidade do portão de confiança: uma em cada
+PARTES_TESTE descrições rotuladas (por hash) fica fora do treino, e o
+benchmark informa que fração delas passa do limiar e da margem e a
+precisão entre as que passam.
+
+Uso:
+    python -m benchmarks.bench_classificador --linhas 100000 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados import cronometrar, gerar_descricoes, gerar_extrato_bruto
+from src.categorizacao import categorizar_serie
+from src.classificador import (
+    LIMIAR_CONFIANCA, MARGEM_MINIMA, ClassificadorNB, reclassificar_outros
+)
+
+META_POR_MINUTO = 1_000_000
+
+# Uma em cada PARTES_TESTE descrições rotuladas fica fora do treino
+PARTES_TESTE = 4
+
+
+def precisao_fora_do_treino(descricoes, categorias):
+    """
+    Treina sem as descrições de teste e mede, nelas, a cobertura (fração
+    que passa do limiar e da margem) e a precisão entre as que passam
+    """
+    rotulos = pd.DataFrame({'descricao': descricoes, 'categoria': categorias}).drop_duplicates('descricao')
+    rotulos = rotulos[rotulos['categoria'] != 'Outros']
+    textos = rotulos['descricao'].astype(str).to_numpy(dtype=object)
+    teste = pd.util.hash_array(textos, hash_key='bench-teste-0000') % PARTES_TESTE == 0
+    modelo = ClassificadorNB.treinar(textos[~teste], rotulos['categoria'][~teste])
+
+    prob = modelo.probabilidades(textos[teste])
+    ordenadas = np.sort(prob, axis=1)
+    aceitas = (ordenadas[:, -1] >= LIMIAR_CONFIANCA) & (ordenadas[:, -1] - ordenadas[:, -2] >= MARGEM_MINIMA)
+    acertos = modelo.classes[prob.argmax(axis=1)] == rotulos['categoria'][teste].to_numpy()
+    precisao = acertos[aceitas].mean() if aceitas.any() else float('nan')
+    return modelo, int(teste.sum()), aceitas.mean(), precisao, acertos.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    # Descrições de um extrato sintético: variadas o bastante para calibrar
+    treino = gerar_extrato_bruto(200_000, semente=7)['Descrição']
+    categorias_treino = categorizar_serie(treino)
+    t_treino, modelo = cronometrar(lambda: ClassificadorNB.treinar(treino, categorias_treino), 1)
+    print(f"treino: {t_treino:.3f}s | classes: {len(modelo.classes)} | temperatura: {modelo.temperatura}")
+
+    parcial, n_teste, cobertura, precisao, acuracia = precisao_fora_do_treino(treino, categorias_treino)
+    print(f"fora do treino ({n_teste} descrições, temperatura {parcial.temperatura}): "
+          f"limiar {LIMIAR_CONFIANCA:.0%} e margem {MARGEM_MINIMA:.0%} aceitam {cobertura:.1%}, "
+          f"precisão {precisao:.3f} (acurácia sem o portão: {acuracia:.3f})")
+
+    for n in args.linhas:
+        descricoes = gerar_descricoes(n)
+        textos = descricoes.to_numpy()
+        t_lote, (classes, _) = cronometrar(lambda: modelo.prever(textos), args.repeticoes)
+        categorias = categorizar_serie(descricoes)
+        t_outros, (_, mudaram) = cronometrar(
+            lambda: reclassificar_outros(descricoes, categorias, modelo), args.repeticoes
+        )
+        por_minuto = n / t_lote * 60
+        print(f"{n:>10} linhas | inferência em lote: {t_lote:7.3f}s ({por_minuto / 1e6:5.2f} M/min, "
+              f"meta {'atingida' if por_minuto >= META_POR_MINUTO else 'NÃO atingida'}) | "
+              f"reclassificar 'Outros' (únicas): {t_outros:6.3f}s | "
+              f"'Outros': {np.mean(categorias == 'Outros'):.1%} das linhas, {mudaram} reclassificadas")
+
+
+if __name__ == '__main__':
+    main()
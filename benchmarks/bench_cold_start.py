@@ -0,0 +1,100 @@
+"""
+Benchmark de inicialização do app Streamlit.
+
+Mede, em processos Python novos, a partida a frio (imports + primeira
+execução do `app.py`) e as re-execuções a quente que o Streamlit faz a cada
+interação. Roda a tela de upload e o dashboard com um extrato sintético já
+carregado no session state.
+
+Uso:
+    python -m benchmarks.bench_cold_start --linhas 10000 --repeticoes 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / 'app.py'
+
+
+def _medir_processo(linhas, reexecucoes):
+    """Roda dentro do processo filho: devolve os tempos medidos em segundos"""
+    # Processo novo: o import mede o custo real (o Streamlit puxa o pandas,
+    # então o pandas é medido antes e sai do tempo do streamlit)
+    inicio = time.perf_counter()
+    import pandas  # noqa: F401
+    tempos = {'import_pandas': time.perf_counter() - inicio}
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    tempos['import_streamlit'] = time.perf_counter() - inicio
+
+    session_state = {}
+    if linhas:
+        from benchmarks.dados import gerar_extrato_bruto
+        from src.pipeline import _categorizar
+        from src.preprocessing import preprocess
+
+        df = preprocess(gerar_extrato_bruto(linhas), compacto=True, centavos=True)
+        df['categoria'] = _categorizar(df)
+        session_state = {'dados_carregados': True, 'df': df, 'arquivo': None}
+
+    app = AppTest.from_file(str(APP), default_timeout=600)
+    for chave, valor in session_state.items():
+        app.session_state[chave] = valor
+
+    inicio = time.perf_counter()
+    app.run()
+    tempos['primeira_execucao'] = time.perf_counter() - inicio
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    reexecucoes_s = []
+    for _ in range(reexecucoes):
+        inicio = time.perf_counter()
+        app.run()
+        reexecucoes_s.append(time.perf_counter() - inicio)
+    tempos['reexecucao'] = statistics.median(reexecucoes_s)
+    # O AppTest já importa plotly, então o que vale é se o app pediu o módulo
+    from src.perfil import relatorio_perfil
+    tempos['plotly_carregado'] = any(l['nome'].startswith('plotly') for l in relatorio_perfil())
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--reexecucoes', type=int, default=5)
+    parser.add_argument('--filho', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho is not None:
+        print(json.dumps(_medir_processo(args.filho, args.reexecucoes)))
+        return
+
+    for nome, linhas in (('upload', 0), ('dashboard', args.linhas)):
+        medicoes = []
+        for _ in range(args.repeticoes):
+            saida = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_cold_start',
+                 '--filho', str(linhas), '--reexecucoes', str(args.reexecucoes)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            medicoes.append(json.loads(saida.strip().splitlines()[-1]))
+
+        def mediana(campo):
+            return statistics.median(m[campo] for m in medicoes) * 1000
+
+        print(f"{nome:>10} ({linhas} linhas): "
+              f"import pandas {mediana('import_pandas'):5.0f} ms | "
+              f"import streamlit {mediana('import_streamlit'):7.0f} ms | "
+              f"primeira execução {mediana('primeira_execucao'):7.0f} ms | "
+              f"re-execução {mediana('reexecucao'):7.0f} ms | "
+              f"plotly usado: {'sim' if medicoes[0]['plotly_carregado'] else 'não'}")
+
+
+if __name__ == '__main__':
+    main()
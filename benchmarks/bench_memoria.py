@@ -0,0 +1,31 @@
+"""
+Compara a memória do DataFrame processado no esquema padrão e no
+esquema compacto (`compactar_tipos`).
+
+Uso:
+    python -m benchmarks.bench_memoria --linhas 100000
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.dados import gerar_extrato_bruto
+from src.analytics import categorizar_transacao
+from src.preprocessing import compactar_tipos, preprocess, relatorio_memoria
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = preprocess(gerar_extrato_bruto(args.linhas))
+    df['categoria'] = df['descricao'].apply(categorizar_transacao)
+    compacto = compactar_tipos(df.copy())
+
+    with pd.option_context('display.width', 120):
+        print(relatorio_memoria(df, compacto))
+
+
+if __name__ == '__main__':
+    main()
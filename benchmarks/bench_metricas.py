@@ -0,0 +1,102 @@
+"""
+Benchmark do núcleo de métricas (`src.metricas.nucleo_metricas`).
+
+Compara o caminho antigo, em que `calcular_metricas_avancadas`,
+`analisar_tendencias`, `calcular_saude_financeira` e o simulador do app
+refaziam cada um suas máscaras e somas sobre o DataFrame, com uma única
+passada do núcleo lida por todos. Confere se os KPIs batem.
+
+Uso:
+    python -m benchmarks.bench_metricas --linhas 100000 1000000
+"""
+import argparse
+import math
+from datetime import timedelta
+
+from benchmarks.dados import cronometrar, gerar_extrato_bruto
+from src.analytics import analisar_tendencias, calcular_metricas_avancadas
+from src.categorizacao import categorizar_unicas
+from src.cubo import valores_e_escala
+from src.metricas import nucleo_metricas
+from src.preprocessing import preprocess
+
+
+def kpis_por_mascaras(df):
+    """KPIs como eram calculados antes do núcleo: máscaras e somas por chamada"""
+    valores, escala = valores_e_escala(df)
+
+    # calcular_metricas_avancadas
+    gastos = valores[valores < 0].abs()
+    entradas = valores[valores > 0]
+    dias_periodo = (df['data'].max() - df['data'].min()).days
+    data_meio = df['data'].min() + timedelta(days=dias_periodo // 2)
+    gastos_periodo1 = valores[(df['data'] < data_meio) & (valores < 0)].abs().sum()
+    gastos_periodo2 = valores[(df['data'] >= data_meio) & (valores < 0)].abs().sum()
+    entradas_periodo1 = valores[(df['data'] < data_meio) & (valores > 0)].sum()
+    entradas_periodo2 = valores[(df['data'] >= data_meio) & (valores > 0)].sum()
+    categoria_top = df[valores < 0].groupby('categoria', observed=True)[valores.name].sum().abs().idxmax()
+    metricas = {
+        'total_gastos': gastos.sum() / escala,
+        'total_entradas': entradas.sum() / escala,
+        'ticket_medio': gastos.mean() / escala,
+        'maior_gasto': gastos.max() / escala,
+        'gasto_medio_diario': gastos.sum() / escala / max(dias_periodo, 1),
+        'categoria_top': categoria_top,
+        'variacao_gastos': (gastos_periodo2 - gastos_periodo1) / gastos_periodo1 * 100,
+        'variacao_entradas': (entradas_periodo2 - entradas_periodo1) / entradas_periodo1 * 100,
+    }
+
+    # analisar_tendencias: refazia a divisão do período e as somas por metade
+    dias_periodo = (df['data'].max() - df['data'].min()).days
+    data_meio = df['data'].min() + timedelta(days=dias_periodo // 2)
+    periodo1 = valores[(df['data'] < data_meio) & (valores < 0)].abs().sum() / escala
+    periodo2 = valores[(df['data'] >= data_meio) & (valores < 0)].abs().sum() / escala
+    variacao = (periodo2 - periodo1) / periodo1 * 100
+
+    # calcular_saude_financeira e simulador do app: totais de novo
+    total_entradas = valores[valores > 0].sum() / escala
+    total_gastos = valores[valores < 0].abs().sum() / escala
+    categorias_usadas = df[df['valor'] < 0]['categoria'].nunique()
+    entradas_totais = df.loc[df['valor'] > 0, 'valor'].sum()
+    gastos_totais = df.loc[df['valor'] < 0, 'valor'].abs().sum()
+    return metricas, variacao, (total_entradas, total_gastos, categorias_usadas, entradas_totais, gastos_totais)
+
+
+def kpis_por_nucleo(df):
+    """Os mesmos KPIs lidos de uma única passada do núcleo"""
+    nucleo = nucleo_metricas(df)
+    metricas = calcular_metricas_avancadas(df, nucleo=nucleo)
+    tendencias = analisar_tendencias(df, nucleo=nucleo)
+    return metricas, tendencias['variacao_percentual'], (
+        nucleo['total_entradas'], nucleo['total_gastos'], nucleo['categorias_com_gasto'],
+        metricas['total_entradas'], metricas['total_gastos'],
+    )
+
+
+def iguais(esperado, obtido):
+    if isinstance(esperado, (dict, tuple)):
+        pares = zip(esperado.values(), obtido.values()) if isinstance(esperado, dict) else zip(esperado, obtido)
+        return all(iguais(a, b) for a, b in pares)
+    if isinstance(esperado, str):
+        return esperado == obtido
+    return math.isclose(esperado, obtido, rel_tol=1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'máscaras (s)':>13} {'núcleo (s)':>11} {'speedup':>9} {'iguais':>7}")
+    for n in args.linhas:
+        df = preprocess(gerar_extrato_bruto(n), compacto=True, centavos=True)
+        df['categoria'] = categorizar_unicas(df['descricao']).astype('category')
+        t_mascaras, esperado = cronometrar(lambda: kpis_por_mascaras(df), args.repeticoes)
+        t_nucleo, obtido = cronometrar(lambda: kpis_por_nucleo(df), args.repeticoes)
+        print(f"{n:>10} {t_mascaras:>13.4f} {t_nucleo:>11.4f} {t_mascaras / t_nucleo:>8.1f}x "
+              f"{str(iguais(esperado, obtido)):>7}")
+
+
+if __name__ == '__main__':
+    main()
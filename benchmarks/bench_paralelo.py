@@ -0,0 +1,57 @@
+"""
+Benchmark da categorização em vários processos.
+
+Gera descrições todas distintas (o caso do arquivo consolidado, em que o
+memo não ajuda) e compara o `categorizar_serie` no processo atual com o
+`categorizar_paralelo` para cada quantidade de processos, com o pool já
+aquecido. Mostra também o custo de subir o pool e confere se o resultado
+é idêntico ao sequencial.
+
+Uso:
+    python -m benchmarks.bench_paralelo --unicas 200000 1000000 --processos 1 2 4
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.dados import cronometrar, gerar_descricoes
+from src.categorizacao import categorizar_paralelo, categorizar_serie
+
+
+def descricoes_distintas(n):
+    """Descrições sintéticas com um sufixo que torna cada uma única"""
+    base = gerar_descricoes(n).to_numpy()
+    return np.array([f'{d} #{i}' for i, d in enumerate(base)], dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--unicas', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--processos', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+    print(f"núcleos disponíveis: {os.cpu_count()}")
+
+    for n in args.unicas:
+        textos = descricoes_distintas(n)
+        t_serie, esperado = cronometrar(lambda: categorizar_serie(textos).to_numpy(), args.repeticoes)
+        print(f"{n:>10} únicas | sequencial: {t_serie:7.3f}s")
+        for processos in args.processos:
+            if processos <= 1:
+                continue
+            inicio = time.perf_counter()
+            categorizar_paralelo(textos[:processos], processos, minimo=0)
+            t_pool = time.perf_counter() - inicio
+            t_paralelo, resultado = cronometrar(
+                lambda: categorizar_paralelo(textos, processos, minimo=0), args.repeticoes
+            )
+            print(f"{'':>10}        | {processos:>2} processos: {t_paralelo:7.3f}s "
+                  f"(speedup {t_serie / t_paralelo:4.2f}x) | subir o pool: {t_pool:5.2f}s | "
+                  f"resultado idêntico: {'sim' if (resultado == esperado).all() else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Benchmark da conversão de valores monetários do `preprocess`.
+
+Compara o `Series.apply(converter_valor_monetario)` linha a linha com a
+conversão vetorizada `converter_valores_monetarios` e confere se os dois
+produzem exatamente os mesmos floats.
+
+Uso:
+    python -m benchmarks.bench_valores_monetarios --linhas 100000 500000
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.dados import cronometrar, gerar_valores
+from src.preprocessing import converter_valor_monetario, converter_valores_monetarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'apply (s)':>12} {'vetorizado (s)':>15} {'speedup':>9} {'iguais':>7}")
+    for n in args.linhas:
+        serie = gerar_valores(n)
+        t_apply, esperado = cronometrar(lambda: serie.apply(converter_valor_monetario), args.repeticoes)
+        t_vetor, (obtido, _) = cronometrar(lambda: converter_valores_monetarios(serie), args.repeticoes)
+        iguais = np.array_equal(esperado.to_numpy(), obtido.to_numpy(), equal_nan=True)
+        print(f"{n:>10} {t_apply:>12.4f} {t_vetor:>15.4f} {t_apply / t_vetor:>8.1f}x {str(iguais):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Dados sintéticos e utilitários usados pelos benchmarks"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.sintetico import gerar_blocos
+
+DESCRICOES = [
+    'IFOOD *RESTAURANTE', 'Uber *trip', 'Netflix.com', 'POSTO SHELL', 'Pagamento fatura',
+    'Farmacia Pague Menos', 'Aplicacao CDB', 'Supermercado Extra', 'Maria Silva Santos',
+    'Joao Pedro Oliveira', 'ABC COMERCIO LTDA', 'Spotify', 'Smartfit', 'Amazon Marketplace',
+]
+NOMES = ['Maria', 'Joao', 'Ana', 'Carlos', 'Helena', 'Otavio', 'Priscila', 'Wagner']
+SOBRENOMES = ['Silva', 'Souza', 'Pereira', 'Guimaraes', 'Teles', 'Vasconcelos']
+
+
+def cronometrar(funcao, repeticoes=3):
+    """Melhor tempo (s) de `repeticoes` execuções de `funcao` e o último resultado"""
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def formatar_valor(valor, formato):
+    """Formata um valor como o Inter exporta: BR com ou sem milhar, ou US"""
+    if formato < 0.6:
+        return f"{valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    if formato < 0.8:
+        return f"{valor:.2f}".replace('.', ',')
+    if formato < 0.95:
+        return f"{valor:,.2f}"
+    return f"{valor:.2f}"
+
+
+def gerar_valores(n, semente=42):
+    """Valores monetários em texto, no formato misto do Inter"""
+    rng = np.random.default_rng(semente)
+    valores = rng.lognormal(4, 1.5, n).round(2) * rng.choice([-1, 1], n)
+    formatos = rng.random(n)
+    return pd.Series([formatar_valor(v, f) for v, f in zip(valores, formatos)], dtype=object)
+
+
+def gerar_descricoes(n, semente=42):
+    """
+    Descrições variadas: estabelecimentos conhecidos, comércios com número
+    de loja e PIX para pessoas (nome + sobrenome)
+    """
+    rng = np.random.default_rng(semente)
+    pessoas = [f'{nome} {sobrenome}' for nome in NOMES for sobrenome in SOBRENOMES]
+    lojas = [f'{base} {numero:04d}' for base in ('LOJA', 'COMERCIAL', 'EMPORIO') for numero in range(200)]
+    pool = np.array(DESCRICOES + pessoas + lojas, dtype=object)
+    pesos = np.r_[np.full(len(DESCRICOES), 6.0), np.full(len(pessoas), 2.0), np.ones(len(lojas))]
+    return pd.Series(rng.choice(pool, n, p=pesos / pesos.sum()), dtype=object)
+
+
+def gerar_extrato_bruto(n, semente=42):
+    """
+    DataFrame no formato que `load_csv` devolve (antes do preprocess), com
+    as `n` transações mais recentes de um extrato de `src.sintetico`
+    """
+    return pd.concat(gerar_blocos(n, semente), ignore_index=True).head(n)
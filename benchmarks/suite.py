@@ -0,0 +1,165 @@
+"""
+Suíte de benchmarks de ponta a ponta: leitura, preprocess, categorização
+e cada função de `src.analytics`.
+
+Para cada tamanho gera um extrato sintético em disco (`src.sintetico`) e
+mede cada etapa: o melhor tempo de algumas repetições e o pico de memória
+alocada (tracemalloc, numa execução à parte para não distorcer o tempo).
+O resultado vai para um JSON e é comparado com a baseline guardada: uma
+etapa regrediu quando fica mais de `--limiar` acima da baseline (e a
+diferença passa de `--minimo-ms` no tempo). Com regressão, sai com
+código 1.
+
+Uso:
+    python -m benchmarks.suite --linhas 1000 100000 1000000 --saida resultado.json
+    python -m benchmarks.suite --salvar-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados import cronometrar
+from src import analytics
+from src.categorizacao import MemoCategorias, categorizar_unicas
+from src.data_loader import load_csv
+from src.preprocessing import preprocess
+from src.sintetico import escrever_extrato
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+FUNCOES_ANALYTICS = [
+    'gasto_mensal',
+    'gasto_semestral',
+    'gasto_anual',
+    'gasto_por_categoria',
+    'calcular_metricas_avancadas',
+    'identificar_gastos_recorrentes',
+    'analisar_tendencias',
+    'calcular_saude_financeira',
+    'serie_saude_financeira',
+]
+
+
+def pico_memoria(funcao):
+    """Pico de memória alocada (MB) durante uma execução de `funcao`"""
+    tracemalloc.start()
+    try:
+        antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (pico - antes) / 1e6
+
+
+def medir_tamanho(linhas, repeticoes, semente):
+    """Mede todas as etapas para um extrato com `linhas` transações"""
+    resultados = []
+
+    def medir(etapa, funcao):
+        tempo, resultado = cronometrar(funcao, repeticoes)
+        memoria = pico_memoria(funcao)
+        resultados.append({'linhas': linhas, 'etapa': etapa, 'tempo_s': tempo, 'pico_memoria_mb': memoria})
+        print(f"{linhas:>10} | {etapa:<42} | {tempo * 1000:10.2f} ms | {memoria:9.2f} MB")
+        return resultado
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = Path(diretorio) / 'extrato.csv'
+        escrever_extrato(caminho, linhas, semente=semente)
+        bruto = medir('load_csv', lambda: load_csv(caminho))
+
+    df = medir('preprocess', lambda: preprocess(bruto, compacto=True, centavos=True))
+    # Memo novo a cada execução: mede a categorização fria, sem cache
+    categorias = medir('categorizacao', lambda: categorizar_unicas(df['descricao'], memo=MemoCategorias()))
+    df['categoria'] = categorias.astype('category')
+
+    for nome in FUNCOES_ANALYTICS:
+        funcao = getattr(analytics, nome)
+        medir(f'analytics.{nome}', lambda: funcao(df))
+    return resultados
+
+
+def comparar(resultados, baseline, limiar, minimo_ms):
+    """Etapas que regrediram em tempo ou memória em relação à baseline"""
+    base = {(r['linhas'], r['etapa']): r for r in baseline['resultados']}
+    regressoes = []
+    for r in resultados:
+        anterior = base.get((r['linhas'], r['etapa']))
+        if anterior is None:
+            continue
+        tempo = r['tempo_s'] / anterior['tempo_s'] if anterior['tempo_s'] else 1.0
+        if tempo > 1 + limiar and (r['tempo_s'] - anterior['tempo_s']) * 1000 > minimo_ms:
+            regressoes.append({**r, 'medida': 'tempo', 'baseline': anterior['tempo_s'], 'razao': tempo})
+        memoria = r['pico_memoria_mb'] / anterior['pico_memoria_mb'] if anterior['pico_memoria_mb'] > 0 else 1.0
+        if memoria > 1 + limiar and r['pico_memoria_mb'] - anterior['pico_memoria_mb'] > 1:
+            regressoes.append({**r, 'medida': 'memória', 'baseline': anterior['pico_memoria_mb'], 'razao': memoria})
+    return regressoes
+
+
+def ambiente():
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', type=Path, help='arquivo JSON com os resultados')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true', help='grava o resultado como nova baseline')
+    parser.add_argument('--limiar', type=float, default=0.25, help='regressão relativa tolerada (0.25 = 25%%)')
+    parser.add_argument('--minimo-ms', type=float, default=10.0, help='diferenças menores que isso são ruído')
+    args = parser.parse_args()
+
+    # Tabelas montadas na primeira chamada (autômato, dígitos) não entram
+    # na medida do primeiro tamanho
+    categorizar_unicas(pd.Series(['aquecimento']), memo=MemoCategorias())
+
+    print(f"{'linhas':>10} | {'etapa':<42} | {'tempo':>13} | {'pico':>12}")
+    resultados = []
+    for linhas in args.linhas:
+        resultados.extend(medir_tamanho(linhas, args.repeticoes, args.semente))
+
+    saida = {'ambiente': ambiente(), 'parametros': vars(args) | {'saida': None, 'baseline': None},
+             'resultados': resultados}
+    if args.saida:
+        args.saida.write_text(json.dumps(saida, indent=2, ensure_ascii=False), encoding='utf-8')
+    if args.salvar_baseline:
+        args.baseline.write_text(json.dumps(saida, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"baseline gravada em {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"sem baseline em {args.baseline}; nada a comparar")
+        return
+    regressoes = comparar(resultados, json.loads(args.baseline.read_text(encoding='utf-8')),
+                          args.limiar, args.minimo_ms)
+    for r in regressoes:
+        print(f"REGRESSÃO {r['linhas']:>10} | {r['etapa']:<42} | {r['medida']}: "
+              f"{r['razao']:.2f}x a baseline")
+    if regressoes:
+        sys.exit(1)
+    print(f"nenhuma regressão acima de {args.limiar:.0%} em relação à baseline")
+
+
+if __name__ == '__main__':
+    main()
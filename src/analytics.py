@@ -1,385 +1,119 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 
-def gasto_mensal(df):
-    """Calcula gastos mensais"""
-    return (
-        df[df['valor'] < 0]
-        .groupby('mes_ano', as_index=False)['valor']
-        .sum()
-        .assign(valor=lambda x: x['valor'].abs())
-    )
+# Regras de categorização moram em src.categorizacao; reexportadas aqui
+# para quem já importava de src.analytics
+from src.arquivo import TAMANHO_BLOCO_ARQUIVO
+from src.categorizacao import (  # noqa: F401
+    categorizar_transacao, categorizar_serie, categorizar_unicas, eh_nome_pessoa, versao_regras
+)
+from src.cubo import SEM_CATEGORIA, eixo_meses, gastos_por, montar_cubo, rotulos_mes
+from src.metricas import MINIMO_DIAS_TENDENCIA, nucleo_metricas
+from src.recorrencia import detectar_recorrencias
+
 
+def gasto_mensal(df, cubo=None):
+    """Calcula gastos mensais (a partir do cubo de agregação, se já houver um)"""
+    cubo = montar_cubo(df) if cubo is None else cubo
+    return gastos_por(cubo, 'mes_ano').reset_index()
 
-def gasto_semestral(df):
+
+def gasto_semestral(df, cubo=None):
     """Calcula gastos semestrais"""
-    return (
-        df[df['valor'] < 0]
-        .groupby(['ano', 'semestre'])['valor']
-        .sum()
-        .reset_index()
-        .assign(valor=lambda x: x['valor'].abs())
-    )
+    cubo = montar_cubo(df) if cubo is None else cubo
+    return gastos_por(cubo, ['ano', 'semestre']).reset_index()
 
 
-def gasto_anual(df):
+def gasto_anual(df, cubo=None):
     """Calcula gastos anuais"""
-    return (
-        df[df['valor'] < 0]
-        .groupby('ano')['valor']
-        .sum()
-        .reset_index()
-        .assign(valor=lambda x: x['valor'].abs())
-    )
+    cubo = montar_cubo(df) if cubo is None else cubo
+    return gastos_por(cubo, 'ano').reset_index()
 
 
-def gasto_por_categoria(df):
-    """Calcula gastos por categoria"""
+def gasto_por_categoria(df, cubo=None):
+    """Calcula gastos por categoria, do maior para o menor"""
+    cubo = montar_cubo(df) if cubo is None else cubo
     return (
-        df[df['valor'] < 0]
-        .groupby('categoria')['valor']
-        .sum()
+        gastos_por(cubo, 'categoria')
         .reset_index()
-        .sort_values('valor')
-        .assign(valor=lambda x: x['valor'].abs())
+        .sort_values('valor', ascending=False, kind='stable')
     )
 
 
-def eh_nome_pessoa(texto):
+def calcular_metricas_avancadas(df, nucleo=None):
     """
-    Detecta se o texto parece ser um nome de pessoa (para PIX/transferências)
+    Calcula métricas avançadas do extrato (a partir do núcleo de métricas,
+    se já houver um). Para uma janela de datas do extrato inteiro, passe
+    `nucleo=indice.nucleo(inicio, fim)` do `IndiceTemporal`
     """
-    if pd.isna(texto):
-        return False
-    
-    texto = texto.lower().strip()
-    
-    # Remove números e caracteres especiais comuns em CNPJs
-    tem_muitos_numeros = sum(c.isdigit() for c in texto) > len(texto) * 0.3
-    if tem_muitos_numeros:
-        return False
-    
-    # Palavras que indicam que NÃO é pessoa (empresas, estabelecimentos)
-    palavras_empresa = [
-        'ltda', 'eireli', 'sa', 's.a', 's/a', 'me', 'epp', 'comercio', 
-        'agencia', 'restaurante', 'loja', 'bar', 'padaria', 'mercado',
-        'posto', 'shopping', 'center', 'magazine', 'supermercado',
-        'delivery', 'express', 'online', 'store', 'shop', 'company',
-        'distribuidora', 'ifood', 'uber', 'rappi', 'ticket', 'estacio',
-        'cinema', 'teatro', 'hospital', 'clinica', 'farmacia', 'drogaria',
-        'petronorte', 'taguatinga', 'mc donald', 'mcdonald', 'creperia',
-        'pica-pau', 'magalupay', 'gmcm', 'combustivel', 'brasilia'
-    ]
-    
-    for palavra in palavras_empresa:
-        if palavra in texto:
-            return False
-    
-    # Padrões comuns de nomes brasileiros
-    palavras = texto.split()
-    
-    # Se tem 2+ palavras e nenhuma é empresa, provavelmente é nome
-    if len(palavras) >= 2:
-        # Lista de nomes comuns brasileiros (primeiros nomes e sobrenomes)
-        nomes_comuns = [
-            # Primeiros nomes comuns
-            'jose', 'maria', 'joao', 'ana', 'antonio', 'francisco', 'carlos',
-            'paulo', 'pedro', 'lucas', 'marcos', 'gabriel', 'rafael', 'bruno',
-            'fernando', 'rodrigo', 'patricia', 'sandra', 'juliana', 'fernanda',
-            'camila', 'beatriz', 'luciana', 'mariana', 'amanda', 'julia',
-            'bruna', 'larissa', 'natalia', 'vanessa', 'marcelo', 'eduardo',
-            'gustavo', 'felipe', 'diego', 'vitor', 'matheus', 'thiago',
-            'ricardo', 'roberto', 'sergio', 'luis', 'luciene', 'bernardo',
-            'alexander', 'alessandra', 'giovanna', 'paula', 'jonatas',
-            'alex', 'teixeira', 'macedo', 'francisca',
-            # Sobrenomes comuns
-            'silva', 'santos', 'oliveira', 'souza', 'costa', 'ferreira', 
-            'rodrigues', 'almeida', 'nascimento', 'lima', 'araujo', 'ribeiro', 
-            'carvalho', 'martins', 'dias', 'lopes', 'gomes', 'mendes', 'barros', 
-            'cardoso', 'rocha', 'miranda', 'duarte', 'monteiro', 'freitas', 
-            'barbosa', 'campos', 'aquino', 'morais', 'brandao', 'macena'
-        ]
-        
-        # Verifica se alguma palavra do texto está na lista de nomes
-        for palavra in palavras:
-            if len(palavra) > 2 and palavra in nomes_comuns:
-                return True
-        
-        # Se tem 2-4 palavras de tamanho razoável, provavelmente é nome
-        if 2 <= len(palavras) <= 4:
-            palavras_validas = [p for p in palavras if len(p) > 2]
-            if len(palavras_validas) >= 2:
-                # Verifica se não tem palavras muito comerciais
-                palavras_comerciais = ['delivery', 'express', 'online', 'store', 'shop']
-                tem_comercial = any(pc in texto for pc in palavras_comerciais)
-                if not tem_comercial:
-                    return True
-    
-    return False
-
-
-def categorizar_transacao(descricao):
-    """
-    Categoriza automaticamente uma transação com base na descrição
-    usando palavras-chave inteligentes + detecção automática de nomes
-    """
-    if pd.isna(descricao):
-        return 'Outros'
-    
-    descricao_lower = descricao.lower()
-    
-    # Dicionário de categorias com palavras-chave
-    categorias = {
-        'Alimentação': [
-            'ifood', 'quentinhas', 'sabor', 'macarons', 'nino', 'loucos por burger', 
-            'biscoitos', 'rappi', 'bolos', 'uber eats', 'restaurante', 'lanchonete',
-            'padaria', 'dog', 'mcdonalds', 'mc donald', 'sucoetal', 'bacio', 'bauducco', 
-            'lancheteria', 'benedito', 'veloce', 'creperia', 'pica-pau', 'marmitexleo', 
-            'mercado', 'taguatinga', 'supermercado', 'açougue', 'hortifruti',
-            'pizza', 'burger', 'distribuidora', 'fini', 'casa do pao', 'pao', 
-            'big box', 'burguer', 'imperio dos paes', 'bobs', 
-            'subway', 'giraffas', 'outback', 'dominos', 'torta', 'dona', 
-            'abbraccio', 'coco bambu', 'spoleto', 'habibs', 'leonardobianoda',
-            'american cookies', 'sorbe', 'cafe', 'bakery', 'pao de acucar', 
-            'carrefour', 'extra', 'walmart', 'assai', 'luzia de fatima miranda', 
-            'atacadao'
-        ],
-        'Transporte': [
-            'uber', 'iguatemi', 'car', 'combustiveis', 'estacionament', 'lyft', 
-            'cabify', '99', 'taxi', 'combustivel', 'gasolina', 'posto', 'park', 
-            'parkshopping', 'petronorte', 'shell', 'boulevard', 'ipiranga', 
-            'br petroleo', 'petrobras', 'gmcm', 'estacionamento', 'valet', 'onibus', 
-            'metro', 'metrô', 'transporte', 'pedágio', 'pedagio', 'viacard', 
-            'carlos ieje de sena', 'sem parar'
-        ],
-        'Moradia': [
-            'aluguel', 'condominio', 'condomínio', 'iptu', 'luz', 'agua',
-            'água', 'gas', 'gás', 'internet', 'telefone', 'neoenergia',
-            'caesb', 'correios', 'celpe', 'cemig', 'copel', 'light'
-        ],
-        'Online': [
-            'amazon', 'mercado livre', 'magalu', 'magalupay', 'americanas', 'submarino',
-            'shoptime', 'casas bahia', 'netshoes', 'centauro', 'aliexpress',
-            'ebay', 'etsy', 'wish', 'shein', 'pagseguro international', 'zaful'
-        ],
-        'Mensalidades': [
-            'netflix', 'spotify', 'disney plus', 'hbo max', 'amazon prime',
-            'globoplay', 'fatura', 'youtube premium', 'tim', 'claro', 'vivo', 
-            'oi', 'laricell', 'apple music', 'deezer', 'google drive', 'dropbox', 
-            'icloud', 'one drive', 'adobe', 'canva', 'notion', 'evernote', 
-            'slack', 'zoom', 'microsoft 365'
-        ],
-        'Saúde': [
-            'farmacia', 'farmácia', 'drogaria', 'drogasil', 'pacheco',
-            'pague menos', 'hospital', 'clinica', 'clínica', 'laboratorio',
-            'laboratório', 'médico', 'medico', 'dentista', 'fisioterapia',
-            'plano de saude', 'unimed', 'amil', 'sulamerica', 'bradesco saude',
-            'advance fisioterapia'  # Específico do seu extrato
-        ],
-        'Educação': [
-            'escola', 'faculdade', 'universidade', 'curso', 'livro', 'livraria',
-            'material escolar', 'estacio', 'ceub', 'unieuro', 'edx', 'alura', 
-            'iesb', 'projecao', 'udf', 'papelaria', 'udemy', 'coursera',
-            'kaplan', 'wizard', 'ccaa', 'cna', 'fisk'
-        ],
-        'Lazer': [
-            'cinema', 'ciatoy', 'teatro', 'ri happy', 'ingresso', 'netflix', 
-            'spotify', 'amazon prime', 'ticket', 'disney', 'hbo', 'apple music', 
-            'deezer', 'youtube premium', 'entretenimento', 'globoplay', 
-            'crunchyroll', 'paramount', 'steam', 'playstation', 'xbox', 
-            'nintendo', 'game'
-        ],
-        'Vestuário': [
-            'renner', 'riachuelo', 'c&a', 'zara', 'hering', 'marisa',
-            'pernambucanas', 'magazine luiza', 'nike', 'adidas', 'centauro',
-            'netshoes', 'decathlon', 'roupa', 'calcado', 'calçado', 'sapato'
-        ],
-        'Serviços': [
-            'salao', 'salão', 'barbearia', 'cabeleireiro', 'manicure',
-            'academia', 'smartfit', 'bluefit', 'bio ritmo', 'lavanderia',
-            'costureira', 'chaveiro', 'encanador', 'eletricista'
-        ],
-        'Investimentos': [
-            'investimento', 'aplicacao', 'aplicação', 'poupanca', 'poupança',
-            'tesouro', 'cdb', 'lci', 'lca', 'acao', 'ações', 'lig liquidez', 'fundo'
-        ]
-    }
-    
-    # PRIMEIRO: Verificar categorias específicas (antes de transferências)
-    # Isso garante que "Mc Donalds", "Taguatinga", etc vão para categorias certas
-    for categoria, palavras_chave in categorias.items():
-        for palavra in palavras_chave:
-            if palavra in descricao_lower:
-                return categoria
-    
-    # SEGUNDO: Verificar se é transferência/PIX
-    palavras_transferencia = ['pix', 'ted', 'doc', 'transferencia', 'transferência', 'recebido', 'enviado']
-    for palavra in palavras_transferencia:
-        if palavra in descricao_lower:
-            return 'Transferências'
-    
-    # TERCEIRO: Verificar se parece ser nome de pessoa (PIX para pessoa física)
-    # Só chega aqui se não matchou nenhuma categoria específica
-    if eh_nome_pessoa(descricao):
-        return 'Transferências'
-    
-    return 'Outros'
-
-
-def calcular_metricas_avancadas(df):
-    """
-    Calcula métricas avançadas do extrato
-    """
-    # Verificar se o DataFrame não está vazio
-    if df.empty:
-        return {
-            'total_gastos': 0,
-            'total_entradas': 0,
-            'ticket_medio': 0,
-            'maior_gasto': 0,
-            'gasto_medio_diario': 0,
-            'categoria_top': 'N/A',
-            'variacao_gastos': 0,
-            'variacao_entradas': 0
-        }
-    
-    # Separar gastos e entradas
-    gastos = df[df['valor'] < 0]['valor'].abs()
-    entradas = df[df['valor'] > 0]['valor']
-    
-    # Calcular variações (comparando com período anterior)
-    dias_periodo = (df['data'].max() - df['data'].min()).days
-    if dias_periodo > 0:
-        metade_periodo = dias_periodo // 2
-        data_meio = df['data'].min() + timedelta(days=metade_periodo)
-        
-        gastos_periodo1 = df[(df['data'] < data_meio) & (df['valor'] < 0)]['valor'].abs().sum()
-        gastos_periodo2 = df[(df['data'] >= data_meio) & (df['valor'] < 0)]['valor'].abs().sum()
-        
-        entradas_periodo1 = df[(df['data'] < data_meio) & (df['valor'] > 0)]['valor'].sum()
-        entradas_periodo2 = df[(df['data'] >= data_meio) & (df['valor'] > 0)]['valor'].sum()
-        
-        variacao_gastos = ((gastos_periodo2 - gastos_periodo1) / gastos_periodo1 * 100) if gastos_periodo1 > 0 else 0
-        variacao_entradas = ((entradas_periodo2 - entradas_periodo1) / entradas_periodo1 * 100) if entradas_periodo1 > 0 else 0
-    else:
-        variacao_gastos = 0
-        variacao_entradas = 0
-    
-    # Categoria que mais gastou
-    if 'categoria' in df.columns:
-        gastos_por_categoria = (
-            df[df['valor'] < 0]
-            .groupby('categoria')['valor']
-            .sum()
-            .abs()
+    nucleo = nucleo_metricas(df) if nucleo is None else nucleo
+    return {
+        chave: nucleo[chave]
+        for chave in (
+            'total_gastos', 'total_entradas', 'ticket_medio', 'maior_gasto', 'gasto_medio_diario',
+            'categoria_top', 'variacao_gastos', 'variacao_entradas',
         )
-        
-        if len(gastos_por_categoria) > 0:
-            categoria_top = gastos_por_categoria.idxmax()
-        else:
-            categoria_top = 'N/A'
-    else:
-        categoria_top = 'N/A'
-    
-    metricas = {
-        'total_gastos': gastos.sum(),
-        'total_entradas': entradas.sum(),
-        'ticket_medio': gastos.mean() if len(gastos) > 0 else 0,
-        'maior_gasto': gastos.max() if len(gastos) > 0 else 0,
-        'gasto_medio_diario': gastos.sum() / max(dias_periodo, 1),
-        'categoria_top': categoria_top,
-        'variacao_gastos': variacao_gastos,
-        'variacao_entradas': variacao_entradas
     }
-    
-    return metricas
 
 
 def identificar_gastos_recorrentes(df, min_frequencia=2):
     """
-    Identifica gastos que aparecem múltiplas vezes
+    Identifica gastos recorrentes (semanais, mensais ou anuais), com a
+    previsão da próxima cobrança; ver `src.recorrencia.detectar_recorrencias`
     """
-    gastos = df[df['valor'] < 0].copy()
-    
-    if gastos.empty:
-        return pd.DataFrame()
-    
-    # Normalizar descrições para melhor agrupamento
-    gastos['descricao_norm'] = (
-        gastos['descricao']
-        .str.lower()
-        .str.strip()
-        .str[:30]  # Primeiros 30 caracteres
-    )
-    
-    # Agrupar por descrição normalizada
-    recorrentes = (
-        gastos.groupby('descricao_norm')
-        .agg({
-            'descricao': 'first',
-            'valor': ['count', 'mean', 'sum']
-        })
-        .reset_index(drop=True)
-    )
-    
-    recorrentes.columns = ['descricao', 'frequencia', 'valor_medio', 'total_gasto']
-    recorrentes['valor_medio'] = recorrentes['valor_medio'].abs()
-    recorrentes['total_gasto'] = recorrentes['total_gasto'].abs()
-    
-    # Filtrar apenas os que aparecem mais de min_frequencia vezes
-    recorrentes = recorrentes[recorrentes['frequencia'] >= min_frequencia]
-    
-    return recorrentes.sort_values('total_gasto', ascending=False)
+    return detectar_recorrencias(df, min_frequencia)
 
 
-def analisar_tendencias(df):
+def analisar_tendencias(df, nucleo=None):
     """
     Analisa tendências de gastos e comportamento
     """
-    dias_periodo = (df['data'].max() - df['data'].min()).days
-    
-    if dias_periodo < 30:
+    nucleo = nucleo_metricas(df) if nucleo is None else nucleo
+    if nucleo['dias_analisados'] < MINIMO_DIAS_TENDENCIA:
         return {
             'tendencia_gastos': 'insuficiente',
             'variacao_percentual': 0,
-            'dias_analisados': dias_periodo
+            'dias_analisados': nucleo['dias_analisados']
         }
     
-    # Dividir em dois períodos
-    metade_periodo = dias_periodo // 2
-    data_meio = df['data'].min() + timedelta(days=metade_periodo)
-    
-    gastos_periodo1 = df[(df['data'] < data_meio) & (df['valor'] < 0)]['valor'].abs().sum()
-    gastos_periodo2 = df[(df['data'] >= data_meio) & (df['valor'] < 0)]['valor'].abs().sum()
-    
-    if gastos_periodo1 > 0:
-        variacao = ((gastos_periodo2 - gastos_periodo1) / gastos_periodo1) * 100
-    else:
-        variacao = 0
-    
-    if variacao > 5:
-        tendencia = 'crescente'
-    elif variacao < -5:
-        tendencia = 'decrescente'
-    else:
-        tendencia = 'estável'
-    
     return {
-        'tendencia_gastos': tendencia,
-        'variacao_percentual': variacao,
-        'dias_analisados': dias_periodo,
-        'periodo1_gastos': gastos_periodo1,
-        'periodo2_gastos': gastos_periodo2
+        'tendencia_gastos': nucleo['tendencia_gastos'],
+        'variacao_percentual': nucleo['variacao_gastos'],
+        'dias_analisados': nucleo['dias_analisados'],
+        'periodo1_gastos': nucleo['periodo1_gastos'],
+        'periodo2_gastos': nucleo['periodo2_gastos']
     }
 
 
-def calcular_saude_financeira(df):
+def _pontos_poupanca(taxa_poupanca):
+    """Taxa de poupança (%) → até 50 pontos"""
+    taxa_poupanca = np.asarray(taxa_poupanca)
+    return np.select(
+        [taxa_poupanca >= 30, taxa_poupanca >= 20, taxa_poupanca >= 10, taxa_poupanca >= 0],
+        [50, 40, 25, 10], 0
+    )
+
+
+def _pontos_diversificacao(categorias_usadas):
+    """Categorias com gasto → até 25 pontos"""
+    categorias_usadas = np.asarray(categorias_usadas)
+    return np.select([categorias_usadas >= 5, categorias_usadas >= 3], [25, 15], 5)
+
+
+def _pontos_consistencia(cv, meses_com_gasto):
+    """Coeficiente de variação do gasto mensal → até 25 pontos (0 com um mês só)"""
+    cv = np.asarray(cv)
+    meses_com_gasto = np.asarray(meses_com_gasto)
+    return np.select([meses_com_gasto <= 1, cv < 0.2, cv < 0.4], [0, 25, 15], 5)
+
+
+def calcular_saude_financeira(df, nucleo=None, cubo=None):
     """
     Calcula um score de saúde financeira de 0 a 100
     """
-    total_entradas = df[df['valor'] > 0]['valor'].sum()
-    total_gastos = df[df['valor'] < 0]['valor'].abs().sum()
+    nucleo = nucleo_metricas(df) if nucleo is None else nucleo
+    total_entradas = nucleo['total_entradas']
+    total_gastos = nucleo['total_gastos']
     
     if total_entradas == 0:
         return 0
@@ -388,37 +122,125 @@ def calcular_saude_financeira(df):
     taxa_poupanca = ((total_entradas - total_gastos) / total_entradas) * 100
     
     # Score baseado em múltiplos fatores
-    score = 0
-    
     # 1. Taxa de poupança (50 pontos)
-    if taxa_poupanca >= 30:
-        score += 50
-    elif taxa_poupanca >= 20:
-        score += 40
-    elif taxa_poupanca >= 10:
-        score += 25
-    elif taxa_poupanca >= 0:
-        score += 10
+    score = int(_pontos_poupanca(taxa_poupanca))
     
     # 2. Diversificação de gastos (25 pontos)
     if 'categoria' in df.columns:
-        categorias_usadas = df[df['valor'] < 0]['categoria'].nunique()
-        if categorias_usadas >= 5:
-            score += 25
-        elif categorias_usadas >= 3:
-            score += 15
-        else:
-            score += 5
+        score += int(_pontos_diversificacao(nucleo['categorias_com_gasto']))
     
     # 3. Consistência de gastos (25 pontos)
-    gastos_mensais = gasto_mensal(df)
+    gastos_mensais = gasto_mensal(df, cubo=cubo)
     if len(gastos_mensais) > 1:
         cv = gastos_mensais['valor'].std() / gastos_mensais['valor'].mean()
-        if cv < 0.2:  # Gastos muito consistentes
-            score += 25
-        elif cv < 0.4:
-            score += 15
-        else:
-            score += 5
+        score += int(_pontos_consistencia(cv, len(gastos_mensais)))
     
-    return min(score, 100)
\ No newline at end of file
+    return min(score, 100)
+
+
+def resumo_arquivo(arquivo, inicio=None, fim=None, tamanho=TAMANHO_BLOCO_ARQUIVO):
+    """
+    Gastos por mês, ano e categoria, métricas, tendências e score de saúde
+    de um período de um arquivo de transações (`src.arquivo`) sem carregar
+    o extrato: o cubo e o núcleo de métricas são acumulados em blocos de
+    `tamanho` linhas sobre as colunas em disco
+    """
+    cubo = arquivo.cubo(inicio, fim, tamanho)
+    nucleo = arquivo.nucleo(inicio, fim, tamanho)
+    # Com o cubo e o núcleo prontos, as funções só olham as colunas do extrato
+    colunas = pd.DataFrame(columns=arquivo.meta['colunas'])
+    return {
+        'gasto_mensal': gasto_mensal(colunas, cubo=cubo),
+        'gasto_anual': gasto_anual(colunas, cubo=cubo),
+        'gasto_por_categoria': gasto_por_categoria(colunas, cubo=cubo),
+        'metricas': calcular_metricas_avancadas(colunas, nucleo=nucleo),
+        'tendencias': analisar_tendencias(colunas, nucleo=nucleo),
+        'saude': calcular_saude_financeira(colunas, nucleo=nucleo, cubo=cubo),
+    }
+
+
+def serie_saude_financeira(df, janela=1, cubo=None):
+    """
+    Score de saúde financeira (mesmas regras de `calcular_saude_financeira`)
+    para cada mês ou, com `janela` > 1, para cada janela móvel de `janela`
+    meses, numa passada sobre os agregados mensais do cubo.
+
+    Os meses formam um eixo contínuo (meses sem transação contam na janela)
+    e cada componente sai de somas acumuladas ao longo dele: entradas e
+    gastos, presença de cada categoria e soma e soma dos quadrados do gasto
+    mensal (para o coeficiente de variação). Só entram janelas completas;
+    `mes_ano` é o último mês de cada uma.
+    """
+    cubo = montar_cubo(df) if cubo is None else cubo
+    colunas = [
+        'mes_ano', 'entradas', 'gastos', 'taxa_poupanca', 'categorias_usadas', 'meses_com_gasto',
+        'cv_gastos', 'pontos_poupanca', 'pontos_diversificacao', 'pontos_consistencia', 'score',
+    ]
+    if cubo.empty:
+        return pd.DataFrame(columns=colunas)
+
+    escala = cubo.attrs.get('escala', 1)
+    mes, primeiro, num_meses = eixo_meses(cubo)
+    if janela > num_meses:
+        return pd.DataFrame(columns=colunas)
+
+    gastos = np.bincount(mes, weights=cubo['gastos'].to_numpy(), minlength=num_meses) / escala
+    entradas = np.bincount(mes, weights=cubo['entradas'].to_numpy(), minlength=num_meses) / escala
+    com_gasto = np.bincount(mes, weights=cubo['n_gastos'].to_numpy(), minlength=num_meses) > 0
+
+    # Presença (mês × categoria) das categorias com gasto; sem a coluna
+    # categoria no extrato, o cubo só tem SEM_CATEGORIA e o componente fica fora
+    codigos, categorias = pd.factorize(cubo['categoria'])
+    tem_categoria = len(categorias) and not (categorias == SEM_CATEGORIA).all()
+    presenca = np.zeros((num_meses, max(len(categorias), 1)), dtype=np.int64)
+    usadas = (codigos >= 0) & (cubo['n_gastos'].to_numpy() > 0)
+    presenca[mes[usadas], codigos[usadas]] = 1
+
+    def na_janela(valores):
+        """Soma de cada janela completa, pela diferença de somas acumuladas"""
+        acumulado = np.concatenate([np.zeros((1,) + valores.shape[1:]), np.cumsum(valores, axis=0)])
+        return acumulado[janela:] - acumulado[:-janela]
+
+    # Gasto mensal centrado na média geral antes de elevar ao quadrado:
+    # evita o cancelamento de somas grandes no cálculo da variância
+    referencia = gastos[com_gasto].mean() if com_gasto.any() else 0.0
+    centrado = np.where(com_gasto, gastos - referencia, 0.0)
+    meses_com_gasto = na_janela(com_gasto.astype(np.float64))
+    soma = na_janela(centrado)
+    soma_quadrados = na_janela(centrado * centrado)
+    entradas_janela = na_janela(entradas)
+    gastos_janela = na_janela(gastos)
+    categorias_usadas = (na_janela(presenca) > 0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = referencia + soma / meses_com_gasto
+        variancia = (soma_quadrados - soma * soma / meses_com_gasto) / (meses_com_gasto - 1)
+        cv = np.where(meses_com_gasto > 1, np.sqrt(np.maximum(variancia, 0)) / media, np.nan)
+        taxa_poupanca = np.where(
+            entradas_janela > 0, (entradas_janela - gastos_janela) / entradas_janela * 100, np.nan
+        )
+
+    pontos_poupanca = _pontos_poupanca(taxa_poupanca)
+    pontos_diversificacao = _pontos_diversificacao(categorias_usadas) if tem_categoria else np.zeros(len(cv), dtype=int)
+    pontos_consistencia = _pontos_consistencia(cv, meses_com_gasto)
+    # Sem entradas na janela o score é 0, como em calcular_saude_financeira
+    score = np.where(
+        entradas_janela > 0,
+        np.minimum(pontos_poupanca + pontos_diversificacao + pontos_consistencia, 100),
+        0,
+    )
+
+    fim = np.arange(janela - 1, num_meses)
+    return pd.DataFrame({
+        'mes_ano': rotulos_mes(fim + primeiro),
+        'entradas': entradas_janela,
+        'gastos': gastos_janela,
+        'taxa_poupanca': taxa_poupanca,
+        'categorias_usadas': categorias_usadas,
+        'meses_com_gasto': meses_com_gasto.astype(np.int64),
+        'cv_gastos': cv,
+        'pontos_poupanca': pontos_poupanca,
+        'pontos_diversificacao': pontos_diversificacao,
+        'pontos_consistencia': pontos_consistencia,
+        'score': score,
+    })
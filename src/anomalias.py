@@ -0,0 +1,260 @@
+import numpy as np
+import pandas as pd
+
+from src.cubo import (
+    NS_POR_DIA, SEM_CATEGORIA, agrupar, meses_corridos, rotulos_mes, valores_e_escala
+)
+from src.recorrencia import assinaturas
+
+# Gastos anteriores do mesmo grupo (categoria ou estabelecimento) que
+# servem de referência para cada gasto
+JANELA_TRANSACOES = 20
+
+# Mínimo de gastos anteriores no grupo para pontuar um gasto
+MINIMO_HISTORICO = 5
+
+# Meses anteriores da categoria que servem de referência para cada mês
+JANELA_MESES = 6
+
+# Mínimo de meses anteriores para pontuar um mês
+MINIMO_MESES = 3
+
+# Escore robusto (0,6745 × desvio / MAD) a partir do qual o valor é
+# anômalo, o corte usual de Iglewicz e Hoaglin
+LIMIAR_ESCORE = 3.5
+
+# Piso do MAD: em grupos de valor fixo (assinaturas) o MAD é zero e
+# qualquer centavo de diferença viraria anomalia. Gastos são comparados em
+# escala log (o piso vale ~10% do valor); meses, com 10% da mediana
+PISO_MAD = 0.1
+
+# Diferença mínima (R$) sobre a mediana para um gasto ou mês ser anômalo
+DIFERENCA_MINIMA = 20
+
+# Linhas por bloco na montagem das janelas (memória: bloco × janela)
+BLOCO = 65_536
+
+COLUNAS_TRANSACOES = ['data', 'descricao', 'categoria', 'valor', 'mediana', 'escore', 'referencia']
+COLUNAS_MESES = ['mes_ano', 'categoria', 'gasto', 'mediana', 'escore']
+
+
+def _faixas(chave, posicao):
+    """
+    Ordem por (chave, posição) e, para cada linha ordenada, o início e o
+    fim (exclusivo) da faixa do seu grupo
+    """
+    ordem, grupo, inicios = agrupar(chave, posicao)
+    fins = np.append(inicios[1:], len(ordem))
+    return ordem, inicios[grupo], fins[grupo]
+
+
+def _mediana_linhas(matriz, tamanhos):
+    """Mediana de cada linha de `matriz` ordenada (NaN no fim), com `tamanhos` (>= 1) valores"""
+    linhas = np.arange(len(matriz))
+    return (matriz[linhas, (tamanhos - 1) // 2] + matriz[linhas, tamanhos // 2]) / 2
+
+
+def mediana_mad_rolantes(chave, posicao, valores, janela, minimo):
+    """
+    Mediana e MAD dos `janela` valores anteriores do mesmo grupo (ordem
+    de `posicao`; empates na ordem da entrada), para cada valor. Linhas
+    com menos de `minimo` anteriores ficam NaN.
+
+    As janelas de todas as linhas viram uma matriz (linha × janela, NaN
+    onde o grupo ainda não tem histórico) montada e ordenada por blocos;
+    mediana e MAD saem por posição nas linhas ordenadas.
+    """
+    n = len(valores)
+    mediana = np.full(n, np.nan)
+    mad = np.full(n, np.nan)
+    if not n:
+        return mediana, mad
+
+    ordem, inicio, _ = _faixas(chave, posicao)
+    ordenados = valores[ordem].astype(np.float64)
+    deslocamentos = np.arange(-janela, 0)
+    mediana_ordenada = np.full(n, np.nan)
+    mad_ordenado = np.full(n, np.nan)
+    for de in range(0, n, BLOCO):
+        linhas = np.arange(de, min(de + BLOCO, n))
+        tamanhos = np.minimum(linhas - inicio[linhas], janela)
+        com_historico = tamanhos >= minimo
+        linhas, tamanhos = linhas[com_historico], tamanhos[com_historico]
+        if not len(linhas):
+            continue
+        indices = linhas[:, None] + deslocamentos
+        matriz = np.where(
+            indices >= inicio[linhas, None], ordenados[np.maximum(indices, 0)], np.nan
+        )
+        matriz.sort(axis=1)
+        centro = _mediana_linhas(matriz, tamanhos)
+        desvios = np.abs(matriz - centro[:, None])
+        desvios.sort(axis=1)
+        mediana_ordenada[linhas] = centro
+        mad_ordenado[linhas] = _mediana_linhas(desvios, tamanhos)
+
+    mediana[ordem] = mediana_ordenada
+    mad[ordem] = mad_ordenado
+    return mediana, mad
+
+
+def _escore(desvio, mad, piso):
+    """Escore robusto (z modificado) de um desvio sobre a mediana"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 0.6745 * desvio / np.maximum(mad, piso)
+
+
+def _ultimos_por_grupo(chave, posicao, quantidade):
+    """Máscara das `quantidade` últimas linhas (em `posicao`) de cada grupo"""
+    manter = np.zeros(len(chave), dtype=bool)
+    if len(chave):
+        ordem, _, fim = _faixas(chave, posicao)
+        manter[ordem] = fim - np.arange(len(ordem)) <= quantidade
+    return manter
+
+
+def _anomalo(valores, mediana, escore, escala):
+    """Acima do limiar de escore e pelo menos DIFERENCA_MINIMA acima da mediana"""
+    return (escore >= LIMIAR_ESCORE) & (valores - mediana >= DIFERENCA_MINIMA * escala)
+
+
+class MotorAnomalias:
+    """
+    Gastos e meses fora do padrão, por categoria e por estabelecimento
+    (assinatura da descrição, como em `src.recorrencia`).
+
+    Cada gasto é comparado com os JANELA_TRANSACOES gastos anteriores do
+    mesmo grupo (mediana e MAD, robustos a outros outliers); cada mês de
+    cada categoria, com os JANELA_MESES meses anteriores. Do histórico o
+    motor guarda só a cauda de cada grupo e os totais mensais, então
+    `atualizar` pontua transações novas sem reprocessar o extrato todo.
+    """
+
+    def __init__(self, df=None):
+        self.escala = None
+        self.ultimo_dia = None
+        self._caudas = {
+            referencia: pd.DataFrame({'chave': pd.Series(dtype=object), 'dia': np.zeros(0, np.int64),
+                                      'valor': np.zeros(0)})
+            for referencia in ('categoria', 'estabelecimento')
+        }
+        self._gasto_mensal = pd.Series(dtype=np.float64, index=pd.MultiIndex.from_arrays(
+            [np.zeros(0, np.int64), np.zeros(0, object)], names=['mes', 'categoria']
+        ))
+        self.transacoes = pd.DataFrame(columns=COLUNAS_TRANSACOES)
+        self.meses = pd.DataFrame(columns=COLUNAS_MESES)
+        if df is not None:
+            self.atualizar(df)
+
+    def atualizar(self, novas):
+        """
+        Pontua as transações de `novas` (todas na data da última vista ou
+        depois) contra o histórico guardado e refaz a tabela de meses.
+        Retorna as anomalias encontradas entre as novas.
+        """
+        valores, escala = valores_e_escala(novas)
+        valores = valores.to_numpy(dtype=np.int64 if escala != 1 else np.float64)
+        if self.escala is not None and escala != self.escala:
+            raise ValueError("as transações novas precisam vir na mesma unidade (valor_centavos) do histórico")
+        self.escala = escala
+        gasto = valores < 0
+        if not gasto.any():
+            return self.transacoes.iloc[:0]
+
+        datas = novas['data'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        dias = datas[gasto] // NS_POR_DIA
+        if self.ultimo_dia is not None and dias.min() < self.ultimo_dia:
+            raise ValueError("as transações novas precisam ser da última data vista em diante")
+        self.ultimo_dia = int(dias.max())
+
+        posicoes = np.flatnonzero(gasto)
+        valor = -valores[posicoes].astype(np.float64)
+        if 'categoria' in novas.columns:
+            categoria = novas['categoria'].iloc[posicoes].astype(object).fillna(SEM_CATEGORIA).to_numpy()
+        else:
+            categoria = np.full(len(posicoes), SEM_CATEGORIA, dtype=object)
+        chaves = {
+            'categoria': categoria,
+            'estabelecimento': assinaturas(novas['descricao'].iloc[posicoes]),
+        }
+
+        escores = {}
+        for referencia, chave in chaves.items():
+            cauda = self._caudas[referencia]
+            historico = len(cauda)
+            todas_chaves = np.concatenate([cauda['chave'].to_numpy(dtype=object), chave.astype(object)])
+            todos_dias = np.concatenate([cauda['dia'].to_numpy(), dias])
+            todos_valores = np.concatenate([cauda['valor'].to_numpy(), valor])
+            # Em escala log: gastos variam em proporção, não em reais
+            mediana, mad = mediana_mad_rolantes(
+                todas_chaves, todos_dias, np.log(todos_valores), JANELA_TRANSACOES, MINIMO_HISTORICO
+            )
+            mediana, mad = mediana[historico:], mad[historico:]
+            escores[referencia] = (np.exp(mediana), _escore(np.log(valor) - mediana, mad, PISO_MAD))
+            manter = _ultimos_por_grupo(todas_chaves, todos_dias, JANELA_TRANSACOES)
+            self._caudas[referencia] = pd.DataFrame({
+                'chave': todas_chaves[manter], 'dia': todos_dias[manter], 'valor': todos_valores[manter],
+            })
+
+        # Cada gasto fica com a referência (categoria ou estabelecimento) em
+        # que ficou mais fora do padrão
+        mediana_categoria, escore_categoria = escores['categoria']
+        mediana_estabelecimento, escore_estabelecimento = escores['estabelecimento']
+        anomalo_categoria = _anomalo(valor, mediana_categoria, escore_categoria, escala)
+        anomalo_estabelecimento = _anomalo(valor, mediana_estabelecimento, escore_estabelecimento, escala)
+        pelo_estabelecimento = anomalo_estabelecimento & (
+            ~anomalo_categoria | (escore_estabelecimento > escore_categoria)
+        )
+        selecionados = np.flatnonzero(anomalo_categoria | anomalo_estabelecimento)
+        via = pelo_estabelecimento[selecionados]
+        encontradas = pd.DataFrame({
+            'data': novas['data'].iloc[posicoes[selecionados]].to_numpy(),
+            'descricao': novas['descricao'].iloc[posicoes[selecionados]].astype(object).to_numpy(),
+            'categoria': categoria[selecionados],
+            'valor': valor[selecionados] / escala,
+            'mediana': np.where(via, mediana_estabelecimento[selecionados],
+                                mediana_categoria[selecionados]) / escala,
+            'escore': np.where(via, escore_estabelecimento[selecionados], escore_categoria[selecionados]),
+            'referencia': np.where(via, 'estabelecimento', 'categoria'),
+        })
+        if len(encontradas):
+            self.transacoes = pd.concat([self.transacoes, encontradas], ignore_index=True) \
+                if len(self.transacoes) else encontradas
+
+        mes = meses_corridos(novas['ano'].to_numpy()[posicoes], novas['mes'].to_numpy()[posicoes])
+        novos_totais = pd.Series(valor).groupby([mes, categoria]).sum()
+        novos_totais.index.names = ['mes', 'categoria']
+        self._gasto_mensal = self._gasto_mensal.add(novos_totais, fill_value=0)
+        self.meses = self._pontuar_meses()
+        return encontradas
+
+    def _pontuar_meses(self):
+        """Gasto de cada (mês, categoria) contra os meses anteriores da categoria"""
+        if self._gasto_mensal.empty:
+            return pd.DataFrame(columns=COLUNAS_MESES)
+        # Eixo de meses contínuo: mês sem gasto na categoria conta como zero
+        mensal = self._gasto_mensal.unstack('categoria', fill_value=0)
+        mensal = mensal.reindex(np.arange(mensal.index.min(), mensal.index.max() + 1), fill_value=0)
+        num_meses, num_categorias = mensal.shape
+        gasto = mensal.to_numpy().T.ravel()
+        chave = np.repeat(np.arange(num_categorias), num_meses)
+        posicao = np.tile(np.arange(num_meses), num_categorias)
+        mediana, mad = mediana_mad_rolantes(chave, posicao, gasto, JANELA_MESES, MINIMO_MESES)
+        escore = _escore(gasto - mediana, mad, PISO_MAD * mediana)
+
+        selecionados = np.flatnonzero((mediana > 0) & _anomalo(gasto, mediana, escore, self.escala))
+        meses = mensal.index.to_numpy()[posicao[selecionados]]
+        meses = pd.DataFrame({
+            'mes_ano': rotulos_mes(meses),
+            'categoria': mensal.columns.to_numpy()[chave[selecionados]],
+            'gasto': gasto[selecionados] / self.escala,
+            'mediana': mediana[selecionados] / self.escala,
+            'escore': escore[selecionados],
+        })
+        return meses.sort_values(['mes_ano', 'escore'], ascending=[True, False], ignore_index=True)
+
+
+def detectar_anomalias(df):
+    """Gastos e meses fora do padrão do extrato inteiro (`MotorAnomalias`)"""
+    motor = MotorAnomalias(df)
+    return motor.transacoes, motor.meses
@@ -0,0 +1,253 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.calendario import COLUNAS_TRANSACAO, atributos_calendario, dias_desde_epoca, meses_corridos_dos_dias
+from src.cubo import NS_POR_DIA, SEM_CATEGORIA, montar_cubo_em_blocos
+from src.metricas import nucleo_em_blocos
+
+VERSAO_ARQUIVO = 2
+
+# Marcador de saldo ausente na coluna int64 de centavos
+SALDO_AUSENTE = np.iinfo(np.int64).min
+
+# Linhas por bloco nas agregações que percorrem o arquivo
+TAMANHO_BLOCO_ARQUIVO = 1_000_000
+
+_COLUNAS_FIXAS = {
+    'dia': np.int32,
+    'valor_centavos': np.int64,
+    'saldo_centavos': np.int64,
+    'categoria': np.int32,
+    'historico': np.int32,
+    'descricao': np.int32,
+}
+
+
+def _codificar(serie):
+    """Códigos inteiros + valores distintos (texto) de uma coluna"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), [str(v) for v in serie.cat.categories]
+    codigos, valores = pd.factorize(serie)
+    return codigos, [str(v) for v in valores]
+
+
+def para_json(valor):
+    """Conversão para JSON de valores que o `json` não conhece (escalares NumPy)"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+def _centavos(df, coluna):
+    if f'{coluna}_centavos' in df.columns:
+        centavos = df[f'{coluna}_centavos']
+    else:
+        centavos = pd.Series((df[coluna] * 100).round(), index=df.index).astype('Int64')
+    return centavos.to_numpy(dtype='int64', na_value=SALDO_AUSENTE)
+
+
+def salvar_arquivo(df, diretorio):
+    """
+    Grava transações processadas como arquivo em disco: uma coluna NumPy de
+    largura fixa por arquivo `.npy` (dias, centavos, códigos de categoria)
+    e as descrições distintas num heap de bytes UTF-8 com offsets.
+
+    As linhas ficam ordenadas por data, o que permite recortar períodos por
+    busca binária. As colunas e os `attrs` do DataFrame vão no `meta.json`,
+    para `ArquivoTransacoes.frame` devolvê-lo igual. Substitui o arquivo
+    existente de forma atômica.
+    """
+    diretorio = Path(diretorio)
+    df = df.sort_values('data', kind='mergesort')
+
+    colunas = {
+        'dia': dias_desde_epoca(df['data']),
+        'valor_centavos': _centavos(df, 'valor'),
+        'saldo_centavos': _centavos(df, 'saldo'),
+    }
+    textos = {}
+    for col in ('categoria', 'historico', 'descricao'):
+        if col in df.columns:
+            colunas[col], textos[col] = _codificar(df[col])
+        else:
+            colunas[col], textos[col] = np.full(len(df), -1), []
+
+    diretorio.parent.mkdir(parents=True, exist_ok=True)
+    temporario = Path(tempfile.mkdtemp(dir=diretorio.parent, prefix='.arquivo-'))
+    for col, tipo in _COLUNAS_FIXAS.items():
+        np.save(temporario / f'{col}.npy', np.asarray(colunas[col], dtype=tipo))
+
+    # Heap de descrições: bytes concatenados + offset de início de cada uma
+    codificadas = [d.encode('utf-8') for d in textos.pop('descricao')]
+    offsets = np.zeros(len(codificadas) + 1, dtype=np.int64)
+    np.cumsum([len(d) for d in codificadas], out=offsets[1:])
+    np.save(temporario / 'descricao_offsets.npy', offsets)
+    (temporario / 'descricao_heap.bin').write_bytes(b''.join(codificadas))
+
+    meta = {
+        'versao': VERSAO_ARQUIVO, 'linhas': len(df), 'colunas': list(df.columns), 'attrs': df.attrs, **textos,
+    }
+    (temporario / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, default=para_json), encoding='utf-8')
+
+    if diretorio.exists():
+        antigo = diretorio.with_name(f'.{diretorio.name}.antigo')
+        os.replace(diretorio, antigo)
+        os.replace(temporario, diretorio)
+        shutil.rmtree(antigo, ignore_errors=True)
+    else:
+        os.replace(temporario, diretorio)
+    return ArquivoTransacoes(diretorio)
+
+
+class ArquivoTransacoes:
+    """
+    Arquivo de transações em disco aberto por memory-map.
+
+    Abrir só lê o `meta.json`; as colunas são mapeadas sob demanda e o
+    sistema operacional carrega apenas as páginas tocadas. Recortes por
+    período viram fatias (views) das colunas, sem cópia, e `cubo`/`nucleo`
+    agregam um período em blocos sem montar o DataFrame.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self.meta = json.loads((self.diretorio / 'meta.json').read_text(encoding='utf-8'))
+        self._colunas = {}
+        self._descricoes = None
+
+    def __len__(self):
+        return self.meta['linhas']
+
+    def coluna(self, nome):
+        """Coluna inteira como np.memmap (somente leitura)"""
+        if nome not in self._colunas:
+            self._colunas[nome] = np.load(self.diretorio / f'{nome}.npy', mmap_mode='r')
+        return self._colunas[nome]
+
+    def posicoes(self, inicio=None, fim=None):
+        """Fatia de linhas entre duas datas (inclusive), por busca binária"""
+        dias = self.coluna('dia')
+        primeira = 0 if inicio is None else int(np.searchsorted(dias, dias_desde_epoca([pd.Timestamp(inicio)])[0], 'left'))
+        ultima = len(self) if fim is None else int(np.searchsorted(dias, dias_desde_epoca([pd.Timestamp(fim)])[0], 'right'))
+        return slice(primeira, ultima)
+
+    def _heap(self):
+        if self._descricoes is None:
+            self._descricoes = (
+                np.load(self.diretorio / 'descricao_offsets.npy', mmap_mode='r'),
+                np.memmap(self.diretorio / 'descricao_heap.bin', dtype=np.uint8, mode='r')
+                if (self.diretorio / 'descricao_heap.bin').stat().st_size else np.zeros(0, np.uint8),
+            )
+        return self._descricoes
+
+    def descricoes(self, codigos):
+        """Decodifica do heap apenas as descrições dos códigos pedidos"""
+        offsets, heap = self._heap()
+        return [bytes(heap[offsets[c]:offsets[c + 1]]).decode('utf-8') for c in codigos]
+
+    def frame(self, inicio=None, fim=None, com_descricao=False):
+        """
+        DataFrame no formato do preprocess (compacto, com centavos) para um
+        período, com as colunas e os `attrs` do DataFrame salvo. As colunas
+        numéricas são views do memory-map; só o calendário, as categorias e
+        (opcionalmente) as descrições do período são materializados.
+        """
+        df = self._frame(self.posicoes(inicio, fim), com_descricao)
+        df.attrs.update(self.meta['attrs'])
+        return df
+
+    def _frame(self, fatia, com_descricao=False):
+        dias = self.coluna('dia')[fatia]
+        valor_centavos = self.coluna('valor_centavos')[fatia]
+        saldo_centavos = self.coluna('saldo_centavos')[fatia]
+        saldo_ausente = saldo_centavos == SALDO_AUSENTE
+
+        colunas = {
+            'data': (np.asarray(dias, dtype=np.int64) * NS_POR_DIA).view('datetime64[ns]'),
+            'historico': self._categorico(self.coluna('historico')[fatia], self.meta['historico']),
+        }
+        if com_descricao:
+            codigos = np.asarray(self.coluna('descricao')[fatia])
+            if len(codigos) == len(self):
+                # Arquivo inteiro: os códigos já indexam o heap
+                colunas['descricao'] = pd.Categorical.from_codes(codigos, self.descricoes(range(len(self._heap()[0]) - 1)))
+            else:
+                distintos, locais = np.unique(codigos, return_inverse=True)
+                colunas['descricao'] = pd.Categorical.from_codes(locais, self.descricoes(distintos))
+        colunas.update({
+            'valor': valor_centavos / 100,
+            'saldo': np.where(saldo_ausente, np.nan, saldo_centavos / 100),
+            'valor_centavos': valor_centavos,
+            'saldo_centavos': pd.arrays.IntegerArray(np.asarray(saldo_centavos), saldo_ausente),
+            'dia': dias,
+            **atributos_calendario(dias, COLUNAS_TRANSACAO),
+            'categoria': self._categorico(self.coluna('categoria')[fatia], self.meta['categoria']),
+        })
+        return pd.DataFrame({c: colunas[c] for c in self.meta['colunas'] if c in colunas}, copy=False)
+
+    @staticmethod
+    def _categorico(codigos, valores):
+        # Coluna ausente ao salvar: códigos -1 e nenhuma categoria (tudo vazio)
+        return pd.Categorical.from_codes(np.asarray(codigos), pd.Index(valores, dtype=object))
+
+    def blocos(self, inicio=None, fim=None, tamanho=TAMANHO_BLOCO_ARQUIVO):
+        """Fatias de até `tamanho` linhas que cobrem o período"""
+        fatia = self.posicoes(inicio, fim)
+        for primeira in range(fatia.start, fatia.stop, tamanho):
+            yield slice(primeira, min(primeira + tamanho, fatia.stop))
+
+    def _colunas_agregacao(self, inicio, fim, tamanho, vazia):
+        """
+        (dias, centavos, códigos de categoria) de cada bloco do período,
+        lidos do memory-map; sem categoria salva, os códigos são `vazia`
+        """
+        categorizado = 'categoria' in self.meta['colunas']
+        for bloco in self.blocos(inicio, fim, tamanho):
+            dias = np.asarray(self.coluna('dia')[bloco])
+            codigos = np.asarray(self.coluna('categoria')[bloco]) if categorizado else np.full(len(dias), vazia)
+            yield dias, np.asarray(self.coluna('valor_centavos')[bloco]), codigos
+
+    def _extremos(self, inicio, fim):
+        """Primeiro e último dia do período (None se vazio)"""
+        fatia = self.posicoes(inicio, fim)
+        if fatia.start >= fatia.stop:
+            return None
+        dias = self.coluna('dia')
+        return int(dias[fatia.start]), int(dias[fatia.stop - 1])
+
+    def cubo(self, inicio=None, fim=None, tamanho=TAMANHO_BLOCO_ARQUIVO):
+        """
+        Cubo de agregação do período (o de `src.cubo.montar_cubo` sobre
+        `frame(inicio, fim)`), acumulado em blocos de `tamanho` linhas das
+        colunas de dias, centavos e códigos de categoria. A memória usada
+        fica limitada ao bloco mais as células do cubo.
+        """
+        if 'categoria' in self.meta['colunas']:
+            # Categoria vazia (código -1) vai para a célula None, como no montar_cubo
+            categorias = np.append(np.asarray(self.meta['categoria'], dtype=object), None)
+        else:
+            categorias = np.array([SEM_CATEGORIA], dtype=object)
+        extremos = self._extremos(inicio, fim)
+        primeiro, ultimo = meses_corridos_dos_dias(extremos) if extremos else (0, -1)
+        blocos = (
+            (meses_corridos_dos_dias(dias), valores, np.where(codigos < 0, len(categorias) - 1, codigos))
+            for dias, valores, codigos in self._colunas_agregacao(inicio, fim, tamanho, 0)
+        )
+        return montar_cubo_em_blocos(blocos, int(primeiro), int(ultimo), categorias)
+
+    def nucleo(self, inicio=None, fim=None, tamanho=TAMANHO_BLOCO_ARQUIVO):
+        """
+        Núcleo de métricas do período (o de `src.metricas.nucleo_metricas`
+        sobre `frame(inicio, fim)`), acumulado em blocos de `tamanho` linhas
+        """
+        extremos = self._extremos(inicio, fim)
+        if extremos is None:
+            return nucleo_em_blocos([], 0, 0)
+        categorias = self.meta['categoria'] if 'categoria' in self.meta['colunas'] else None
+        return nucleo_em_blocos(self._colunas_agregacao(inicio, fim, tamanho, -1), *extremos, categorias)
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.arquivo import VERSAO_ARQUIVO, ArquivoTransacoes, para_json, salvar_arquivo
+
+# Diretório padrão do cache (pode ser trocado pela variável de ambiente)
+DIRETORIO_CACHE = Path(os.environ.get('LUMEN_CACHE_DIR', Path.home() / '.cache' / 'lumen'))
+
+# Tamanho máximo do cache em disco antes de descartar os menos usados
+TAMANHO_MAXIMO_CACHE = 512 * 1024 * 1024
+
+# Máximo de descrições guardadas no cache de comerciantes
+TAMANHO_MAXIMO_COMERCIANTES = 500_000
+
+_BLOCO_HASH = 1024 * 1024
+
+# Parâmetros por consulta IN (...) no SQLite
+_LOTE_SQLITE = 900
+
+
+def hash_conteudo(file):
+    """SHA-256 dos bytes do extrato (arquivo em disco ou upload em memória)"""
+    sha = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            for bloco in iter(lambda: f.read(_BLOCO_HASH), b''):
+                sha.update(bloco)
+    elif hasattr(file, 'getbuffer'):
+        sha.update(file.getbuffer())
+    elif hasattr(file, 'getvalue'):
+        sha.update(file.getvalue())
+    else:
+        sha.update(file.read())
+        file.seek(0)
+    return sha.hexdigest()
+
+
+def _serializar_coluna(nome, serie, arrays):
+    """
+    Converte uma coluna em arrays NumPy de tipo fixo. Textos são
+    codificados em dicionário (códigos + valores distintos).
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        arrays[f'{nome}__codigos'] = serie.cat.codes.to_numpy()
+        arrays[f'{nome}__valores'] = np.asarray(serie.cat.categories, dtype=str)
+        return 'categoria'
+    if pd.api.types.is_datetime64_dtype(serie.dtype):
+        arrays[nome] = serie.to_numpy(dtype='datetime64[ns]')
+        return 'data'
+    if isinstance(serie.dtype, pd.Int64Dtype):
+        arrays[nome] = serie.to_numpy(dtype='int64', na_value=0)
+        arrays[f'{nome}__nulos'] = serie.isna().to_numpy()
+        return 'inteiro_nulavel'
+    if serie.dtype == object:
+        codigos, valores = pd.factorize(serie)
+        arrays[f'{nome}__codigos'] = codigos.astype(np.int32)
+        arrays[f'{nome}__valores'] = np.asarray(valores, dtype=str)
+        return 'texto'
+    arrays[nome] = serie.to_numpy()
+    return 'numero'
+
+
+def _desserializar_coluna(nome, tipo, arrays):
+    if tipo in ('categoria', 'texto'):
+        valores = arrays[f'{nome}__valores'].astype(object)
+        coluna = pd.Categorical.from_codes(arrays[f'{nome}__codigos'], valores)
+        return coluna if tipo == 'categoria' else np.asarray(coluna, dtype=object)
+    if tipo == 'inteiro_nulavel':
+        return pd.arrays.IntegerArray(arrays[nome], arrays[f'{nome}__nulos'])
+    return arrays[nome]
+
+
+def salvar_frame(caminho, df):
+    """Grava o DataFrame em formato colunar .npz (sem compressão)"""
+    arrays = {'__indice': df.index.to_numpy()}
+    tipos = {col: _serializar_coluna(col, df[col], arrays) for col in df.columns}
+    meta = {'colunas': list(df.columns), 'tipos': tipos, 'attrs': df.attrs}
+    arrays['__meta'] = np.array(json.dumps(meta, default=para_json))
+
+    # Grava em arquivo temporário e renomeia, para leituras concorrentes
+    # nunca verem um arquivo pela metade
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, suffix='.npz')
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temporario, caminho)
+
+
+def ler_frame(caminho):
+    """Lê um DataFrame gravado por `salvar_frame`"""
+    with np.load(caminho, allow_pickle=False) as arrays:
+        meta = json.loads(arrays['__meta'].item())
+        df = pd.DataFrame(
+            {col: _desserializar_coluna(col, meta['tipos'][col], arrays) for col in meta['colunas']},
+            index=arrays['__indice']
+        )
+    df.attrs.update(meta['attrs'])
+    return df
+
+
+def _ler_arquivo(diretorio):
+    """Extrato inteiro de um arquivo de transações; de outra versão do formato, ValueError"""
+    arquivo = ArquivoTransacoes(diretorio)
+    if arquivo.meta.get('versao') != VERSAO_ARQUIVO:
+        raise ValueError(f'Arquivo na versão {arquivo.meta.get("versao")}')
+    return arquivo.frame(com_descricao=True)
+
+
+def _salvar_arquivo(diretorio, df):
+    salvar_arquivo(df, diretorio)
+
+
+class CacheExtratos:
+    """
+    Cache em disco de extratos processados, endereçado pelo conteúdo do
+    arquivo enviado.
+
+    Cada extrato ocupa um diretório com o hash dos bytes:
+    - `base/`: resultado do preprocess (não depende das regras), como
+      arquivo de transações (`src.arquivo`): reabrir só mapeia as colunas
+    - `categorias-<versao>.npz`: categorização feita com uma versão das regras
+
+    Assim uma mudança nas regras só refaz a categorização. Entradas são
+    descartadas por ordem de último uso quando o total passa do limite.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+        self.diretorio = Path(diretorio)
+        self.tamanho_maximo = tamanho_maximo
+
+    def _entrada(self, chave):
+        return self.diretorio / chave
+
+    def _ler(self, caminho, ler=ler_frame):
+        try:
+            df = ler(caminho)
+        except (OSError, ValueError, KeyError):
+            return None
+        # Marca o uso da entrada para o descarte por LRU
+        os.utime(caminho.parent)
+        return df
+
+    def _salvar(self, caminho, df, salvar=salvar_frame):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        salvar(caminho, df)
+        os.utime(caminho.parent)
+        self.podar()
+
+    def ler_base(self, chave):
+        return self._ler(self._entrada(chave) / 'base', _ler_arquivo)
+
+    def salvar_base(self, chave, df):
+        self._salvar(self._entrada(chave) / 'base', df, _salvar_arquivo)
+
+    def ler_categorias(self, chave, versao):
+        df = self._ler(self._entrada(chave) / f'categorias-{versao}.npz')
+        return None if df is None else df['categoria']
+
+    def salvar_categorias(self, chave, versao, categorias):
+        entrada = self._entrada(chave)
+        # Categorizações de versões antigas das regras não servem mais
+        for antigo in entrada.glob('categorias-*.npz'):
+            antigo.unlink(missing_ok=True)
+        self._salvar(entrada / f'categorias-{versao}.npz', categorias.to_frame('categoria'))
+
+    def podar(self):
+        """Descarta as entradas usadas há mais tempo até caber no limite"""
+        if not self.diretorio.exists():
+            return
+        entradas = []
+        for entrada in self.diretorio.iterdir():
+            if entrada.is_dir():
+                tamanho = sum(f.stat().st_size for f in entrada.rglob('*') if f.is_file())
+                entradas.append((entrada.stat().st_mtime, tamanho, entrada))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, entrada in sorted(entradas, key=lambda e: e[0]):
+            if total <= self.tamanho_maximo:
+                break
+            shutil.rmtree(entrada, ignore_errors=True)
+            total -= tamanho
+
+
+class CacheComerciantes:
+    """
+    Cache em disco (SQLite) de descrição normalizada → categoria,
+    compartilhado por todas as sessões e processos.
+
+    Cada entrada guarda a versão das regras que a produziu; entradas de
+    outra versão contam como falta e são sobrescritas. Acima do limite de
+    entradas, as usadas há mais tempo são descartadas.
+
+    O banco fica em modo WAL (leitores não bloqueiam o escritor) e cada
+    thread usa a sua própria conexão.
+    """
+
+    def __init__(self, caminho=None, tamanho_maximo=TAMANHO_MAXIMO_COMERCIANTES):
+        self.caminho = Path(caminho) if caminho else DIRETORIO_CACHE / 'comerciantes.sqlite3'
+        self.tamanho_maximo = tamanho_maximo
+        self._local = threading.local()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS comerciantes ('
+                'descricao TEXT PRIMARY KEY, categoria TEXT NOT NULL, '
+                'versao TEXT NOT NULL, ultimo_uso REAL NOT NULL) WITHOUT ROWID'
+            )
+            conexao.execute('CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON comerciantes (ultimo_uso)')
+            self._local.conexao = conexao
+        return conexao
+
+    def buscar(self, descricoes, versao):
+        """
+        Busca em lote as categorias de descrições já normalizadas. Retorna
+        um dict descrição → categoria só com as encontradas nesta versão.
+        """
+        descricoes = list(dict.fromkeys(descricoes))
+        conexao = self._conexao()
+        encontradas = {}
+        for inicio in range(0, len(descricoes), _LOTE_SQLITE):
+            lote = descricoes[inicio:inicio + _LOTE_SQLITE]
+            marcadores = ','.join('?' * len(lote))
+            encontradas.update(conexao.execute(
+                f'SELECT descricao, categoria FROM comerciantes '
+                f'WHERE versao = ? AND descricao IN ({marcadores})',
+                [versao, *lote]
+            ).fetchall())
+
+        if encontradas:
+            # Marca o uso para o descarte por LRU
+            agora = time.time()
+            with conexao:
+                conexao.executemany(
+                    'UPDATE comerciantes SET ultimo_uso = ? WHERE descricao = ?',
+                    [(agora, d) for d in encontradas]
+                )
+        with self._trava:
+            self.acertos += len(encontradas)
+            self.faltas += len(descricoes) - len(encontradas)
+        return encontradas
+
+    def guardar(self, pares, versao):
+        """Grava (descrição normalizada, categoria) e poda o excesso"""
+        conexao = self._conexao()
+        agora = time.time()
+        with conexao:
+            conexao.executemany(
+                'INSERT OR REPLACE INTO comerciantes (descricao, categoria, versao, ultimo_uso) '
+                'VALUES (?, ?, ?, ?)',
+                [(d, c, versao, agora) for d, c in pares]
+            )
+            excesso = conexao.execute('SELECT COUNT(*) FROM comerciantes').fetchone()[0] - self.tamanho_maximo
+            if excesso > 0:
+                conexao.execute(
+                    'DELETE FROM comerciantes WHERE descricao IN '
+                    '(SELECT descricao FROM comerciantes ORDER BY ultimo_uso LIMIT ?)',
+                    (excesso,)
+                )
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.faltas
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            }
+
+
+def cache_ativado():
+    """
+    Caches em disco só quando pedidos (variável de ambiente LUMEN_CACHE=1):
+    eles guardam dados dos extratos e são compartilhados por todas as
+    sessões do servidor
+    """
+    return os.environ.get('LUMEN_CACHE', '0') == '1'
+
+
+def cache_padrao():
+    """Cache usado pelo app, se ativado (LUMEN_CACHE=1)"""
+    if not cache_ativado():
+        return None
+    return CacheExtratos()
+
+
+_comerciantes = None
+
+
+def comerciantes_padrao():
+    """
+    Cache de comerciantes do processo (uma instância para todas as sessões),
+    ativado junto com o cache de extratos (LUMEN_CACHE=1)
+    """
+    global _comerciantes
+    if not cache_ativado():
+        return None
+    if _comerciantes is None:
+        _comerciantes = CacheComerciantes()
+    return _comerciantes
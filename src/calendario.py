@@ -0,0 +1,79 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+NOMES_DIAS_SEMANA = [
+    'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira',
+    'Sexta-feira', 'Sábado', 'Domingo'
+]
+NOMES_MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+# Colunas de calendário que o preprocess grava em cada transação
+COLUNAS_TRANSACAO = ('ano', 'mes', 'mes_ano', 'semestre')
+
+_EPOCA = np.datetime64('1970-01-01', 'D')
+
+
+def dias_desde_epoca(datas):
+    """Converte datas em número de dias desde 1970-01-01 (int32)"""
+    return np.asarray(datas, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int32)
+
+
+def meses_corridos_dos_dias(dias):
+    """Mês corrido (ano × 12 + mês - 1) de dias desde 1970-01-01"""
+    return np.asarray(dias).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) + 1970 * 12
+
+
+@lru_cache(maxsize=32)
+def construir_calendario(dia_inicio, dia_fim):
+    """
+    Tabela com uma linha por dia entre `dia_inicio` e `dia_fim` (dias desde
+    1970-01-01), com todos os atributos de calendário já calculados.
+
+    A tabela é pequena (uma linha por dia do extrato) e fica em cache, então
+    não deve ser alterada por quem a recebe.
+    """
+    dias = np.arange(dia_inicio, dia_fim + 1, dtype=np.int32)
+    datas = pd.DatetimeIndex(_EPOCA + dias.astype('timedelta64[D]'))
+    mes = datas.month.to_numpy().astype(np.int8)
+    dia_semana = datas.dayofweek.to_numpy().astype(np.int8)
+    mes_ano = datas.strftime('%Y-%m')
+
+    return pd.DataFrame({
+        'dia': dias,
+        'data': datas,
+        'ano': datas.year.to_numpy().astype(np.int16),
+        'mes': mes,
+        'semestre': np.where(mes <= 6, 1, 2).astype(np.int8),
+        'semana_iso': datas.isocalendar().week.to_numpy().astype(np.int8),
+        'dia_semana': dia_semana,
+        'nome_dia_semana': pd.Categorical.from_codes(dia_semana, NOMES_DIAS_SEMANA, ordered=True),
+        'nome_mes': pd.Categorical.from_codes(mes - 1, NOMES_MESES, ordered=True),
+        'mes_ano': pd.Categorical(mes_ano, categories=mes_ano.unique()),
+    })
+
+
+def atributos_calendario(dias, colunas):
+    """
+    Busca atributos de calendário para um array de dias (desde a época).
+
+    Em vez de derivar cada atributo linha a linha, monta o calendário do
+    intervalo coberto e faz um gather pela posição do dia. Retorna um dict
+    coluna → array.
+    """
+    dias = np.asarray(dias)
+    inicio = int(dias.min()) if len(dias) else 0
+    fim = int(dias.max()) if len(dias) else 0
+    calendario = construir_calendario(inicio, fim)
+    posicao = dias - inicio
+    return {col: calendario[col].array.take(posicao) for col in colunas}
+
+
+def atributo_calendario(dias, coluna):
+    """Um único atributo de calendário como Series alinhada com `dias`"""
+    valores = atributos_calendario(dias, [coluna])[coluna]
+    return pd.Series(valores, index=getattr(dias, 'index', None), name=coluna)
@@ -0,0 +1,659 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque, namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Palavras-chave por categoria. A ordem importa: a primeira categoria com
+# alguma palavra contida na descrição vence.
+CATEGORIAS = {
+    'Alimentação': [
+        'ifood', 'quentinhas', 'sabor', 'macarons', 'nino', 'loucos por burger', 
+        'biscoitos', 'rappi', 'bolos', 'uber eats', 'restaurante', 'lanchonete',
+        'padaria', 'dog', 'mcdonalds', 'mc donald', 'sucoetal', 'bacio', 'bauducco', 
+        'lancheteria', 'benedito', 'veloce', 'creperia', 'pica-pau', 'marmitexleo', 
+        'mercado', 'taguatinga', 'supermercado', 'açougue', 'hortifruti',
+        'pizza', 'burger', 'distribuidora', 'fini', 'casa do pao', 'pao', 
+        'big box', 'burguer', 'imperio dos paes', 'bobs', 
+        'subway', 'giraffas', 'outback', 'dominos', 'torta', 'dona', 
+        'abbraccio', 'coco bambu', 'spoleto', 'habibs', 'leonardobianoda',
+        'american cookies', 'sorbe', 'cafe', 'bakery', 'pao de acucar', 
+        'carrefour', 'extra', 'walmart', 'assai', 'luzia de fatima miranda', 
+        'atacadao'
+    ],
+    'Transporte': [
+        'uber', 'iguatemi', 'car', 'combustiveis', 'estacionament', 'lyft', 
+        'cabify', '99', 'taxi', 'combustivel', 'gasolina', 'posto', 'park', 
+        'parkshopping', 'petronorte', 'shell', 'boulevard', 'ipiranga', 
+        'br petroleo', 'petrobras', 'gmcm', 'estacionamento', 'valet', 'onibus', 
+        'metro', 'metrô', 'transporte', 'pedágio', 'pedagio', 'viacard', 
+        'carlos ieje de sena', 'sem parar'
+    ],
+    'Moradia': [
+        'aluguel', 'condominio', 'condomínio', 'iptu', 'luz', 'agua',
+        'água', 'gas', 'gás', 'internet', 'telefone', 'neoenergia',
+        'caesb', 'correios', 'celpe', 'cemig', 'copel', 'light'
+    ],
+    'Online': [
+        'amazon', 'mercado livre', 'magalu', 'magalupay', 'americanas', 'submarino',
+        'shoptime', 'casas bahia', 'netshoes', 'centauro', 'aliexpress',
+        'ebay', 'etsy', 'wish', 'shein', 'pagseguro international', 'zaful'
+    ],
+    'Mensalidades': [
+        'netflix', 'spotify', 'disney plus', 'hbo max', 'amazon prime',
+        'globoplay', 'fatura', 'youtube premium', 'tim', 'claro', 'vivo', 
+        'oi', 'laricell', 'apple music', 'deezer', 'google drive', 'dropbox', 
+        'icloud', 'one drive', 'adobe', 'canva', 'notion', 'evernote', 
+        'slack', 'zoom', 'microsoft 365'
+    ],
+    'Saúde': [
+        'farmacia', 'farmácia', 'drogaria', 'drogasil', 'pacheco',
+        'pague menos', 'hospital', 'clinica', 'clínica', 'laboratorio',
+        'laboratório', 'médico', 'medico', 'dentista', 'fisioterapia',
+        'plano de saude', 'unimed', 'amil', 'sulamerica', 'bradesco saude',
+        'advance fisioterapia'  # Específico do seu extrato
+    ],
+    'Educação': [
+        'escola', 'faculdade', 'universidade', 'curso', 'livro', 'livraria',
+        'material escolar', 'estacio', 'ceub', 'unieuro', 'edx', 'alura', 
+        'iesb', 'projecao', 'udf', 'papelaria', 'udemy', 'coursera',
+        'kaplan', 'wizard', 'ccaa', 'cna', 'fisk'
+    ],
+    'Lazer': [
+        'cinema', 'ciatoy', 'teatro', 'ri happy', 'ingresso', 'netflix', 
+        'spotify', 'amazon prime', 'ticket', 'disney', 'hbo', 'apple music', 
+        'deezer', 'youtube premium', 'entretenimento', 'globoplay', 
+        'crunchyroll', 'paramount', 'steam', 'playstation', 'xbox', 
+        'nintendo', 'game'
+    ],
+    'Vestuário': [
+        'renner', 'riachuelo', 'c&a', 'zara', 'hering', 'marisa',
+        'pernambucanas', 'magazine luiza', 'nike', 'adidas', 'centauro',
+        'netshoes', 'decathlon', 'roupa', 'calcado', 'calçado', 'sapato'
+    ],
+    'Serviços': [
+        'salao', 'salão', 'barbearia', 'cabeleireiro', 'manicure',
+        'academia', 'smartfit', 'bluefit', 'bio ritmo', 'lavanderia',
+        'costureira', 'chaveiro', 'encanador', 'eletricista'
+    ],
+    'Investimentos': [
+        'investimento', 'aplicacao', 'aplicação', 'poupanca', 'poupança',
+        'tesouro', 'cdb', 'lci', 'lca', 'acao', 'ações', 'lig liquidez', 'fundo'
+    ]
+}
+
+# Verificadas depois das categorias específicas
+PALAVRAS_TRANSFERENCIA = ['pix', 'ted', 'doc', 'transferencia', 'transferência', 'recebido', 'enviado']
+
+
+# Nome devolvido para cada prioridade: as categorias na ordem do dicionário
+# e, por último, as palavras de transferência
+NOMES_PRIORIDADE = list(CATEGORIAS) + ['Transferências']
+SEM_REGRA = len(NOMES_PRIORIDADE)
+
+# Linhas por bloco na varredura vetorizada (limita a matriz de caracteres)
+BLOCO_CATEGORIZACAO = 50_000
+
+# Descrições distintas guardadas no memo entre execuções e sessões
+TAMANHO_MEMO = 200_000
+
+# Abaixo deste número de descrições novas a categorização fica no processo
+# atual: o custo de mandar os textos para os workers passa do ganho
+MINIMO_PARALELO = 100_000
+
+# Fatias por processo (fatias menores equilibram melhor a carga)
+FATIAS_POR_PROCESSO = 4
+
+
+# Tabela de transições achatada (estado * num_letras + letra), menor
+# prioridade alcançável em cada estado e tabela code point → letra
+Automato = namedtuple('Automato', 'transicoes num_letras saida tabela_letras sem_regra')
+
+
+def _construir_automato(regras, sem_regra=SEM_REGRA):
+    """
+    Autômato de Aho-Corasick para as palavras-chave, como tabela densa de
+    transições (estado × letra). `regras` é uma lista de (palavra,
+    prioridade); cada estado guarda a menor prioridade entre as palavras que
+    terminam nele, já somando as herdadas pelos links de falha.
+
+    Letras fora das palavras-chave viram a letra 0, que sempre volta à raiz.
+    `sem_regra` marca os estados onde nenhuma palavra termina.
+    """
+    alfabeto = sorted({c for palavra, _ in regras for c in palavra})
+    letra = {c: i + 1 for i, c in enumerate(alfabeto)}
+
+    filhos = [{}]
+    saida = [sem_regra]
+    for palavra, prioridade in regras:
+        estado = 0
+        for c in palavra:
+            if letra[c] not in filhos[estado]:
+                filhos[estado][letra[c]] = len(filhos)
+                filhos.append({})
+                saida.append(sem_regra)
+            estado = filhos[estado][letra[c]]
+        saida[estado] = min(saida[estado], prioridade)
+
+    transicoes = np.zeros((len(filhos), len(alfabeto) + 1), dtype=np.int32)
+    falha = np.zeros(len(filhos), dtype=np.int32)
+    fila = deque(filhos[0].values())
+    for l, filho in filhos[0].items():
+        transicoes[0, l] = filho
+    # Em largura: a falha de um estado é sempre mais rasa e já está completa
+    while fila:
+        estado = fila.popleft()
+        saida[estado] = min(saida[estado], saida[falha[estado]])
+        if estado:
+            transicoes[estado] = transicoes[falha[estado]]
+        for l, filho in filhos[estado].items():
+            if estado:
+                falha[filho] = transicoes[falha[estado], l]
+            transicoes[estado, l] = filho
+            fila.append(filho)
+
+    # Code point → letra do autômato
+    tabela_letras = np.zeros(max(map(ord, alfabeto), default=0) + 1, dtype=np.int32)
+    tabela_letras[[ord(c) for c in alfabeto]] = np.arange(1, len(alfabeto) + 1)
+    return Automato(transicoes.ravel(), transicoes.shape[1], np.array(saida, dtype=np.int32), tabela_letras, sem_regra)
+
+
+# Montado uma vez na importação com todas as palavras-chave
+AUTOMATO = _construir_automato(
+    [(p, i) for i, palavras in enumerate(CATEGORIAS.values()) for p in palavras]
+    + [(p, SEM_REGRA - 1) for p in PALAVRAS_TRANSFERENCIA]
+)
+
+
+def prioridade_palavras_chave(textos, automato=AUTOMATO):
+    """
+    Menor prioridade de palavra-chave contida em cada texto (já em
+    minúsculas), ou `automato.sem_regra`. Roda o autômato em todas as linhas
+    ao mesmo tempo, uma coluna da matriz de code points por passo.
+    """
+    transicoes, num_letras, saida, tabela_letras, sem_regra = automato
+    n = len(textos)
+    melhor = np.full(n, sem_regra, dtype=np.int32)
+
+    for inicio in range(0, n, BLOCO_CATEGORIZACAO):
+        bloco = np.asarray(textos[inicio:inicio + BLOCO_CATEGORIZACAO], dtype=str)
+        if bloco.itemsize == 0:
+            continue
+        m = bloco.view(np.uint32).reshape(len(bloco), -1).T
+        # Colunas contíguas: cada passo lê um caractere de todas as linhas
+        letras = np.ascontiguousarray(
+            np.where(m < len(tabela_letras), tabela_letras[np.minimum(m, len(tabela_letras) - 1)], 0)
+        )
+        estado = np.zeros(len(bloco), dtype=np.int32)
+        melhor_bloco = melhor[inicio:inicio + len(bloco)]
+        for coluna in letras:
+            estado = transicoes[estado * num_letras + coluna]
+            np.minimum(melhor_bloco, saida[estado], out=melhor_bloco)
+    return melhor
+
+
+# Palavras que indicam que NÃO é pessoa (empresas, estabelecimentos).
+# Procuradas como substring do texto, não como palavra inteira.
+PALAVRAS_EMPRESA = (
+    'ltda', 'eireli', 'sa', 's.a', 's/a', 'me', 'epp', 'comercio', 
+    'agencia', 'restaurante', 'loja', 'bar', 'padaria', 'mercado',
+    'posto', 'shopping', 'center', 'magazine', 'supermercado',
+    'delivery', 'express', 'online', 'store', 'shop', 'company',
+    'distribuidora', 'ifood', 'uber', 'rappi', 'ticket', 'estacio',
+    'cinema', 'teatro', 'hospital', 'clinica', 'farmacia', 'drogaria',
+    'petronorte', 'taguatinga', 'mc donald', 'mcdonald', 'creperia',
+    'pica-pau', 'magalupay', 'gmcm', 'combustivel', 'brasilia'
+)
+
+# Nomes comuns brasileiros (primeiros nomes e sobrenomes), comparados com
+# cada palavra do texto
+NOMES_COMUNS = frozenset([
+    # Primeiros nomes comuns
+    'jose', 'maria', 'joao', 'ana', 'antonio', 'francisco', 'carlos',
+    'paulo', 'pedro', 'lucas', 'marcos', 'gabriel', 'rafael', 'bruno',
+    'fernando', 'rodrigo', 'patricia', 'sandra', 'juliana', 'fernanda',
+    'camila', 'beatriz', 'luciana', 'mariana', 'amanda', 'julia',
+    'bruna', 'larissa', 'natalia', 'vanessa', 'marcelo', 'eduardo',
+    'gustavo', 'felipe', 'diego', 'vitor', 'matheus', 'thiago',
+    'ricardo', 'roberto', 'sergio', 'luis', 'luciene', 'bernardo',
+    'alexander', 'alessandra', 'giovanna', 'paula', 'jonatas',
+    'alex', 'teixeira', 'macedo', 'francisca',
+    # Sobrenomes comuns
+    'silva', 'santos', 'oliveira', 'souza', 'costa', 'ferreira', 
+    'rodrigues', 'almeida', 'nascimento', 'lima', 'araujo', 'ribeiro', 
+    'carvalho', 'martins', 'dias', 'lopes', 'gomes', 'mendes', 'barros', 
+    'cardoso', 'rocha', 'miranda', 'duarte', 'monteiro', 'freitas', 
+    'barbosa', 'campos', 'aquino', 'morais', 'brandao', 'macena'
+])
+
+# Todas com a mesma prioridade: basta saber se alguma aparece
+AUTOMATO_EMPRESA = _construir_automato([(p, 0) for p in PALAVRAS_EMPRESA])
+
+
+# Nomes comuns como array de texto de largura fixa, para comparar palavras
+# recortadas da matriz de code points sem montar strings Python
+_NOMES_COMUNS_ORDENADOS = np.array(sorted(NOMES_COMUNS), dtype=str)
+
+
+@lru_cache(maxsize=1)
+def _plano_basico():
+    """Os code points do plano básico (0 a 0xFFFF) como array de caracteres"""
+    return np.arange(0x10000, dtype=np.uint32).view('U1')
+
+
+@lru_cache(maxsize=1)
+def _tabela_digitos():
+    """str.isdigit() de cada code point do plano básico (inclui ², ①...)"""
+    return np.char.isdigit(_plano_basico())
+
+
+@lru_cache(maxsize=1)
+def _tabela_espacos():
+    """str.isspace() de cada code point do plano básico (os separadores do split)"""
+    return np.char.isspace(_plano_basico())
+
+
+def _propriedade(m, tabela, funcao):
+    """
+    Propriedade de caractere (`tabela` do plano básico) para cada code point
+    da matriz `m`. Os code points acima do plano básico são raros e passam
+    por `funcao` só entre os distintos que aparecem.
+    """
+    resultado = tabela[np.minimum(m, len(tabela) - 1)]
+    fora = m >= len(tabela)
+    if fora.any():
+        astrais, inverso = np.unique(m[fora], return_inverse=True)
+        resultado[fora] = funcao(astrais.astype(np.uint32).view('U1'))[inverso]
+    return resultado
+
+
+def _contar_digitos(textos):
+    """Quantidade de caracteres com isdigit() em cada texto"""
+    contagem = np.zeros(len(textos), dtype=np.int64)
+    for inicio in range(0, len(textos), BLOCO_CATEGORIZACAO):
+        bloco = np.asarray(textos[inicio:inicio + BLOCO_CATEGORIZACAO], dtype=str)
+        if bloco.itemsize:
+            m = bloco.view(np.uint32).reshape(len(bloco), -1)
+            contagem[inicio:inicio + len(bloco)] = _propriedade(m, _tabela_digitos(), np.char.isdigit).sum(axis=1)
+    return contagem
+
+
+def _palavras(valores, tamanhos):
+    """
+    As palavras do `str.split()` de cada texto, achadas na matriz de code
+    points: início de cada palavra na matriz achatada, número de
+    caracteres, linha de origem e a própria matriz achatada
+    """
+    m = valores.view(np.uint32).reshape(len(valores), -1)
+    dentro = np.arange(m.shape[1]) < tamanhos[:, None]
+    letra = dentro & ~_propriedade(m, _tabela_espacos(), np.char.isspace)
+    # Palavra começa numa letra no início da linha ou depois de um separador
+    comeco = letra.copy()
+    comeco[:, 1:] &= ~letra[:, :-1]
+    comeco = comeco.ravel()
+    inicios = np.flatnonzero(comeco)
+    # Cada letra pertence à última palavra começada antes dela
+    palavra = np.cumsum(comeco)[letra.ravel()] - 1
+    num_caracteres = np.bincount(palavra, minlength=len(inicios))
+    return inicios, num_caracteres, inicios // max(m.shape[1], 1), m.ravel()
+
+
+def _sao_nomes_comuns(codigos, inicios, num_caracteres):
+    """Se cada palavra (recortada de `codigos`) está em NOMES_COMUNS"""
+    largura = _NOMES_COMUNS_ORDENADOS.itemsize // 4
+    resultado = np.zeros(len(inicios), dtype=bool)
+    possiveis = np.flatnonzero(num_caracteres <= largura)
+    if not len(possiveis) or not len(codigos):
+        return resultado
+    posicao = inicios[possiveis, None] + np.arange(largura)
+    dentro = np.arange(largura) < num_caracteres[possiveis, None]
+    recortes = np.where(dentro, codigos[np.minimum(posicao, len(codigos) - 1)], 0).astype(np.uint32)
+    palavras = recortes.view(f'U{largura}').ravel()
+    resultado[possiveis] = np.isin(palavras, _NOMES_COMUNS_ORDENADOS)
+    return resultado
+
+
+def eh_nome_pessoa(texto):
+    """
+    Detecta se o texto parece ser um nome de pessoa (para PIX/transferências)
+    """
+    if pd.isna(texto):
+        return False
+    
+    texto = texto.lower().strip()
+    
+    # Remove números e caracteres especiais comuns em CNPJs
+    tem_muitos_numeros = sum(c.isdigit() for c in texto) > len(texto) * 0.3
+    if tem_muitos_numeros:
+        return False
+    
+    for palavra in PALAVRAS_EMPRESA:
+        if palavra in texto:
+            return False
+    
+    # Padrões comuns de nomes brasileiros
+    palavras = texto.split()
+    
+    # Se tem 2+ palavras e nenhuma é empresa, provavelmente é nome
+    if len(palavras) >= 2:
+        # Verifica se alguma palavra do texto está na lista de nomes
+        for palavra in palavras:
+            if len(palavra) > 2 and palavra in NOMES_COMUNS:
+                return True
+        
+        # Se tem 2-4 palavras de tamanho razoável, provavelmente é nome
+        # (palavras comerciais como 'delivery' ou 'shop' já saíram acima,
+        # por estarem em PALAVRAS_EMPRESA)
+        if 2 <= len(palavras) <= 4:
+            palavras_validas = [p for p in palavras if len(p) > 2]
+            if len(palavras_validas) >= 2:
+                return True
+    
+    return False
+
+
+def eh_nome_pessoa_serie(descricoes):
+    """
+    Versão vetorizada de `eh_nome_pessoa` para uma Series inteira, com as
+    mesmas decisões. Dígitos e palavras de empresa são checados de uma vez
+    na matriz de code points; nos textos que passam por esses filtros, as
+    palavras são recortadas da mesma matriz para contar e procurar nomes
+    comuns.
+    """
+    descricoes = pd.Series(descricoes)
+    resultado = np.zeros(len(descricoes), dtype=bool)
+    texto = descricoes.astype(object).to_numpy()
+    validas = np.flatnonzero(pd.notna(texto))
+    if not len(validas):
+        return pd.Series(resultado, index=descricoes.index, name=descricoes.name)
+
+    normalizados = [t.lower().strip() for t in texto[validas]]
+    tamanhos = np.fromiter(map(len, normalizados), dtype=np.int64, count=len(normalizados))
+    valores = np.array(normalizados, dtype=str)
+    muitos_numeros = _contar_digitos(valores) > tamanhos * 0.3
+    empresa = prioridade_palavras_chave(valores, AUTOMATO_EMPRESA) != SEM_REGRA
+    candidatas = np.flatnonzero(~muitos_numeros & ~empresa)
+
+    inicios, num_caracteres, linha, codigos = _palavras(valores[candidatas], tamanhos[candidatas])
+    num_palavras = np.bincount(linha, minlength=len(candidatas))
+    longas = num_caracteres > 2
+    num_longas = np.bincount(linha[longas], minlength=len(candidatas))
+    nomes = longas & _sao_nomes_comuns(codigos, inicios, num_caracteres)
+    tem_nome = np.bincount(linha[nomes], minlength=len(candidatas)) > 0
+
+    resultado[validas[candidatas]] = (num_palavras >= 2) & (tem_nome | ((num_palavras <= 4) & (num_longas >= 2)))
+    return pd.Series(resultado, index=descricoes.index, name=descricoes.name)
+
+
+def categorizar_transacao(descricao):
+    """
+    Categoriza automaticamente uma transação com base na descrição
+    usando palavras-chave inteligentes + detecção automática de nomes
+    """
+    if pd.isna(descricao):
+        return 'Outros'
+
+    descricao_lower = descricao.lower()
+
+    # PRIMEIRO: Verificar categorias específicas (antes de transferências)
+    # Isso garante que "Mc Donalds", "Taguatinga", etc vão para categorias certas
+    for categoria, palavras_chave in CATEGORIAS.items():
+        for palavra in palavras_chave:
+            if palavra in descricao_lower:
+                return categoria
+
+    # SEGUNDO: Verificar se é transferência/PIX
+    for palavra in PALAVRAS_TRANSFERENCIA:
+        if palavra in descricao_lower:
+            return 'Transferências'
+
+    # TERCEIRO: Verificar se parece ser nome de pessoa (PIX para pessoa física)
+    # Só chega aqui se não matchou nenhuma categoria específica
+    if eh_nome_pessoa(descricao):
+        return 'Transferências'
+
+    return 'Outros'
+
+
+def categorizar_serie(descricoes):
+    """
+    Categoriza uma Series inteira de descrições de uma vez.
+
+    Mesmo resultado de `descricoes.apply(categorizar_transacao)`: todas as
+    palavras-chave são procuradas numa única passada do autômato, que
+    devolve a categoria de maior prioridade encontrada em cada linha. Só o
+    que não casou nenhuma palavra passa pela detecção de nomes de pessoa.
+    """
+    descricoes = pd.Series(descricoes)
+    texto = descricoes.astype(object)
+    validas = texto.notna().to_numpy()
+
+    prioridade = np.full(len(texto), SEM_REGRA, dtype=np.int8)
+    prioridade[validas] = prioridade_palavras_chave(texto[validas].str.lower().to_numpy())
+
+    categorias = np.array(NOMES_PRIORIDADE + ['Outros'], dtype=object)[prioridade]
+    pendentes = np.flatnonzero(validas & (prioridade == SEM_REGRA))
+    if len(pendentes):
+        pessoas = eh_nome_pessoa_serie(texto.iloc[pendentes]).to_numpy()
+        categorias[pendentes[pessoas]] = 'Transferências'
+    return pd.Series(categorias, index=descricoes.index, name=descricoes.name)
+
+
+def processos_padrao():
+    """Processos para a categorização (LUMEN_PROCESSOS, ou um por núcleo)"""
+    return int(os.environ.get('LUMEN_PROCESSOS', 0)) or os.cpu_count() or 1
+
+
+def _iniciar_trabalhador(versao):
+    """
+    Roda uma vez em cada worker: deixa as tabelas prontas antes da
+    primeira fatia e confere que as regras são as mesmas do processo pai
+    """
+    if versao_regras() != versao:
+        raise RuntimeError('Worker com regras de categorização diferentes do processo principal')
+    _tabela_digitos()
+    _tabela_espacos()
+
+
+def _categorizar_fatia(textos):
+    return categorizar_serie(pd.Series(textos, dtype=object)).to_numpy()
+
+
+_pools = {}
+_trava_pools = threading.Lock()
+
+
+def _pool(processos):
+    """
+    Pool de processos reaproveitado entre chamadas. Usa forkserver (o app
+    roda em threads, e fork com threads é arriscado) com este módulo
+    pré-carregado: o autômato é compilado uma vez no servidor e herdado
+    por cada worker.
+    """
+    with _trava_pools:
+        if processos not in _pools:
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+            if contexto.get_start_method() == 'forkserver':
+                contexto.set_forkserver_preload([__name__])
+            _pools[processos] = ProcessPoolExecutor(
+                processos, mp_context=contexto,
+                initializer=_iniciar_trabalhador, initargs=(versao_regras(),),
+            )
+        return _pools[processos]
+
+
+@atexit.register
+def _encerrar_pools():
+    with _trava_pools:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+def categorizar_paralelo(descricoes, processos=None, minimo=MINIMO_PARALELO):
+    """
+    Categoriza descrições (normalmente as distintas) repartidas entre
+    processos. As fatias são contíguas e voltam na ordem de envio, então o
+    resultado é idêntico ao do `categorizar_serie`. Com menos de `minimo`
+    descrições, ou um processo só, roda aqui mesmo.
+
+    Se o pool quebrar (um worker morto, por exemplo), ele é descartado e a
+    categorização roda no processo atual.
+
+    Retorna um array de categorias na ordem de `descricoes`.
+    """
+    textos = np.asarray(descricoes, dtype=object)
+    processos = processos or processos_padrao()
+    if processos > 1 and len(textos) >= minimo:
+        fatias = np.array_split(textos, processos * FATIAS_POR_PROCESSO)
+        try:
+            return np.concatenate(list(_pool(processos).map(_categorizar_fatia, fatias)))
+        except BrokenProcessPool:
+            with _trava_pools:
+                _pools.pop(processos, None)
+    return categorizar_serie(pd.Series(textos, dtype=object)).to_numpy()
+
+
+class MemoCategorias:
+    """
+    Memo LRU limitado descrição → categoria, compartilhado por todas as
+    execuções e sessões do processo (as sessões do Streamlit rodam em
+    threads, por isso a trava).
+    """
+
+    def __init__(self, tamanho_maximo=TAMANHO_MEMO):
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.consultas = 0
+        self.acertos = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def buscar(self, descricoes):
+        """Categorias já conhecidas (None para as que faltam)"""
+        with self._trava:
+            encontradas = [self._itens.get(d) for d in descricoes]
+            for d, categoria in zip(descricoes, encontradas):
+                if categoria is not None:
+                    self._itens.move_to_end(d)
+            acertos = sum(c is not None for c in encontradas)
+            self.consultas += len(encontradas)
+            self.acertos += acertos
+        return encontradas, acertos
+
+    def guardar(self, descricoes, categorias):
+        with self._trava:
+            self._itens.update(zip(descricoes, categorias))
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self.consultas = self.acertos = 0
+
+
+# Memo padrão do processo
+MEMO = MemoCategorias()
+
+
+def categorizar_unicas(descricoes, memo=MEMO, comerciantes=None, processos=None):
+    """
+    Categoriza cada descrição distinta uma única vez e espalha o resultado
+    para todas as linhas pelos códigos do `factorize`.
+
+    Antes de rodar qualquer regra, as descrições distintas são procuradas
+    em lote no memo do processo e depois no cache de comerciantes em disco
+    (`src.cache.CacheComerciantes`), se houver um. Só o que faltar nos dois
+    passa pelo `categorizar_serie` (em vários processos, via
+    `categorizar_paralelo`, quando são muitas).
+
+    Retorna a Series de categorias com as estatísticas em
+    `attrs['categorizacao']`: linhas, descrições únicas e consultas/acertos
+    no memo e no disco.
+    """
+    descricoes = pd.Series(descricoes)
+    codigos, unicas = pd.factorize(descricoes)
+    unicas = np.asarray(unicas, dtype=object)
+
+    por_unica = np.full(len(unicas), None, dtype=object)
+    acertos_memo = 0
+    if memo is not None:
+        encontradas, acertos_memo = memo.buscar(unicas)
+        por_unica[:] = encontradas
+    faltantes = np.flatnonzero(pd.isna(por_unica))
+
+    novas = faltantes
+    acertos_disco = 0
+    if len(faltantes) and comerciantes is not None:
+        # A categoria só depende do texto em minúsculas e sem espaços nas
+        # pontas, então essa é a chave no disco
+        versao = versao_regras()
+        normalizadas = np.array([d.lower().strip() for d in unicas[faltantes]], dtype=object)
+        do_disco = comerciantes.buscar(normalizadas, versao)
+        por_unica[faltantes] = [do_disco.get(d) for d in normalizadas]
+        no_disco = pd.notna(por_unica[faltantes])
+        acertos_disco = int(no_disco.sum())
+        novas = faltantes[~no_disco]
+
+    if len(novas):
+        por_unica[novas] = categorizar_paralelo(unicas[novas], processos)
+        if comerciantes is not None:
+            comerciantes.guardar(zip(normalizadas[~no_disco], por_unica[novas]), versao)
+    if memo is not None and len(faltantes):
+        memo.guardar(unicas[faltantes], por_unica[faltantes])
+
+    # Código -1 (descrição vazia) cai em 'Outros', como no categorizar_transacao
+    categorias = np.append(por_unica, 'Outros')[codigos]
+    resultado = pd.Series(categorias, index=descricoes.index, name=descricoes.name)
+    resultado.attrs['categorizacao'] = {
+        'linhas': len(descricoes),
+        'unicas': len(unicas),
+        'consultas_memo': len(unicas) if memo is not None else 0,
+        'acertos_memo': acertos_memo,
+        'consultas_disco': len(faltantes) if comerciantes is not None else 0,
+        'acertos_disco': acertos_disco,
+    }
+    return resultado
+
+
+def somar_estatisticas(estatisticas):
+    """Soma as estatísticas de várias chamadas (ex.: blocos do streaming)"""
+    total = {}
+    for e in estatisticas:
+        for chave, valor in e.items():
+            total[chave] = total.get(chave, 0) + valor
+    return total
+
+
+def versao_regras():
+    """
+    Identificador das regras de categorização atuais (palavras-chave e
+    detecção de nomes). Muda sempre que alguma regra muda, invalidando
+    categorizações guardadas em cache.
+    """
+    def conteudo(codigo):
+        # Code objects aninhados (list comprehensions etc.) têm endereço de
+        # memória no repr, então entram pelo próprio conteúdo
+        return (codigo.co_code, tuple(
+            conteudo(c) if hasattr(c, 'co_code') else c for c in codigo.co_consts
+        ))
+
+    regras = repr([
+        CATEGORIAS,
+        PALAVRAS_TRANSFERENCIA,
+        PALAVRAS_EMPRESA,
+        sorted(NOMES_COMUNS),
+        [conteudo(f.__code__) for f in (categorizar_transacao, categorizar_serie, eh_nome_pessoa, eh_nome_pessoa_serie)],
+    ])
+    return hashlib.sha256(regras.encode('utf-8')).hexdigest()[:16]
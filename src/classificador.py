@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+
+# Tamanhos de n-grama de caracteres usados como atributos
+NGRAMAS = (2, 3, 4)
+
+# Os n-gramas são espalhados por hash em 2**BITS_ATRIBUTOS posições
+BITS_ATRIBUTOS = 16
+
+# Suavização de Laplace das contagens
+ALFA = 1.0
+
+# Probabilidade calibrada mínima para trocar 'Outros' pela categoria
+# prevista, e vantagem mínima sobre a segunda classe mais provável (a
+# margem só pesa quando se passa um limiar menor). A precisão fora do
+# treino nesse limiar é medida em benchmarks/bench_classificador.py
+LIMIAR_CONFIANCA = 0.8
+MARGEM_MINIMA = 0.5
+
+# Uma em cada PARTES_VALIDACAO descrições rotuladas (escolhidas por hash)
+# fica fora do treino inicial para calibrar a temperatura; com menos de
+# MINIMO_VALIDACAO delas o modelo não é calibrado e não troca nada
+PARTES_VALIDACAO = 5
+MINIMO_VALIDACAO = 50
+
+# Grade de temperaturas da calibração
+TEMPERATURAS = np.geomspace(0.01, 10, 61)
+
+# Linhas por bloco (limita as matrizes de n-gramas)
+BLOCO_CLASSIFICADOR = 20_000
+
+_PRIMO = np.uint64(1_000_003)
+_MISTURA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _matriz_caracteres(textos):
+    """
+    Matriz de code points (uint64) dos textos em minúsculas, com um espaço
+    marcando o começo e o fim, e o tamanho de cada um
+    """
+    normalizados = [' ' + t.lower().strip() + ' ' for t in textos]
+    tamanhos = np.fromiter(map(len, normalizados), dtype=np.int64, count=len(normalizados))
+    bloco = np.array(normalizados, dtype=str)
+    return bloco.view(np.uint32).reshape(len(bloco), -1).astype(np.uint64), tamanhos
+
+
+def _ngramas(matriz, tamanhos, n):
+    """
+    Hash de cada n-grama (linha × posição) e máscara dos que cabem no texto.
+    O hash é polinomial sobre os code points, misturado por multiplicação
+    e reduzido aos BITS_ATRIBUTOS bits mais altos.
+    """
+    largura = matriz.shape[1] - n + 1
+    if largura <= 0:
+        return np.zeros((len(matriz), 0), dtype=np.int64), np.zeros((len(matriz), 0), dtype=bool)
+    h = np.full((len(matriz), largura), n, dtype=np.uint64)
+    for k in range(n):
+        h = h * _PRIMO + matriz[:, k:k + largura]
+    h = (h * _MISTURA) >> np.uint64(64 - BITS_ATRIBUTOS)
+    validos = np.arange(largura) + n <= tamanhos[:, None]
+    return h.astype(np.int64), validos
+
+
+def _blocos_de_ngramas(textos):
+    """Para cada bloco de textos: (início, [(hashes válidos, linha de cada um)])"""
+    for inicio in range(0, len(textos), BLOCO_CLASSIFICADOR):
+        matriz, tamanhos = _matriz_caracteres(textos[inicio:inicio + BLOCO_CLASSIFICADOR])
+        por_tamanho = []
+        for n in NGRAMAS:
+            h, validos = _ngramas(matriz, tamanhos, n)
+            linhas, _ = np.nonzero(validos)
+            por_tamanho.append((h[validos], linhas))
+        yield inicio, len(matriz), por_tamanho
+
+
+def _contar(textos, y, num_classes):
+    """Contagens (classes × atributos) dos n-gramas dos textos de cada classe"""
+    num_atributos = 2 ** BITS_ATRIBUTOS
+    contagens = np.zeros(num_classes * num_atributos, dtype=np.float64)
+    for inicio, _, por_tamanho in _blocos_de_ngramas(textos):
+        for h, linhas in por_tamanho:
+            contagens += np.bincount(y[inicio + linhas] * num_atributos + h, minlength=len(contagens))
+    return contagens.reshape(num_classes, num_atributos)
+
+
+def _softmax(pontos):
+    pontos = pontos - pontos.max(axis=1, keepdims=True)
+    prob = np.exp(pontos)
+    return prob / prob.sum(axis=1, keepdims=True)
+
+
+def _ajustar_temperatura(pontos, y):
+    """Temperatura da grade com a menor log-perda nas descrições de validação"""
+    linhas = np.arange(len(y))
+    perdas = []
+    for temperatura in TEMPERATURAS:
+        escalados = pontos / temperatura
+        escalados -= escalados.max(axis=1, keepdims=True)
+        perdas.append(np.mean(np.log(np.exp(escalados).sum(axis=1)) - escalados[linhas, y]))
+    return float(TEMPERATURAS[int(np.argmin(perdas))])
+
+
+class ClassificadorNB:
+    """
+    Naive Bayes multinomial sobre n-gramas de caracteres com hash, todo em
+    NumPy. Guarda só as contagens por classe, então treinar mais é somar.
+
+    No app, o modelo é treinado com o extrato de cada sessão e só vive
+    nela. `salvar`/`carregar` gravam e leem o modelo em `.npz` para quem
+    pedir explicitamente (o app não grava nada aprendido com um extrato).
+    """
+
+    def __init__(self, classes, contagens, documentos, temperatura=None):
+        self.classes = np.asarray(classes, dtype=object)
+        self.contagens = np.asarray(contagens, dtype=np.float64)
+        self.documentos = np.asarray(documentos, dtype=np.float64)
+        self.temperatura = temperatura
+        total = self.contagens.sum(axis=1, keepdims=True)
+        # (atributos × classes) para o gather por n-grama na inferência
+        self._log_prob = np.log((self.contagens + ALFA) / (total + ALFA * self.contagens.shape[1])).T.copy()
+        self._log_prior = np.log((self.documentos + ALFA) / (self.documentos.sum() + ALFA * len(self.documentos)))
+
+    @property
+    def calibrado(self):
+        return self.temperatura is not None
+
+    def salvar(self, caminho):
+        """
+        Grava classes, contagens, documentos e temperatura num `.npz` (só
+        arrays de tipo fixo, lidos sem pickle por `carregar`)
+        """
+        with open(caminho, 'wb') as f:
+            np.savez(
+                f,
+                classes=self.classes.astype(str),
+                contagens=self.contagens,
+                documentos=self.documentos,
+                # Modelo sem calibração: temperatura NaN
+                temperatura=np.float64(np.nan if self.temperatura is None else self.temperatura),
+            )
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Lê um modelo gravado por `salvar`"""
+        with np.load(caminho, allow_pickle=False) as dados:
+            temperatura = float(dados['temperatura'])
+            return cls(
+                dados['classes'], dados['contagens'], dados['documentos'],
+                None if np.isnan(temperatura) else temperatura,
+            )
+
+    @classmethod
+    def treinar(cls, descricoes, categorias, ignorar=('Outros',)):
+        """
+        Treina com as descrições já rotuladas pelas regras (as categorias em
+        `ignorar` ficam de fora). Cada descrição distinta conta uma vez.
+
+        A temperatura é ajustada nas descrições de validação com o modelo
+        treinado sem elas; depois as contagens delas são somadas ao modelo.
+        """
+        rotulos = pd.DataFrame({'descricao': descricoes, 'categoria': categorias}).dropna()
+        rotulos = rotulos[~rotulos['categoria'].isin(ignorar)].drop_duplicates('descricao')
+        classes, y = np.unique(rotulos['categoria'].astype(str).to_numpy(), return_inverse=True)
+        textos = rotulos['descricao'].astype(str).to_numpy(dtype=object)
+
+        validacao = pd.util.hash_array(textos) % PARTES_VALIDACAO == 0
+        treino = cls(
+            classes, _contar(textos[~validacao], y[~validacao], len(classes)),
+            np.bincount(y[~validacao], minlength=len(classes)),
+        )
+        temperatura = None
+        if validacao.sum() >= MINIMO_VALIDACAO and len(classes) > 1:
+            temperatura = _ajustar_temperatura(treino.pontuacoes(textos[validacao]), y[validacao])
+        return cls(
+            classes, treino.contagens + _contar(textos[validacao], y[validacao], len(classes)),
+            np.bincount(y, minlength=len(classes)), temperatura,
+        )
+
+    def pontuacoes(self, descricoes):
+        """
+        Log-prior mais a log-verossimilhança média por n-grama (linhas ×
+        classes). A média, em vez da soma, evita que descrições longas
+        fiquem com posteriores extremas só por terem muitos n-gramas
+        (que se sobrepõem e não são independentes).
+        """
+        textos = np.asarray(descricoes, dtype=object)
+        resultado = np.empty((len(textos), len(self.classes)))
+        for inicio, n, por_tamanho in _blocos_de_ngramas(textos):
+            soma = np.zeros((n, len(self.classes)))
+            quantidade = np.zeros(n)
+            for h, linhas in por_tamanho:
+                # Soma por linha via soma acumulada: funciona mesmo com
+                # linhas sem nenhum n-grama deste tamanho
+                acumulado = np.zeros((len(h) + 1, len(self.classes)))
+                np.cumsum(self._log_prob[h], axis=0, out=acumulado[1:])
+                limites = np.searchsorted(linhas, np.arange(n + 1))
+                soma += acumulado[limites[1:]] - acumulado[limites[:-1]]
+                quantidade += np.diff(limites)
+            resultado[inicio:inicio + n] = self._log_prior + soma / np.maximum(quantidade, 1)[:, None]
+        return resultado
+
+    def probabilidades(self, descricoes):
+        """Matriz (linhas × classes) de probabilidades a posteriori, na temperatura calibrada"""
+        return _softmax(self.pontuacoes(descricoes) / (self.temperatura or 1.0))
+
+    def prever(self, descricoes):
+        """Classe mais provável e a probabilidade dela, por linha"""
+        prob = self.probabilidades(descricoes)
+        melhor = prob.argmax(axis=1)
+        return self.classes[melhor], prob[np.arange(len(prob)), melhor]
+
+
+def reclassificar_outros(descricoes, categorias, modelo, limiar=LIMIAR_CONFIANCA, margem=MARGEM_MINIMA):
+    """
+    Troca 'Outros' pela categoria prevista pelo modelo quando a
+    probabilidade calibrada passa do `limiar` e fica pelo menos `margem`
+    acima da segunda classe. Modelo sem calibração não troca nada. Cada
+    descrição distinta entre as 'Outros' é classificada uma vez, todas no
+    mesmo lote.
+
+    Retorna a nova Series de categorias (object) e quantas linhas mudaram.
+    """
+    categorias = pd.Series(categorias, index=pd.Series(descricoes).index).astype(object)
+    outros = np.flatnonzero((categorias == 'Outros').to_numpy() & pd.notna(descricoes))
+    if not len(outros) or modelo is None or not modelo.calibrado:
+        return categorias, 0
+
+    codigos, unicas = pd.factorize(pd.Series(descricoes).iloc[outros])
+    prob = modelo.probabilidades(np.asarray(unicas, dtype=object).astype(str))
+    classes = modelo.classes[prob.argmax(axis=1)]
+    # Com uma classe só, a segunda tem probabilidade zero
+    duas = np.sort(np.pad(prob, ((0, 0), (1, 0))), axis=1)[:, -2:]
+    aceitas = (duas[:, 1] >= limiar) & (duas[:, 1] - duas[:, 0] >= margem)
+    mudam = aceitas[codigos]
+
+    resultado = categorias.to_numpy(copy=True)
+    resultado[outros[mudam]] = classes[codigos[mudam]]
+    return pd.Series(resultado, index=categorias.index, name=categorias.name), int(mudam.sum())
@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+
+# Colunas de soma e contagem de cada célula do cubo
+MEDIDAS = ['gastos', 'n_gastos', 'entradas', 'n_entradas', 'transacoes']
+
+# Categoria usada quando o DataFrame ainda não foi categorizado
+SEM_CATEGORIA = 'Sem categoria'
+
+# Nanossegundos por dia, para converter datas (datetime64[ns]) em dias
+NS_POR_DIA = 86_400 * 10 ** 9
+
+
+def valores_e_escala(df):
+    """
+    Valores usados nas agregações: os centavos inteiros (somas exatas, sem
+    acúmulo de erro de float) quando o DataFrame tiver `valor_centavos`,
+    senão o próprio `valor`. Retorna a Series e o divisor que leva o
+    resultado de volta para reais.
+    """
+    if 'valor_centavos' in df.columns:
+        return df['valor_centavos'], 100
+    return df['valor'], 1
+
+
+def meses_corridos(ano, mes):
+    """Mês corrido (ano × 12 + mês - 1): meses consecutivos diferem de 1"""
+    return np.asarray(ano, dtype=np.int64) * 12 + np.asarray(mes, dtype=np.int64) - 1
+
+
+def rotulos_mes(meses):
+    """`mes_ano` ('AAAA-MM') de cada mês corrido"""
+    return np.array([f'{m // 12:04d}-{m % 12 + 1:02d}' for m in np.asarray(meses).tolist()], dtype=object)
+
+
+def eixo_meses(cubo):
+    """
+    Eixo de meses contínuo de um cubo não vazio, do primeiro ao último mês
+    com transação: a posição de cada célula no eixo, o primeiro mês
+    corrido e o número de meses do eixo
+    """
+    mes = meses_corridos(cubo['ano'], cubo['mes'])
+    primeiro = int(mes.min())
+    mes -= primeiro
+    return mes, primeiro, int(mes.max()) + 1
+
+
+def ordem_por_grupo(grupos, valores):
+    """
+    Ordem por (grupo, valor) para inteiros não negativos, com um argsort
+    só sobre a chave combinada (bem mais rápido que `np.lexsort`)
+    """
+    if not len(grupos):
+        return np.arange(0)
+    return np.argsort(grupos * (int(valores.max()) + 1) + valores, kind='stable')
+
+
+def agrupar(chave, posicao):
+    """
+    Ordena as linhas por (chave, posicao), com empates na ordem da entrada,
+    para que cada grupo vire uma faixa contígua. Retorna a ordem, o grupo
+    (0, 1, ...) de cada linha ordenada e o início de cada faixa.
+    """
+    if not len(chave):
+        vazio = np.arange(0)
+        return vazio, vazio, vazio
+    codigos, _ = pd.factorize(chave)
+    ordem = ordem_por_grupo(codigos.astype(np.int64), posicao - posicao.min())
+    codigos = codigos[ordem]
+    novo_grupo = np.empty(len(ordem), dtype=bool)
+    novo_grupo[0] = True
+    novo_grupo[1:] = codigos[1:] != codigos[:-1]
+    return ordem, np.cumsum(novo_grupo) - 1, np.flatnonzero(novo_grupo)
+
+
+def montar_cubo(df):
+    """
+    Cubo de agregação (ano, mes, categoria) numa única passada: soma e
+    contagem dos gastos e das entradas de cada célula, mais o total de
+    transações (inclui valores zerados).
+
+    Os gastos ficam positivos e as somas ficam na unidade de `valores_e_escala`
+    (centavos, se houver); `attrs['escala']` leva de volta para reais. Só
+    as células com alguma transação aparecem.
+    """
+    valores, escala = valores_e_escala(df)
+    valores = valores.to_numpy(dtype=np.int64 if escala != 1 else np.float64)
+    if 'categoria' in df.columns:
+        codigos, categorias = pd.factorize(df['categoria'], sort=True)
+        # Categoria vazia (código -1) ganha uma célula com None: conta nos
+        # totais por mês, mas some do roll-up por categoria, como no groupby
+        codigos = np.where(codigos < 0, len(categorias), codigos)
+        categorias = np.append(np.asarray(categorias, dtype=object), None)
+    else:
+        codigos = np.zeros(len(df), dtype=np.int64)
+        categorias = np.array([SEM_CATEGORIA], dtype=object)
+
+    mes = meses_corridos(df['ano'], df['mes'])
+    primeiro = int(mes.min()) if len(mes) else 0
+    num_categorias = len(categorias)
+    celula = (mes - primeiro) * num_categorias + codigos
+    tamanho = int(celula.max()) + 1 if len(celula) else 0
+    return _cubo_das_medidas(_medidas(celula, valores, tamanho), primeiro, categorias, escala)
+
+
+def montar_cubo_em_blocos(blocos, primeiro, ultimo, categorias, escala=100):
+    """
+    O mesmo cubo de `montar_cubo`, acumulado bloco a bloco. `blocos` dá
+    tuplas (mês corrido, valores, código da categoria em `categorias`) de
+    arrays do mesmo tamanho, com os meses entre `primeiro` e `ultimo`.
+
+    Só o bloco atual e as somas por célula ficam em memória, então serve
+    para percorrer colunas em disco (`ArquivoTransacoes.cubo`).
+    """
+    num_categorias = len(categorias)
+    tamanho = max(ultimo - primeiro + 1, 0) * num_categorias
+    medidas = {
+        nome: np.zeros(tamanho, dtype=np.int64 if nome == 'transacoes' else np.float64) for nome in MEDIDAS
+    }
+    for mes, valores, codigos in blocos:
+        celula = (mes - primeiro) * num_categorias + codigos
+        for nome, medida in _medidas(celula, valores, tamanho).items():
+            medidas[nome] += medida
+    return _cubo_das_medidas(medidas, primeiro, categorias, escala)
+
+
+def _medidas(celula, valores, tamanho):
+    """Soma e contagem de gastos e entradas e total de transações por célula"""
+    gasto = valores < 0
+    entrada = valores > 0
+    # bincount soma em float64: exato para centavos até 2**53 (R$ 90 trilhões)
+    return {
+        'gastos': np.bincount(celula, weights=np.where(gasto, -valores, 0), minlength=tamanho),
+        'n_gastos': np.bincount(celula, weights=gasto, minlength=tamanho),
+        'entradas': np.bincount(celula, weights=np.where(entrada, valores, 0), minlength=tamanho),
+        'n_entradas': np.bincount(celula, weights=entrada, minlength=tamanho),
+        'transacoes': np.bincount(celula, minlength=tamanho),
+    }
+
+
+def _cubo_das_medidas(medidas, primeiro, categorias, escala):
+    """DataFrame do cubo com as células ocupadas das medidas (mês × categoria)"""
+    num_categorias = len(categorias)
+    ocupadas = np.flatnonzero(medidas['transacoes'])
+    mes, categoria = np.divmod(ocupadas, num_categorias)
+    mes += primeiro
+    anos = mes // 12
+    meses = mes % 12 + 1
+
+    tipo_soma = np.int64 if escala != 1 else np.float64
+    cubo = pd.DataFrame({
+        'ano': anos,
+        'mes': meses,
+        'mes_ano': rotulos_mes(mes),
+        'semestre': np.where(meses <= 6, 1, 2),
+        'categoria': categorias[categoria],
+        **{
+            nome: medida[ocupadas].astype(tipo_soma if nome in ('gastos', 'entradas') else np.int64)
+            for nome, medida in medidas.items()
+        },
+    })
+    cubo.attrs['escala'] = escala
+    return cubo
+
+
+def somar_cubo(cubo, chaves, medidas=MEDIDAS):
+    """
+    Agrega o cubo pelas `chaves` (roll-up), com as somas já em reais.
+    Ordena pelas chaves (`mes_ano` em texto fica em ordem cronológica).
+    """
+    escala = cubo.attrs.get('escala', 1)
+    resultado = cubo.groupby(chaves, sort=True)[list(medidas)].sum()
+    for coluna in ('gastos', 'entradas'):
+        if coluna in resultado.columns:
+            resultado[coluna] = resultado[coluna] / escala
+    return resultado
+
+
+def gastos_por(cubo, chaves):
+    """Gasto total (positivo, em reais) por `chaves`, só onde houve gasto"""
+    somado = somar_cubo(cubo[cubo['n_gastos'] > 0], chaves, ['gastos'])
+    return somado['gastos'].rename('valor')
+
+
+def entradas_mensais(cubo):
+    """Entradas por mês (`mes_ano`, `Entradas`), só meses com entrada"""
+    somado = somar_cubo(cubo[cubo['n_entradas'] > 0], 'mes_ano', ['entradas'])
+    return somado['entradas'].rename('Entradas').reset_index()
+
+
+def detalhe_categorias(cubo):
+    """Total, número de gastos e ticket médio por categoria"""
+    somado = somar_cubo(cubo[cubo['n_gastos'] > 0], 'categoria', ['gastos', 'n_gastos'])
+    return pd.DataFrame({
+        'Total Gasto': somado['gastos'],
+        'Nº Transações': somado['n_gastos'],
+        'Ticket Médio': somado['gastos'] / somado['n_gastos'],
+    }).round(2)
+
+
+def serie_poupanca(cubo):
+    """
+    Gastos, entradas, saldo e taxa de poupança (%) de cada mês com alguma
+    transação; meses sem entrada ficam com taxa 0
+    """
+    mensal = somar_cubo(cubo, 'mes_ano', ['gastos', 'entradas']).reset_index()
+    mensal['saldo'] = mensal['entradas'] - mensal['gastos']
+    mensal['taxa_poupanca'] = (mensal['saldo'] / mensal['entradas'] * 100).replace([np.inf, -np.inf], np.nan).fillna(0)
+    return mensal
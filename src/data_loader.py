@@ -1,12 +1,212 @@
+import csv
+import io
+import os
+import re
+import time
+from collections import Counter
+
 import pandas as pd
 
-def load_csv(file):
-    df = pd.read_csv(
-        file,
-        sep=';',
-        decimal=',',
-        skiprows=5,        # <<< PULA ATÉ O HEADER REAL
-        engine='python',
-        encoding='utf-8'
+# Quantos bytes do início do arquivo são usados para detectar o formato
+TAMANHO_AMOSTRA = 16 * 1024
+
+# Linhas por bloco na leitura em streaming
+TAMANHO_BLOCO = 50_000
+
+ENCODINGS = ('utf-8-sig', 'cp1252', 'latin-1')
+SEPARADORES = (';', ',', '\t', '|')
+
+# Palavras que identificam a linha de cabeçalho do extrato do Inter
+COLUNAS_CABECALHO = ('data', 'valor')
+
+_DECIMAL_VIRGULA = re.compile(r'\d,\d{1,2}$')
+_DECIMAL_PONTO = re.compile(r'\d\.\d{1,2}$')
+
+
+def _motores_disponiveis():
+    """Engines do pandas em ordem de velocidade, só as instaladas"""
+    motores = []
+    try:
+        import pyarrow  # noqa: F401
+        motores.append('pyarrow')
+    except ImportError:
+        pass
+    motores.extend(['c', 'python'])
+    return motores
+
+
+def _decodificar_amostra(amostra):
+    """Descobre o encoding da amostra e devolve (encoding, texto)"""
+    for encoding in ENCODINGS:
+        try:
+            return encoding, amostra.decode(encoding)
+        except UnicodeDecodeError as erro:
+            # A amostra pode cortar um caractere multibyte no final
+            if encoding.startswith('utf-8') and erro.start >= len(amostra) - 3:
+                return encoding, amostra[:erro.start].decode(encoding)
+    return 'latin-1', amostra.decode('latin-1')
+
+
+def detectar_formato(amostra):
+    """
+    Detecta encoding, separador, linha do cabeçalho e marca decimal a
+    partir dos primeiros bytes do extrato.
+    """
+    encoding, _ = _decodificar_amostra(amostra)
+    linhas_bytes = amostra.split(b'\n')
+    # A última linha pode estar cortada pela amostra
+    if len(linhas_bytes) > 1:
+        linhas_bytes = linhas_bytes[:-1]
+    linhas = [
+        linha.decode(encoding, errors='replace').lstrip('\ufeff').rstrip('\r')
+        for linha in linhas_bytes
+    ]
+
+    # Separador: o que aparece com a mesma contagem no maior número de linhas
+    melhor = (0, 0, ';')
+    for sep in SEPARADORES:
+        contagens = Counter(linha.count(sep) for linha in linhas if linha.strip())
+        contagens.pop(0, None)
+        if not contagens:
+            continue
+        campos, frequencia = max(contagens.items(), key=lambda item: (item[1], item[0]))
+        melhor = max(melhor, (frequencia, campos, sep))
+    _, num_separadores, sep = melhor
+
+    # Cabeçalho: primeira linha com as colunas esperadas; senão, a primeira
+    # linha com o número de campos das linhas de dados
+    linha_cabecalho = next(
+        (i for i, linha in enumerate(linhas)
+         if all(coluna in linha.lower() for coluna in COLUNAS_CABECALHO)),
+        None
     )
+    if linha_cabecalho is None:
+        linha_cabecalho = next(
+            (i for i, linha in enumerate(linhas) if linha.count(sep) == num_separadores),
+            0
+        )
+
+    # Marca decimal: formato predominante nos campos numéricos dos dados
+    votos_virgula = votos_ponto = 0
+    for linha in linhas[linha_cabecalho + 1:]:
+        for campo in next(csv.reader([linha], delimiter=sep), []):
+            campo = campo.strip()
+            votos_virgula += bool(_DECIMAL_VIRGULA.search(campo))
+            votos_ponto += bool(_DECIMAL_PONTO.search(campo))
+    decimal = ',' if sep != ',' and votos_virgula >= votos_ponto else '.'
+
+    return {
+        'encoding': encoding,
+        'sep': sep,
+        'linha_cabecalho': linha_cabecalho,
+        # Posição em bytes do cabeçalho: a leitura começa direto nele, sem
+        # depender do suporte de cada engine a skiprows
+        'inicio_cabecalho': sum(len(linha) + 1 for linha in linhas_bytes[:linha_cabecalho]),
+        'decimal': decimal,
+    }
+
+
+def _ler_amostra(file):
+    """Lê os primeiros bytes de um arquivo em disco ou de um upload em memória"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read(TAMANHO_AMOSTRA)
+
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()[:TAMANHO_AMOSTRA]
+    amostra = file.read(TAMANHO_AMOSTRA)
+    file.seek(0)
+    return amostra
+
+
+def _abrir_a_partir_de(file, inicio):
+    """Abre o arquivo em modo binário já posicionado no byte `inicio`"""
+    if isinstance(file, (str, os.PathLike)):
+        f = open(file, 'rb')
+    elif hasattr(file, 'getvalue'):
+        f = io.BytesIO(file.getvalue())
+    else:
+        f = file
+    f.seek(inicio)
+    return f
+
+
+def load_csv(file):
+    """
+    Carrega o extrato CSV do Banco Inter.
+
+    O formato (encoding, separador, cabeçalho e decimal) é detectado na
+    amostra inicial e o arquivo é lido com o engine mais rápido disponível
+    (pyarrow → c → python). O caminho usado e o tempo de leitura ficam em
+    `df.attrs['leitura']`.
+    """
+    inicio = time.perf_counter()
+    formato = detectar_formato(_ler_amostra(file))
+
+    tentativas = []
+    for engine in _motores_disponiveis():
+        fonte = _abrir_a_partir_de(file, formato['inicio_cabecalho'])  # <<< PULA ATÉ O HEADER REAL
+        try:
+            df = pd.read_csv(
+                fonte,
+                sep=formato['sep'],
+                decimal=formato['decimal'],
+                engine=engine,
+                encoding=formato['encoding']
+            )
+            break
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as erro:
+            tentativas.append({'engine': engine, 'erro': str(erro)})
+        finally:
+            if fonte is not file:
+                fonte.close()
+    else:
+        raise ValueError(f"Não foi possível ler o extrato: {tentativas}")
+
+    df.attrs['leitura'] = {
+        **formato,
+        'engine': engine,
+        'tentativas': tentativas,
+        'tempo_s': time.perf_counter() - inicio,
+    }
     return df
+
+
+def load_csv_em_blocos(file, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê o extrato em blocos de até `tamanho_bloco` linhas, para que extratos
+    muito grandes nunca fiquem inteiros na memória em formato bruto.
+
+    Usa o engine C (o pyarrow não suporta leitura em blocos) e cai para o
+    python se o C não conseguir ler o primeiro bloco.
+    """
+    formato = detectar_formato(_ler_amostra(file))
+
+    tentativas = []
+    for engine in ('c', 'python'):
+        fonte = _abrir_a_partir_de(file, formato['inicio_cabecalho'])
+        lidos = 0
+        try:
+            with pd.read_csv(
+                fonte,
+                sep=formato['sep'],
+                decimal=formato['decimal'],
+                engine=engine,
+                encoding=formato['encoding'],
+                chunksize=tamanho_bloco
+            ) as leitor:
+                for bloco in leitor:
+                    bloco.attrs['leitura'] = {**formato, 'engine': engine, 'tentativas': tentativas}
+                    lidos += 1
+                    yield bloco
+            return
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as erro:
+            # Depois que algum bloco já foi entregue não dá para recomeçar
+            if lidos:
+                raise
+            tentativas.append({'engine': engine, 'erro': str(erro)})
+        finally:
+            if fonte is not file:
+                fonte.close()
+
+    raise ValueError(f"Não foi possível ler o extrato: {tentativas}")
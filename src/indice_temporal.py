@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+from src.cubo import NS_POR_DIA, valores_e_escala
+from src.metricas import (
+    _codigos_categoria, _montar_nucleo, _nucleo_vazio, _preencher_categorias
+)
+
+# Somas de prefixo guardadas pelo índice, no total e por categoria
+PREFIXOS = ['gastos', 'entradas', 'n_gastos', 'n_entradas']
+
+# Linhas por bloco na tabela de máximos: numa janela, só as pontas (até
+# dois blocos parciais) são percorridas; os blocos inteiros do meio saem
+# da tabela esparsa em O(1). A tabela fica com O(n / bloco × log n) posições
+BLOCO_MAXIMO = 64
+
+
+def ordenar_por_data(df):
+    """
+    Extrato em ordem cronológica (índice 0..n-1), como o `IndiceTemporal`
+    exige. O do Inter vem do mais novo para o mais antigo: a ordenação
+    (estável) parte dele invertido, então transações do mesmo dia também
+    ficam da mais antiga para a mais nova e o saldo segue a sequência.
+    """
+    if df['data'].is_monotonic_increasing:
+        # Já em ordem: devolve o mesmo frame (não copia colunas mapeadas do cache)
+        return df if df.index.equals(pd.RangeIndex(len(df))) else df.reset_index(drop=True)
+    return df.iloc[::-1].sort_values('data', kind='stable', ignore_index=True)
+
+
+def _prefixo(valores):
+    """Soma acumulada com um zero na frente: soma de [i, j) = p[j] - p[i]"""
+    prefixo = np.zeros(len(valores) + 1, dtype=valores.dtype)
+    np.cumsum(valores, out=prefixo[1:])
+    return prefixo
+
+
+def _tabela_esparsa(valores):
+    """
+    Tabela esparsa de máximos: o nível k guarda o máximo de cada trecho de
+    2**k posições a partir de cada posição, então o máximo de qualquer
+    [i, j) sai de dois trechos (sobrepostos) de um mesmo nível
+    """
+    niveis = [valores]
+    passo = 1
+    while 2 * passo <= len(valores):
+        anterior = niveis[-1]
+        niveis.append(np.maximum(anterior[:-passo], anterior[passo:]))
+        passo *= 2
+    return niveis
+
+
+def _maximo_na_tabela(niveis, i, j):
+    """Máximo de [i, j) (não vazio) pela tabela esparsa"""
+    k = int(j - i).bit_length() - 1
+    return max(niveis[k][i], niveis[k][j - (1 << k)])
+
+
+def _timestamp(data):
+    return pd.Timestamp(data).as_unit('ns').value
+
+
+class IndiceTemporal:
+    """
+    Índice de um extrato ordenado por data (`ordenar_por_data`): somas de
+    prefixo de gastos, entradas e contagens, no total e por categoria.
+
+    Uma janela de datas vira um par de posições por `searchsorted`, e os
+    totais da janela saem da diferença entre dois prefixos, sem percorrer
+    as linhas. Por categoria, as linhas ficam agrupadas (em ordem de data
+    dentro de cada grupo) com prefixos próprios, então memória continua
+    O(n). As somas ficam na unidade de `valores_e_escala` (centavos exatos, se
+    houver). O maior gasto da janela vem de uma tabela esparsa de máximos
+    por blocos de BLOCO_MAXIMO linhas, montada junto com os prefixos.
+    """
+
+    def __init__(self, df):
+        datas = df['data'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if len(datas) > 1 and (np.diff(datas) < 0).any():
+            raise ValueError("o extrato precisa estar ordenado por data (ordenar_por_data)")
+        valores, self.escala = valores_e_escala(df)
+        valores = valores.to_numpy(dtype=np.int64 if self.escala != 1 else np.float64)
+        self.datas = datas
+
+        # Contagens em int32 (até 2 bilhões de linhas): metade da memória
+        medidas = {
+            'gastos': np.where(valores < 0, -valores, 0).astype(valores.dtype, copy=False),
+            'entradas': np.where(valores > 0, valores, 0).astype(valores.dtype, copy=False),
+            'n_gastos': (valores < 0).astype(np.int32),
+            'n_entradas': (valores > 0).astype(np.int32),
+        }
+        self._prefixos = {nome: _prefixo(medida) for nome, medida in medidas.items()}
+        self._gastos = medidas['gastos']
+        completos = len(valores) // BLOCO_MAXIMO * BLOCO_MAXIMO
+        self._maximos_bloco = _tabela_esparsa(
+            self._gastos[:completos].reshape(-1, BLOCO_MAXIMO).max(axis=1, initial=0)
+        )
+
+        if 'categoria' in df.columns:
+            codigos, categorias = _codigos_categoria(df['categoria'])
+        else:
+            codigos, categorias = np.full(len(df), -1), pd.Index([])
+        self.categorias = categorias
+        # Linhas agrupadas por categoria; mergesort mantém a ordem de data
+        ordem = np.argsort(codigos, kind='stable')
+        self._limites = np.searchsorted(codigos[ordem], np.arange(len(categorias) + 1))
+        self._datas_categoria = datas[ordem]
+        self._prefixos_categoria = {nome: _prefixo(medida[ordem]) for nome, medida in medidas.items()}
+
+    def __len__(self):
+        return len(self.datas)
+
+    def fatia(self, inicio=None, fim=None):
+        """Posições [i, j) das transações com `inicio` <= data <= `fim`"""
+        i = 0 if inicio is None else int(np.searchsorted(self.datas, _timestamp(inicio), 'left'))
+        j = len(self.datas) if fim is None else int(np.searchsorted(self.datas, _timestamp(fim), 'right'))
+        return i, max(i, j)
+
+    def _maior_gasto(self, i, j):
+        """Maior gasto (positivo) em [i, j): pontas percorridas, blocos do meio pela tabela"""
+        primeiro = -(-i // BLOCO_MAXIMO)
+        ultimo = j // BLOCO_MAXIMO
+        if primeiro >= ultimo:
+            return self._gastos[i:j].max(initial=0)
+        pontas = max(
+            self._gastos[i:primeiro * BLOCO_MAXIMO].max(initial=0),
+            self._gastos[ultimo * BLOCO_MAXIMO:j].max(initial=0),
+        )
+        return max(pontas, _maximo_na_tabela(self._maximos_bloco, primeiro, ultimo))
+
+    def _faixas_categoria(self, i, j):
+        """Posições [a, b) de cada categoria, no arranjo agrupado, para a fatia [i, j)"""
+        inicio, fim = self.datas[i], self.datas[j - 1]
+        a = np.empty(len(self.categorias), dtype=np.int64)
+        b = np.empty(len(self.categorias), dtype=np.int64)
+        for c in range(len(self.categorias)):
+            lo, hi = self._limites[c], self._limites[c + 1]
+            grupo = self._datas_categoria[lo:hi]
+            a[c] = lo + np.searchsorted(grupo, inicio, 'left')
+            b[c] = lo + np.searchsorted(grupo, fim, 'right')
+        return a, b
+
+    def somas(self, inicio=None, fim=None):
+        """Totais da janela (gastos e entradas em reais, mais as contagens)"""
+        i, j = self.fatia(inicio, fim)
+        resultado = {nome: prefixo[j] - prefixo[i] for nome, prefixo in self._prefixos.items()}
+        resultado['gastos'] = resultado['gastos'] / self.escala
+        resultado['entradas'] = resultado['entradas'] / self.escala
+        resultado['transacoes'] = j - i
+        return resultado
+
+    def somas_por_categoria(self, inicio=None, fim=None):
+        """Totais da janela por categoria (só as que têm transação nela)"""
+        i, j = self.fatia(inicio, fim)
+        if i == j:
+            return pd.DataFrame(columns=PREFIXOS + ['transacoes'], index=pd.Index([], name='categoria'))
+        a, b = self._faixas_categoria(i, j)
+        tabela = pd.DataFrame(
+            {nome: prefixo[b] - prefixo[a] for nome, prefixo in self._prefixos_categoria.items()},
+            index=pd.Index(self.categorias, name='categoria'),
+        )
+        tabela['gastos'] = tabela['gastos'] / self.escala
+        tabela['entradas'] = tabela['entradas'] / self.escala
+        tabela['transacoes'] = b - a
+        return tabela[tabela['transacoes'] > 0]
+
+    def nucleo(self, inicio=None, fim=None):
+        """
+        Mesmo dicionário de `nucleo_metricas` para as transações da janela,
+        montado a partir das somas de prefixo e da tabela de máximos, sem
+        percorrer a janela.
+        """
+        i, j = self.fatia(inicio, fim)
+        if i == j:
+            return _nucleo_vazio()
+        dias_periodo = int((self.datas[j - 1] - self.datas[i]) // NS_POR_DIA)
+        data_meio = self.datas[i] + (dias_periodo // 2) * NS_POR_DIA
+        k = int(np.searchsorted(self.datas[i:j], data_meio, 'left')) + i
+
+        def soma(nome, de, ate):
+            return self._prefixos[nome][ate] - self._prefixos[nome][de]
+
+        n_gastos = soma('n_gastos', i, j)
+        nucleo = _montar_nucleo(
+            self.escala, dias_periodo,
+            (soma('gastos', i, k), soma('gastos', k, j)),
+            (soma('entradas', i, k), soma('entradas', k, j)),
+            n_gastos, soma('n_entradas', i, j),
+            self._maior_gasto(i, j) if n_gastos else 0, j - i,
+        )
+        if len(self.categorias):
+            a, b = self._faixas_categoria(i, j)
+            gastos = self._prefixos_categoria['gastos']
+            n_gastos_categoria = self._prefixos_categoria['n_gastos']
+            _preencher_categorias(
+                nucleo, self.categorias,
+                gastos[b] - gastos[a], n_gastos_categoria[b] - n_gastos_categoria[a], b - a,
+            )
+        return nucleo
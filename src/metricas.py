@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from src.cubo import NS_POR_DIA, valores_e_escala
+
+# Variação (%) entre as metades do período que já conta como tendência
+LIMIAR_TENDENCIA = 5
+
+# Período mínimo (dias) para comparar as duas metades em `analisar_tendencias`
+MINIMO_DIAS_TENDENCIA = 30
+
+
+def _variacao(anterior, atual):
+    """Variação (%) da segunda metade sobre a primeira; 0 sem base"""
+    return (atual - anterior) / anterior * 100 if anterior > 0 else 0
+
+
+def _tendencia(variacao):
+    if variacao > LIMIAR_TENDENCIA:
+        return 'crescente'
+    if variacao < -LIMIAR_TENDENCIA:
+        return 'decrescente'
+    return 'estável'
+
+
+def _codigos_categoria(coluna):
+    """Códigos (-1 para vazio) e categorias de uma coluna de categoria"""
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        # Códigos já prontos (int8 no frame compacto); empate fica na ordem
+        # das categorias, como no groupby
+        return coluna.cat.codes.to_numpy(), coluna.cat.categories
+    return pd.factorize(coluna, sort=True)
+
+
+def _nucleo_vazio():
+    return {
+        'total_gastos': 0,
+        'total_entradas': 0,
+        'ticket_medio': 0,
+        'maior_gasto': 0,
+        'gasto_medio_diario': 0,
+        'categoria_top': 'N/A',
+        'variacao_gastos': 0,
+        'variacao_entradas': 0,
+        'tendencia_gastos': 'estável',
+        'dias_analisados': 0,
+        'periodo1_gastos': 0,
+        'periodo2_gastos': 0,
+        'transacoes': 0,
+        'n_gastos': 0,
+        'n_entradas': 0,
+        'categorias_presentes': 0,
+        'categorias_com_gasto': 0,
+    }
+
+
+def _montar_nucleo(escala, dias_periodo, gastos, entradas, n_gastos, n_entradas, maior_gasto, transacoes):
+    """
+    KPIs a partir das somas de cada metade do período (`gastos` e
+    `entradas` são pares na unidade de `valores_e_escala`, gastos positivos)
+    """
+    nucleo = _nucleo_vazio()
+    soma_gastos = gastos[0] + gastos[1]
+    if dias_periodo > 0:
+        variacao_gastos = _variacao(gastos[0], gastos[1])
+        variacao_entradas = _variacao(entradas[0], entradas[1])
+    else:
+        variacao_gastos = variacao_entradas = 0
+
+    nucleo.update({
+        'total_gastos': soma_gastos / escala,
+        'total_entradas': (entradas[0] + entradas[1]) / escala,
+        'ticket_medio': soma_gastos / n_gastos / escala if n_gastos else 0,
+        'maior_gasto': maior_gasto / escala if n_gastos else 0,
+        'gasto_medio_diario': soma_gastos / escala / max(dias_periodo, 1),
+        'variacao_gastos': variacao_gastos,
+        'variacao_entradas': variacao_entradas,
+        'tendencia_gastos': _tendencia(variacao_gastos),
+        'dias_analisados': dias_periodo,
+        'periodo1_gastos': gastos[0] / escala,
+        'periodo2_gastos': gastos[1] / escala,
+        'transacoes': int(transacoes),
+        'n_gastos': int(n_gastos),
+        'n_entradas': int(n_entradas),
+    })
+    return nucleo
+
+
+def _preencher_categorias(nucleo, categorias, gastos, n_gastos, transacoes):
+    """Categoria top e contagens a partir das somas por categoria"""
+    usadas = n_gastos > 0
+    if usadas.any():
+        nucleo['categoria_top'] = categorias[int(np.argmax(np.where(usadas, gastos, -np.inf)))]
+    nucleo['categorias_com_gasto'] = int(usadas.sum())
+    nucleo['categorias_presentes'] = int((transacoes > 0).sum())
+    return nucleo
+
+
+def nucleo_metricas(df):
+    """
+    Calcula todos os KPIs do extrato numa passada sobre arrays NumPy:
+    totais, ticket médio, maior gasto, gasto médio diário, comparação
+    entre as duas metades do período, categoria top e tendência.
+
+    As somas são feitas na unidade de `valores_e_escala` (centavos inteiros, se
+    houver) com um único `bincount` por (metade, tipo) e só no fim voltam
+    para reais. `calcular_metricas_avancadas`, `analisar_tendencias`,
+    `calcular_saude_financeira` e o app leem deste dicionário em vez de
+    refazer as máscaras.
+    """
+    valores, escala = valores_e_escala(df)
+    valores = valores.to_numpy(dtype=np.int64 if escala != 1 else np.float64)
+    if not len(valores):
+        return _nucleo_vazio()
+
+    datas = df['data'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    inicio = datas.min()
+    dias_periodo = int((datas.max() - inicio) // NS_POR_DIA)
+    data_meio = inicio + (dias_periodo // 2) * NS_POR_DIA
+
+    gasto = valores < 0
+    somas, contagens = _somas_por_metade(valores, datas >= data_meio)
+    n_gastos = contagens[0] + contagens[1]
+    nucleo = _montar_nucleo(
+        escala, dias_periodo, somas[0:2], somas[2:4], n_gastos, contagens[2] + contagens[3],
+        -valores[gasto].min() if n_gastos else 0, len(valores),
+    )
+
+    if 'categoria' in df.columns:
+        codigos, categorias = _codigos_categoria(df['categoria'])
+        _preencher_categorias(nucleo, categorias, *_somas_por_categoria(codigos, valores, len(categorias)))
+    return nucleo
+
+
+def nucleo_em_blocos(blocos, dia_inicio, dia_fim, categorias=None, escala=100):
+    """
+    O mesmo núcleo de `nucleo_metricas`, acumulado bloco a bloco. `blocos`
+    dá tuplas (dias desde a época, valores, códigos de categoria) de
+    arrays do mesmo tamanho, com os dias entre `dia_inicio` e `dia_fim`;
+    sem `categorias`, a categoria top e as contagens ficam de fora.
+
+    Só o bloco atual fica em memória (`ArquivoTransacoes.nucleo`).
+    """
+    dias_periodo = dia_fim - dia_inicio
+    dia_meio = dia_inicio + dias_periodo // 2
+    somas = np.zeros(6)
+    contagens = np.zeros(6, dtype=np.int64)
+    maior_gasto = 0
+    transacoes = 0
+    por_categoria = None
+    if categorias is not None:
+        por_categoria = (
+            np.zeros(len(categorias)), np.zeros(len(categorias), dtype=np.int64),
+            np.zeros(len(categorias), dtype=np.int64),
+        )
+
+    for dias, valores, codigos in blocos:
+        if not len(valores):
+            continue
+        somas_bloco, contagens_bloco = _somas_por_metade(valores, dias >= dia_meio)
+        somas += somas_bloco
+        contagens += contagens_bloco
+        maior_gasto = max(maior_gasto, -valores.min())
+        transacoes += len(valores)
+        if por_categoria is not None:
+            for total, parcial in zip(por_categoria, _somas_por_categoria(codigos, valores, len(categorias))):
+                total += parcial
+
+    if not transacoes:
+        return _nucleo_vazio()
+    n_gastos = contagens[0] + contagens[1]
+    nucleo = _montar_nucleo(
+        escala, dias_periodo, somas[0:2], somas[2:4], n_gastos, contagens[2] + contagens[3],
+        maior_gasto, transacoes,
+    )
+    if por_categoria is not None:
+        _preencher_categorias(nucleo, categorias, *por_categoria)
+    return nucleo
+
+
+def _somas_por_metade(valores, segunda_metade):
+    """
+    Soma (em módulo) e contagem por (tipo, metade): 0/1 gasto, 2/3 entrada,
+    4/5 valor zerado
+    """
+    chave = np.full(len(valores), 4, dtype=np.int8)
+    chave[valores < 0] = 0
+    chave[valores > 0] = 2
+    chave += segunda_metade
+    # bincount soma em float64: exato para centavos até 2**53
+    return np.bincount(chave, weights=np.abs(valores), minlength=6), np.bincount(chave, minlength=6)
+
+
+def _somas_por_categoria(codigos, valores, num_categorias):
+    """Gasto, número de gastos e de transações por código (-1 fica de fora)"""
+    com_categoria = codigos >= 0
+    gasto_com_categoria = (valores < 0) & com_categoria
+    return (
+        np.bincount(codigos[gasto_com_categoria], weights=-valores[gasto_com_categoria], minlength=num_categorias),
+        np.bincount(codigos[gasto_com_categoria], minlength=num_categorias),
+        np.bincount(codigos[com_categoria], minlength=num_categorias),
+    )
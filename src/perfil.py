@@ -0,0 +1,92 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+
+# Imports acontecem uma vez por processo: os tempos ficam guardados aqui
+_tempos_import = {}
+_trava = threading.Lock()
+
+# Etapas são medidas por execução do script (cada execução roda numa thread)
+_execucao = threading.local()
+
+
+def iniciar_perfil():
+    """Zera as etapas medidas; chamado no topo de cada execução do app"""
+    _execucao.etapas = []
+
+
+def _etapas():
+    if not hasattr(_execucao, 'etapas'):
+        iniciar_perfil()
+    return _execucao.etapas
+
+
+@contextmanager
+def etapa(nome):
+    """Mede o tempo de um trecho e registra no perfil da execução atual"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _etapas().append((nome, time.perf_counter() - inicio))
+
+
+@contextmanager
+def medir_import(nome):
+    """Mede um bloco de imports; só a primeira medição por processo conta"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _trava:
+            _tempos_import.setdefault(nome, time.perf_counter() - inicio)
+
+
+class ModuloTardio:
+    """
+    Representa um módulo que só é importado no primeiro acesso a um
+    atributo. Usado para bibliotecas pesadas (plotly) que só são
+    necessárias quando uma aba realmente monta um gráfico.
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def _carregar(self):
+        if self._modulo is None:
+            with medir_import(self._nome):
+                self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __repr__(self):
+        estado = 'carregado' if self._modulo is not None else 'não carregado'
+        return f'<ModuloTardio {self._nome} ({estado})>'
+
+
+def importar_tardio(nome):
+    return ModuloTardio(nome)
+
+
+def relatorio_perfil(etapas_extras=()):
+    """
+    Linhas do relatório de inicialização: imports (uma vez por processo)
+    seguidos das etapas da execução atual. `etapas_extras` permite incluir
+    etapas medidas numa execução anterior (ex.: o processamento do upload,
+    que acontece antes de um `st.rerun()`).
+    """
+    with _trava:
+        imports = list(_tempos_import.items())
+    linhas = [{'tipo': 'import', 'nome': nome, 'tempo_ms': s * 1000} for nome, s in imports]
+    linhas += [{'tipo': 'etapa', 'nome': nome, 'tempo_ms': s * 1000}
+               for nome, s in [*etapas_extras, *_etapas()]]
+    return linhas
+
+
+def etapas_atuais():
+    """Etapas medidas até agora na execução atual, como (nome, segundos)"""
+    return list(_etapas())
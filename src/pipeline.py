@@ -0,0 +1,170 @@
+import os
+import time
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.data_loader import load_csv, load_csv_em_blocos, TAMANHO_BLOCO
+from src.preprocessing import preprocess, VERSAO_PREPROCESS
+from src.categorizacao import categorizar_unicas, somar_estatisticas, versao_regras
+from src.cache import hash_conteudo
+from src.indice_temporal import ordenar_por_data
+from src.perfil import etapa
+
+# Acima deste tamanho o upload é processado em streaming (blocos)
+LIMIAR_STREAMING_BYTES = 20 * 1024 * 1024
+
+
+def _tamanho_arquivo(file):
+    """Tamanho do upload em bytes, quando dá para saber sem ler o arquivo"""
+    if hasattr(file, 'size'):
+        return file.size
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer().nbytes
+    try:
+        return os.path.getsize(file)
+    except (TypeError, OSError):
+        return None
+
+
+def _categorizar(df, comerciantes=None):
+    """
+    Categoriza as descrições (uma vez por descrição distinta), já como
+    coluna categórica, e guarda as estatísticas em df.attrs
+    """
+    categorias = categorizar_unicas(df['descricao'], comerciantes=comerciantes)
+    df.attrs['categorizacao'] = categorias.attrs.pop('categorizacao')
+    return categorias.astype('category')
+
+
+def _processar_bloco(bloco, comerciantes=None):
+    """Preprocessa e categoriza um bloco, deixando categoria compacta"""
+    bloco = preprocess(bloco, copiar=False, compacto=True, centavos=True)
+    bloco['categoria'] = _categorizar(bloco, comerciantes)
+    return bloco
+
+
+def _concatenar_blocos(blocos):
+    """
+    Junta os blocos processados coluna a coluna. Colunas categóricas são
+    unidas com `union_categoricals` (com categorias ordenadas, como em
+    `compactar_tipos`) para não voltarem a ser object.
+    """
+    if len(blocos) == 1:
+        return blocos[0]
+
+    indice = blocos[0].index.append([b.index for b in blocos[1:]])
+    colunas = {}
+    for col in blocos[0].columns:
+        partes = [b[col] for b in blocos]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in partes):
+            colunas[col] = pd.Series(union_categoricals([p.array for p in partes], sort_categories=True), index=indice)
+        else:
+            colunas[col] = pd.concat(partes)
+    return pd.DataFrame(colunas, index=indice)
+
+
+def _processar_inteiro(file, comerciantes=None):
+    with etapa('leitura do CSV'):
+        df = load_csv(file)
+    with etapa('preprocess'):
+        df = preprocess(df, copiar=False, compacto=True, centavos=True)
+    with etapa('categorização'):
+        df['categoria'] = _categorizar(df, comerciantes)
+    return df
+
+
+def processar_em_blocos(file, tamanho_bloco=TAMANHO_BLOCO, comerciantes=None):
+    """
+    Processa o extrato em streaming: cada bloco é lido, preprocessado e
+    categorizado antes do próximo ser lido, então o pico de memória depende
+    do tamanho do bloco e não do histórico inteiro.
+    """
+    inicio = time.perf_counter()
+    blocos = []
+    relatorios = []
+    estatisticas = []
+    leitura = {}
+    for bloco in load_csv_em_blocos(file, tamanho_bloco):
+        leitura = bloco.attrs['leitura']
+        bloco = _processar_bloco(bloco, comerciantes)
+        relatorios.append(bloco.attrs.pop('erros_conversao'))
+        estatisticas.append(bloco.attrs.pop('categorizacao'))
+        blocos.append(bloco)
+
+    if not blocos:
+        return _processar_inteiro(file, comerciantes)
+
+    df = _concatenar_blocos(blocos)
+    df.attrs['erros_conversao'] = [erro for relatorio in relatorios for erro in relatorio]
+    df.attrs['categorizacao'] = somar_estatisticas(estatisticas)
+    df.attrs['leitura'] = {
+        **leitura,
+        'blocos': len(blocos),
+        'tempo_s': time.perf_counter() - inicio,
+    }
+    return df
+
+
+def _processar(file, tamanho_bloco=None, comerciantes=None):
+    if tamanho_bloco is None:
+        tamanho = _tamanho_arquivo(file)
+        if tamanho is not None and tamanho > LIMIAR_STREAMING_BYTES:
+            tamanho_bloco = TAMANHO_BLOCO
+
+    if tamanho_bloco:
+        with etapa('processamento em blocos'):
+            df = processar_em_blocos(file, tamanho_bloco, comerciantes)
+    else:
+        df = _processar_inteiro(file, comerciantes)
+    # Em ordem cronológica (o Inter exporta do mais novo para o mais
+    # antigo), como o IndiceTemporal exige; o cache guarda já ordenado
+    with etapa('ordenação por data'):
+        return ordenar_por_data(df)
+
+
+def processar_extrato(file, tamanho_bloco=None, cache=None, comerciantes=None):
+    """
+    Carrega, preprocessa e categoriza o extrato, em ordem cronológica.
+
+    Sem `tamanho_bloco`, arquivos acima de LIMIAR_STREAMING_BYTES são
+    processados em streaming e os demais de uma vez só.
+
+    Com um `cache` (CacheExtratos), o mesmo arquivo enviado de novo é lido
+    do disco. Se só as regras de categorização mudaram, apenas a
+    categorização é refeita. O resultado fica em `df.attrs['cache']`
+    ('novo', 'base' ou 'completo').
+
+    Com `comerciantes` (CacheComerciantes), descrições já categorizadas em
+    outra sessão ou processo com as mesmas regras vêm do disco.
+    """
+    if cache is None:
+        return _processar(file, tamanho_bloco, comerciantes)
+
+    with etapa('hash do arquivo'):
+        chave = f'{hash_conteudo(file)}-v{VERSAO_PREPROCESS}'
+        versao = versao_regras()
+
+    with etapa('leitura do cache'):
+        df = cache.ler_base(chave)
+    if df is None:
+        df = _processar(file, tamanho_bloco, comerciantes)
+        with etapa('gravação no cache'):
+            cache.salvar_base(chave, df.drop(columns='categoria'))
+            cache.salvar_categorias(chave, versao, df['categoria'])
+        df.attrs['cache'] = 'novo'
+        return df
+
+    with etapa('leitura do cache'):
+        categorias = cache.ler_categorias(chave, versao)
+    if categorias is None:
+        with etapa('categorização'):
+            categorias = _categorizar(df, comerciantes)
+        cache.salvar_categorias(chave, versao, categorias)
+        df.attrs['cache'] = 'base'
+    else:
+        # Nada foi categorizado agora; as estatísticas gravadas são de outra execução
+        df.attrs.pop('categorizacao', None)
+        df.attrs['cache'] = 'completo'
+    df['categoria'] = categorias.array
+    return df
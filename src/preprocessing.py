@@ -1,12 +1,322 @@
 import pandas as pd
 import numpy as np
 
-def preprocess(df):
+from src.calendario import COLUNAS_TRANSACAO, atributos_calendario, dias_desde_epoca
+
+# Versão do formato gerado pelo preprocess; incrementar sempre que as colunas,
+# os tipos ou a ordem das linhas do extrato processado mudarem (invalida o
+# cache de extratos processados)
+VERSAO_PREPROCESS = 6
+
+# Tipos das colunas de calendário fora do esquema compacto
+TIPOS_CALENDARIO_PADRAO = {'ano': 'int32', 'mes': 'int32', 'mes_ano': 'object', 'semestre': 'int64'}
+
+
+def converter_valor_monetario(valor_str):
+    """
+    Converte strings monetárias nos formatos:
+    - Brasileiro: 1.234,56 ou 40,00
+    - Americano: 1,234.56 ou 40.00 ou 545.76
+
+    Versão escalar (linha a linha), mantida como referência para
+    valores avulsos e para os benchmarks de `converter_valores_monetarios`.
+    """
+    if pd.isna(valor_str):
+        return np.nan
+    
+    valor_str = str(valor_str).strip()
+    
+    # Remove espaços
+    valor_str = valor_str.replace(' ', '')
+    
+    # Conta quantas vírgulas e pontos existem
+    num_virgulas = valor_str.count(',')
+    num_pontos = valor_str.count('.')
+    
+    # Formato brasileiro: vírgula é decimal (e vem depois do ponto, se houver)
+    if num_virgulas == 1 and num_pontos <= 1 and valor_str.rfind(',') > valor_str.rfind('.'):
+        if num_pontos == 1:
+            # Ex: 1.234,56 - remove ponto (milhar) e troca vírgula por ponto
+            valor_str = valor_str.replace('.', '').replace(',', '.')
+        else:
+            # Ex: 40,00 ou -40,00 - apenas troca vírgula por ponto
+            valor_str = valor_str.replace(',', '.')
+    
+    # Formato americano: ponto é decimal
+    elif num_pontos == 1 and num_virgulas == 0:
+        # Ex: 545.76 ou 40.00 ou -40.00 - já está correto
+        pass
+    
+    # Tem vírgula como separador de milhar
+    elif num_pontos == 1 and num_virgulas >= 1:
+        # Ex: 1,234.56 - remove vírgula (milhar)
+        valor_str = valor_str.replace(',', '')
+    
+    # Apenas pontos (milhares)
+    elif num_pontos > 1 and num_virgulas == 0:
+        # Ex: 1.234.567 - remove pontos (milhares)
+        valor_str = valor_str.replace('.', '')
+    
+    # Apenas vírgulas
+    elif num_virgulas > 1 and num_pontos == 0:
+        # Ex: 1,234,567 - remove vírgulas (milhares)
+        valor_str = valor_str.replace(',', '')
+    
+    # Misto complexo
+    elif num_pontos > 0 and num_virgulas > 0:
+        # Descobre qual é o separador decimal (último caractere especial)
+        ultima_virgula = valor_str.rfind(',')
+        ultimo_ponto = valor_str.rfind('.')
+        
+        if ultima_virgula > ultimo_ponto:
+            # Vírgula é decimal: Ex: 1.234.567,89
+            valor_str = valor_str.replace('.', '').replace(',', '.')
+        else:
+            # Ponto é decimal: Ex: 1,234,567.89
+            valor_str = valor_str.replace(',', '')
+    
+    try:
+        return float(valor_str)
+    except ValueError:
+        return np.nan
+
+
+def _normalizar_monetario(texto):
+    """
+    Normaliza uma Series de strings monetárias para o formato com ponto
+    decimal e sem separador de milhar, aplicando as mesmas regras de
+    `converter_valor_monetario` com operações de coluna inteira.
+    """
+    texto = texto.str.strip().str.replace(' ', '', regex=False)
+
+    num_virgulas = texto.str.count(',').to_numpy()
+    num_pontos = texto.str.count(r'\.').to_numpy()
+    virgula_por_ultimo = (texto.str.rfind(',') > texto.str.rfind('.')).to_numpy()
+
+    # Mesma cadeia de if/elif da versão escalar, resolvida em máscaras
+    brasileiro = (num_virgulas == 1) & (num_pontos <= 1) & virgula_por_ultimo
+    americano = ~brasileiro & (num_pontos == 1) & (num_virgulas == 0)
+    resto = ~brasileiro & ~americano
+    milhar_virgula = resto & (num_pontos == 1) & (num_virgulas >= 1)
+    resto &= ~milhar_virgula
+    so_pontos = resto & (num_pontos > 1) & (num_virgulas == 0)
+    resto &= ~so_pontos
+    so_virgulas = resto & (num_virgulas > 1) & (num_pontos == 0)
+    resto &= ~so_virgulas
+    misto = resto & (num_pontos > 0) & (num_virgulas > 0)
+
+    # Vírgula decimal: remove pontos e troca vírgula por ponto
+    troca_virgula = brasileiro | (misto & virgula_por_ultimo)
+    # Ponto decimal com vírgulas de milhar: remove vírgulas
+    remove_virgulas = milhar_virgula | so_virgulas | (misto & ~virgula_por_ultimo)
+
+    if troca_virgula.any():
+        texto[troca_virgula] = (
+            texto[troca_virgula]
+            .str.replace('.', '', regex=False)
+            .str.replace(',', '.', regex=False)
+        )
+    if remove_virgulas.any():
+        texto[remove_virgulas] = texto[remove_virgulas].str.replace(',', '', regex=False)
+    if so_pontos.any():
+        texto[so_pontos] = texto[so_pontos].str.replace('.', '', regex=False)
+
+    return texto
+
+
+# Tamanho do bloco (em valores distintos) da conversão por matriz de caracteres
+BLOCO_CONVERSAO = 100_000
+
+# Acima de 15 dígitos o inteiro deixa de ser exato em float64
+_MAX_DIGITOS = 15
+
+_VIRGULA, _PONTO, _ESPACO, _MAIS, _MENOS = (ord(c) for c in ',. +-')
+
+_REGEX_FLOAT = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+
+
+def _converter_por_caracteres(textos):
+    """
+    Converte um array de strings monetárias trabalhando direto sobre a
+    matriz de code points (uma linha por valor).
+
+    Retorna os valores convertidos (em reais e em centavos inteiros) e uma
+    máscara indicando quais linhas foram resolvidas; as demais (espaços
+    especiais, notação científica, valores inválidos, mais de 15 dígitos)
+    ficam para o caminho de strings.
+    """
+    n = len(textos)
+    valores = np.full(n, np.nan)
+    centavos = np.zeros(n, dtype=np.int64)
+    resolvido = np.zeros(n, dtype=bool)
+
+    for inicio in range(0, n, BLOCO_CONVERSAO):
+        bloco = np.asarray(textos[inicio:inicio + BLOCO_CONVERSAO], dtype=str)
+        if bloco.itemsize == 0:
+            continue
+        m = bloco.view(np.uint32).reshape(len(bloco), -1)
+        largura = m.shape[1]
+        posicoes = np.arange(largura)
+        dentro = posicoes < np.char.str_len(bloco)[:, None]
+
+        digito = (m >= 48) & (m <= 57)
+        virgula = m == _VIRGULA
+        ponto = m == _PONTO
+        sinal = (m == _MAIS) | (m == _MENOS)
+        espaco = (m == _ESPACO) | ~dentro
+
+        num_virgulas = virgula.sum(axis=1)
+        num_pontos = ponto.sum(axis=1)
+        num_digitos = digito.sum(axis=1)
+        ultima_virgula = np.where(num_virgulas > 0, largura - 1 - np.argmax(virgula[:, ::-1], axis=1), -1)
+        ultimo_ponto = np.where(num_pontos > 0, largura - 1 - np.argmax(ponto[:, ::-1], axis=1), -1)
+        primeiro_numerico = np.argmax(digito | virgula | ponto, axis=1)
+
+        # O sinal, se houver, precisa vir antes de qualquer dígito ou separador
+        num_sinais = sinal.sum(axis=1)
+        sinal_ok = (num_sinais == 0) | ((num_sinais == 1) & (np.argmax(sinal, axis=1) < primeiro_numerico))
+
+        # Mesma cadeia de if/elif de `converter_valor_monetario`
+        brasileiro = (num_virgulas == 1) & (num_pontos <= 1) & (ultima_virgula > ultimo_ponto)
+        americano = ~brasileiro & (num_pontos == 1) & (num_virgulas == 0)
+        milhar_virgula = ~brasileiro & (num_pontos == 1) & (num_virgulas >= 1)
+        misto = ~brasileiro & (num_pontos > 1) & (num_virgulas >= 1)
+
+        # No misto só "1.234.567,89" é válido: com ponto por último ou mais
+        # de uma vírgula sobram separadores decimais repetidos
+        misto_valido = misto & (ultima_virgula > ultimo_ponto) & (num_virgulas == 1)
+        decimal = np.where(
+            brasileiro | misto_valido, ultima_virgula,
+            np.where(americano | milhar_virgula, ultimo_ponto, largura)
+        )
+
+        rapido = (
+            (digito | virgula | ponto | sinal | espaco).all(axis=1)
+            & sinal_ok
+            & ~(misto & ~misto_valido)
+            & (num_digitos >= 1)
+            & (num_digitos <= _MAX_DIGITOS)
+        )
+
+        # Horner coluna a coluna: acumula os dígitos e conta as casas decimais
+        inteiro = np.zeros(len(bloco), dtype=np.int64)
+        casas = np.zeros(len(bloco), dtype=np.int64)
+        for j in range(largura):
+            d = digito[:, j]
+            inteiro = np.where(d, inteiro * 10 + (m[:, j].astype(np.int64) - 48), inteiro)
+            casas += d & (j > decimal)
+
+        # Divisão de dois floats exatos é arredondada corretamente, o que dá
+        # o mesmo resultado de float() sobre a string normalizada
+        convertido = inteiro / 10.0 ** casas
+        # Centavos direto dos dígitos: exato até 2 casas, acima disso arredonda
+        em_centavos = np.where(
+            casas <= 2,
+            inteiro * 10 ** np.clip(2 - casas, 0, 2),
+            np.rint(inteiro / 10.0 ** (casas - 2)).astype(np.int64)
+        )
+        negativo = (m == _MENOS).any(axis=1)
+        convertido = np.where(negativo, -convertido, convertido)
+        em_centavos = np.where(negativo, -em_centavos, em_centavos)
+
+        fatia = slice(inicio, inicio + len(bloco))
+        valores[fatia] = np.where(rapido, convertido, np.nan)
+        centavos[fatia] = np.where(rapido, em_centavos, 0)
+        resolvido[fatia] = rapido
+
+    return valores, centavos, resolvido
+
+
+def _reais_para_centavos(valores):
+    """Array de floats em reais → IntegerArray de centavos (NA onde não há valor)"""
+    escalado = np.asarray(valores, dtype='float64') * 100
+    validos = np.isfinite(escalado) & (np.abs(escalado) < 2.0 ** 63)
+    return pd.arrays.IntegerArray(
+        np.where(validos, np.rint(escalado), 0).astype(np.int64),
+        ~validos
+    )
+
+
+def converter_valores_monetarios(serie, coluna=None, centavos=False):
+    """
+    Converte uma coluna inteira de valores monetários (BR, US ou misto)
+    para float, com o mesmo resultado de `converter_valor_monetario`.
+
+    Com `centavos=True` o resultado é um inteiro em centavos (Int64, com NA
+    no lugar de NaN), calculado direto dos dígitos, sem passar por float.
+
+    Cada valor distinto é convertido uma única vez. Retorna a Series
+    convertida e um DataFrame com os valores que não puderam ser
+    convertidos (coluna, linha, valor_original, valor_normalizado).
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        if centavos:
+            return pd.Series(_reais_para_centavos(serie), index=serie.index, name=serie.name), _relatorio_erros_vazio()
+        return serie.astype('float64'), _relatorio_erros_vazio()
+
+    codigos, unicos = pd.factorize(serie)
+    unicos = np.asarray(unicos, dtype=object)
+
+    valores, centavos_unicos, resolvido = _converter_por_caracteres(unicos)
+
+    # Caminho de strings para o que a matriz de caracteres não resolveu
+    pendentes = np.flatnonzero(~resolvido)
+    normalizados = pd.Series(unicos[pendentes], dtype=object).astype(str)
+    erros = []
+    if len(pendentes):
+        normalizados = _normalizar_monetario(normalizados)
+        simples = normalizados.str.fullmatch(_REGEX_FLOAT).to_numpy(dtype=bool)
+        valores[pendentes[simples]] = normalizados[simples].to_numpy(dtype=str).astype('float64')
+        # float() do Python aceita algumas grafias a mais (ex: 'inf', '1_000')
+        for i in np.flatnonzero(~simples):
+            try:
+                valores[pendentes[i]] = float(normalizados.iat[i])
+            except ValueError:
+                erros.append(i)
+
+    if centavos:
+        por_unico = _reais_para_centavos(valores)
+        por_unico[resolvido] = centavos_unicos[resolvido]
+        convertido = por_unico.take(codigos, allow_fill=True)
+    else:
+        convertido = np.full(len(codigos), np.nan)
+        validos = codigos >= 0
+        convertido[validos] = valores[codigos[validos]]
+    resultado = pd.Series(convertido, index=serie.index, name=serie.name)
+
+    if not erros:
+        return resultado, _relatorio_erros_vazio()
+
+    normalizado_por_unico = pd.Series(normalizados.to_numpy()[erros], index=pendentes[erros])
+    linhas_erro = np.flatnonzero(np.isin(codigos, pendentes[erros]))
+    relatorio = pd.DataFrame({
+        'coluna': coluna if coluna is not None else serie.name,
+        'linha': serie.index[linhas_erro],
+        'valor_original': unicos[codigos[linhas_erro]],
+        'valor_normalizado': normalizado_por_unico.loc[codigos[linhas_erro]].to_numpy(),
+    })
+    return resultado, relatorio
+
+
+def _relatorio_erros_vazio():
+    return pd.DataFrame(columns=['coluna', 'linha', 'valor_original', 'valor_normalizado'])
+
+
+def preprocess(df, copiar=True, compacto=False, centavos=False):
     """
     Processa e limpa o DataFrame do extrato bancário
     Corrige problema de conversão de valores monetários mistos
+
+    Com `copiar=False` o DataFrame recebido é reaproveitado (útil quando ele
+    é descartável, como os blocos da leitura em streaming). Com
+    `compacto=True` o resultado já sai no esquema de `compactar_tipos`.
+
+    Com `centavos=True` o parser também gera `valor_centavos` (int64) e
+    `saldo_centavos` (Int64), usados pelas análises para somas exatas;
+    `valor` e `saldo` passam a ser esses centavos divididos por 100.
     """
-    df = df.copy()
+    if copiar:
+        df = df.copy()
 
     df.columns = (
         df.columns
@@ -28,80 +338,80 @@ def preprocess(df):
     # 🔥 CONVERSÃO ROBUSTA DE VALORES MONETÁRIOS
     # Problema: O Banco Inter pode exportar em formato BR (vírgula) ou US (ponto)
     # Precisamos detectar automaticamente o formato
+    relatorios = []
     for col in ['valor', 'saldo']:
-        def converter_valor_monetario(valor_str):
-            """
-            Converte strings monetárias nos formatos:
-            - Brasileiro: 1.234,56 ou 40,00
-            - Americano: 1,234.56 ou 40.00 ou 545.76
-            """
-            if pd.isna(valor_str):
-                return np.nan
-            
-            valor_str = str(valor_str).strip()
-            
-            # Remove espaços
-            valor_str = valor_str.replace(' ', '')
-            
-            # Conta quantas vírgulas e pontos existem
-            num_virgulas = valor_str.count(',')
-            num_pontos = valor_str.count('.')
-            
-            # Formato brasileiro: vírgula é decimal
-            if num_virgulas == 1 and num_pontos <= 1:
-                if num_pontos == 1:
-                    # Ex: 1.234,56 - remove ponto (milhar) e troca vírgula por ponto
-                    valor_str = valor_str.replace('.', '').replace(',', '.')
-                else:
-                    # Ex: 40,00 ou -40,00 - apenas troca vírgula por ponto
-                    valor_str = valor_str.replace(',', '.')
-            
-            # Formato americano: ponto é decimal
-            elif num_pontos == 1 and num_virgulas == 0:
-                # Ex: 545.76 ou 40.00 ou -40.00 - já está correto
-                pass
-            
-            # Tem vírgula como separador de milhar
-            elif num_pontos == 1 and num_virgulas >= 1:
-                # Ex: 1,234.56 - remove vírgula (milhar)
-                valor_str = valor_str.replace(',', '')
-            
-            # Apenas pontos (milhares)
-            elif num_pontos > 1 and num_virgulas == 0:
-                # Ex: 1.234.567 - remove pontos (milhares)
-                valor_str = valor_str.replace('.', '')
-            
-            # Apenas vírgulas
-            elif num_virgulas > 1 and num_pontos == 0:
-                # Ex: 1,234,567 - remove vírgulas (milhares)
-                valor_str = valor_str.replace(',', '')
-            
-            # Misto complexo
-            elif num_pontos > 0 and num_virgulas > 0:
-                # Descobre qual é o separador decimal (último caractere especial)
-                ultima_virgula = valor_str.rfind(',')
-                ultimo_ponto = valor_str.rfind('.')
-                
-                if ultima_virgula > ultimo_ponto:
-                    # Vírgula é decimal: Ex: 1.234.567,89
-                    valor_str = valor_str.replace('.', '').replace(',', '.')
-                else:
-                    # Ponto é decimal: Ex: 1,234,567.89
-                    valor_str = valor_str.replace(',', '')
-            
-            try:
-                return float(valor_str)
-            except ValueError:
-                print(f"Erro ao converter: {valor_str}")
-                return np.nan
-        
-        df[col] = df[col].apply(converter_valor_monetario)
+        if centavos:
+            em_centavos, erros = converter_valores_monetarios(df[col], coluna=col, centavos=True)
+            df[f'{col}_centavos'] = em_centavos
+            df[col] = em_centavos.to_numpy(dtype='float64', na_value=np.nan) / 100
+        else:
+            df[col], erros = converter_valores_monetarios(df[col], coluna=col)
+        relatorios.append(erros)
+
+    # Valores que não puderam ser convertidos ficam registrados no próprio
+    # DataFrame (como registros, para o attrs continuar comparável no concat)
+    # em vez de um print por linha
+    df.attrs['erros_conversao'] = [
+        erro for relatorio in relatorios for erro in relatorio.to_dict('records')
+    ]
 
     df = df.dropna(subset=['data', 'valor'])
+    if centavos:
+        df['valor_centavos'] = df['valor_centavos'].astype('int64')
+
+    # Calendário: cada transação guarda o dia (desde 1970-01-01) e os
+    # atributos vêm da tabela de dias do período, por gather
+    df['dia'] = dias_desde_epoca(df['data'])
+    for col, valores in atributos_calendario(df['dia'].to_numpy(), COLUNAS_TRANSACAO).items():
+        df[col] = valores
+        if not compacto:
+            df[col] = df[col].astype(TIPOS_CALENDARIO_PADRAO[col])
+
+    if compacto:
+        df = compactar_tipos(df)
+
+    return df
+
 
-    df['ano'] = df['data'].dt.year
-    df['mes'] = df['data'].dt.month
-    df['mes_ano'] = df['data'].dt.to_period('M').astype(str)
-    df['semestre'] = df['data'].dt.month.apply(lambda x: 1 if x <= 6 else 2)
+# Esquema compacto: textos repetitivos viram categóricos (dicionário de
+# valores + códigos inteiros) e os campos de calendário, inteiros pequenos
+COLUNAS_CATEGORICAS = ['descricao', 'historico', 'mes_ano', 'categoria']
+INTEIROS_PEQUENOS = {'ano': 'int16', 'mes': 'int8', 'semestre': 'int8'}
 
-    return df
\ No newline at end of file
+
+def compactar_tipos(df):
+    """
+    Converte o DataFrame processado para o esquema compacto (altera e
+    devolve o próprio DataFrame).
+
+    As categorias ficam ordenadas, então agrupar por `mes_ano` continua
+    saindo em ordem cronológica.
+    """
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            valores = sorted(df[col].dropna().unique(), key=str)
+            df[col] = pd.Categorical(df[col], categories=valores)
+    for col, tipo in INTEIROS_PEQUENOS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(tipo)
+    return df
+
+
+def relatorio_memoria(antes, depois):
+    """
+    Compara o uso de memória (em bytes, contando o conteúdo das strings)
+    de duas versões do mesmo DataFrame, coluna a coluna.
+    """
+    bytes_antes = antes.memory_usage(deep=True, index=False)
+    bytes_depois = depois.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({
+        'tipo_antes': antes.dtypes.astype(str),
+        'bytes_antes': bytes_antes,
+        'tipo_depois': depois.dtypes.astype(str),
+        'bytes_depois': bytes_depois,
+    })
+    relatorio.loc['total'] = ['', bytes_antes.sum(), '', bytes_depois.sum()]
+    relatorio['reducao_%'] = (
+        (1 - relatorio['bytes_depois'] / relatorio['bytes_antes']) * 100
+    ).astype(float).round(1)
+    return relatorio
\ No newline at end of file
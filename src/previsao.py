@@ -0,0 +1,231 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.cubo import SEM_CATEGORIA, eixo_meses, montar_cubo, rotulos_mes
+
+# Período sazonal (meses); a sazonalidade só entra com dois ciclos completos
+PERIODO = 12
+MINIMO_MESES_SAZONAL = 2 * PERIODO
+
+# Histórico mínimo (meses) para projetar
+MINIMO_MESES = 3
+
+# Horizonte máximo da projeção (meses)
+HORIZONTE_MAXIMO = 12
+
+# Amortecimento da tendência: projeções longas não seguem a reta para sempre
+AMORTECIMENTO = 0.95
+
+# Grade de parâmetros de suavização (nível, tendência e sazonalidade), na
+# forma de inovações; só valem as combinações com beta <= alfa e
+# gama <= 1 - alfa
+ALFAS = [0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9]
+BETAS = [0.0, 0.01, 0.05, 0.1]
+GAMAS = [0.0, 0.05, 0.1, 0.2]
+
+# Quantil da normal para o intervalo de 80%
+Z_INTERVALO = 1.2816
+
+# Parâmetros escolhidos por impressão digital da série (conteúdo e
+# configuração): séries iguais entre reruns não refazem a busca em grade.
+# O app roda em threads: o cache só é lido e alterado com a trava
+LIMITE_CACHE = 4096
+_parametros = {}
+_trava_parametros = threading.Lock()
+_CONFIGURACAO = repr((PERIODO, AMORTECIMENTO, ALFAS, BETAS, GAMAS)).encode()
+
+COLUNAS = ['tipo', 'serie', 'mes_ano', 'previsto', 'inferior', 'superior']
+
+
+def series_mensais(cubo):
+    """
+    Gastos e entradas (em reais) de cada mês, no total e por categoria, num
+    eixo de meses contínuo (mês sem transação fica zerado). Linhas indexadas
+    por (tipo, serie), colunas por `mes_ano`; séries sempre zeradas ficam de
+    fora.
+    """
+    if cubo.empty:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=['tipo', 'serie']))
+    escala = cubo.attrs.get('escala', 1)
+    mes, primeiro, num_meses = eixo_meses(cubo)
+
+    # Categoria vazia (None) conta só no total; sem a coluna categoria no
+    # extrato, o cubo só tem SEM_CATEGORIA e as séries por categoria repetiriam o total
+    codigos, categorias = pd.factorize(cubo['categoria'], sort=True)
+    if len(categorias) and (categorias == SEM_CATEGORIA).all():
+        categorias = categorias[:0]
+    com_categoria = (codigos >= 0) & (codigos < len(categorias))
+
+    linhas, rotulos = [], []
+    for tipo in ('gastos', 'entradas'):
+        valores = cubo[tipo].to_numpy(dtype=np.float64) / escala
+        linhas.append(np.bincount(mes, weights=valores, minlength=num_meses)[None, :])
+        rotulos.append((tipo, 'Total'))
+        por_categoria = np.bincount(
+            codigos[com_categoria] * num_meses + mes[com_categoria],
+            weights=valores[com_categoria], minlength=len(categorias) * num_meses,
+        ).reshape(len(categorias), num_meses)
+        usadas = np.flatnonzero(por_categoria.any(axis=1))
+        linhas.append(por_categoria[usadas])
+        rotulos.extend((tipo, categorias[c]) for c in usadas)
+
+    matriz = np.concatenate(linhas)
+    usadas = matriz.any(axis=1)
+    return pd.DataFrame(
+        matriz[usadas],
+        index=pd.MultiIndex.from_tuples([r for r, u in zip(rotulos, usadas) if u], names=['tipo', 'serie']),
+        columns=pd.Index(rotulos_mes(np.arange(num_meses) + primeiro), name='mes_ano'),
+    )
+
+
+def _grade(sazonal):
+    """Combinações válidas de (alfa, beta, gama) da grade"""
+    alfa, beta, gama = np.meshgrid(ALFAS, BETAS, GAMAS if sazonal else [0.0], indexing='ij')
+    alfa, beta, gama = alfa.ravel(), beta.ravel(), gama.ravel()
+    validas = (beta <= alfa) & (gama <= 1 - alfa)
+    return alfa[validas], beta[validas], gama[validas]
+
+
+def _suavizar(y, alfa, beta, gama, sazonal):
+    """
+    Holt-Winters aditivo com tendência amortecida (forma de inovações) para
+    todas as séries (linhas de `y`) e todos os parâmetros (colunas de
+    `alfa`, `beta` e `gama`) de uma vez: o estado é uma matriz séries ×
+    parâmetros e o laço só percorre os meses.
+
+    Retorna a soma dos erros quadrados de um passo, quantos erros entraram
+    nela e o estado final (nível, tendência e sazonalidade).
+    """
+    num_series, num_meses = y.shape
+    forma = np.broadcast_shapes((num_series, 1), np.shape(alfa))
+    periodo = PERIODO if sazonal else 1
+    if sazonal:
+        # Nível e tendência pelas médias dos dois primeiros ciclos;
+        # sazonalidade pelo desvio de cada mês do primeiro ciclo
+        primeiro = y[:, :PERIODO].mean(axis=1)
+        tendencia_inicial = (y[:, PERIODO:2 * PERIODO].mean(axis=1) - primeiro) / PERIODO
+        centro = primeiro[:, None] + tendencia_inicial[:, None] * (np.arange(PERIODO) - (PERIODO - 1) / 2)
+        nivel = np.broadcast_to((centro[:, -1])[:, None], forma).copy()
+        tendencia = np.broadcast_to(tendencia_inicial[:, None], forma).copy()
+        sazonalidade = np.broadcast_to((y[:, :PERIODO] - centro)[:, None, :], forma + (PERIODO,)).copy()
+        inicio = PERIODO
+    else:
+        nivel = np.broadcast_to(y[:, :1], forma).copy()
+        tendencia = np.zeros(forma)
+        sazonalidade = np.zeros(forma + (1,))
+        inicio = 1
+
+    soma_erros = np.zeros(forma)
+    for t in range(inicio, num_meses):
+        k = t % periodo
+        erro = y[:, t, None] - (nivel + AMORTECIMENTO * tendencia + sazonalidade[:, :, k])
+        soma_erros += erro * erro
+        nivel += AMORTECIMENTO * tendencia + alfa * erro
+        tendencia *= AMORTECIMENTO
+        tendencia += beta * erro
+        sazonalidade[:, :, k] += gama * erro
+    return soma_erros, num_meses - inicio, nivel, tendencia, sazonalidade
+
+
+def _impressao(serie, sazonal):
+    return hashlib.blake2b(
+        serie.tobytes() + bytes([sazonal]) + _CONFIGURACAO, digest_size=16
+    ).digest()
+
+
+def ajustar(y, sazonal):
+    """
+    (alfa, beta, gama) de cada série: do cache, pela impressão digital, ou
+    da busca em grade (menor erro de um passo), feita em lote só para as
+    séries que faltam
+    """
+    impressoes = [_impressao(serie, sazonal) for serie in y]
+    with _trava_parametros:
+        escolhidos = {imp: _parametros[imp] for imp in impressoes if imp in _parametros}
+    faltam = [i for i, imp in enumerate(impressoes) if imp not in escolhidos]
+    if faltam:
+        # A busca roda fora da trava; só a gravação no cache é exclusiva
+        alfa, beta, gama = _grade(sazonal)
+        soma_erros, _, _, _, _ = _suavizar(y[faltam], alfa, beta, gama, sazonal)
+        for i, g in zip(faltam, soma_erros.argmin(axis=1).tolist()):
+            escolhidos[impressoes[i]] = (alfa[g], beta[g], gama[g])
+        with _trava_parametros:
+            for i in faltam:
+                _parametros.pop(impressoes[i], None)
+                while len(_parametros) >= LIMITE_CACHE:
+                    # Descarta o mais antigo (dict mantém a ordem de inserção)
+                    del _parametros[next(iter(_parametros))]
+                _parametros[impressoes[i]] = escolhidos[impressoes[i]]
+    return np.array([escolhidos[imp] for imp in impressoes]).reshape(len(impressoes), 3).T
+
+
+def mes_incompleto(df):
+    """
+    `mes_ano` do último mês do extrato, se ele termina antes do fim desse
+    mês (o mês ainda está em andamento); None se o último mês está completo
+    """
+    if not len(df):
+        return None
+    ultima = df['data'].max()
+    return None if ultima.is_month_end else str(ultima.to_period('M'))
+
+
+def prever_mensal(df, horizonte=6, cubo=None):
+    """
+    Projeção dos próximos `horizonte` meses (até HORIZONTE_MAXIMO) de
+    gastos e entradas, no total e por categoria, com intervalo de 80%.
+
+    Todas as séries de `series_mensais` são ajustadas juntas por
+    Holt-Winters aditivo com tendência amortecida (sazonalidade anual com
+    pelo menos dois anos de histórico). Um mês final incompleto (extrato
+    terminando antes do fim do mês) fica de fora do ajuste e entra na
+    projeção. Retorna uma linha por (tipo, serie, mes_ano).
+    """
+    if not 1 <= horizonte <= HORIZONTE_MAXIMO:
+        raise ValueError(f"horizonte deve ficar entre 1 e {HORIZONTE_MAXIMO} meses")
+    cubo = montar_cubo(df) if cubo is None else cubo
+    series = series_mensais(cubo)
+    if series.shape[1] and mes_incompleto(df) is not None:
+        series = series.iloc[:, :-1]
+        series = series[series.to_numpy().any(axis=1)]
+    num_meses = series.shape[1]
+    if num_meses < MINIMO_MESES or series.empty:
+        return pd.DataFrame(columns=COLUNAS)
+
+    y = series.to_numpy()
+    sazonal = num_meses >= MINIMO_MESES_SAZONAL
+    alfa, beta, gama = ajustar(y, sazonal)
+    soma_erros, num_erros, nivel, tendencia, sazonalidade = _suavizar(
+        y, alfa[:, None], beta[:, None], gama[:, None], sazonal
+    )
+    # Desvio dos erros de um passo, descontando os três parâmetros ajustados
+    desvio = np.sqrt(soma_erros[:, 0] / max(num_erros - 3, 1))
+
+    passos = np.arange(1, horizonte + 1)
+    acumulado = np.cumsum(AMORTECIMENTO ** passos)
+    periodo = PERIODO if sazonal else 1
+    previsto = (
+        nivel[:, 0, None] + acumulado * tendencia[:, 0, None]
+        + sazonalidade[:, 0, (num_meses + passos - 1) % periodo]
+    )
+    # Variância de h passos: desvio² × (1 + soma dos c_j², j < h), com
+    # c_j = alfa + beta × (φ + ... + φ^j) + gama nos múltiplos do período
+    c = alfa[:, None] + beta[:, None] * acumulado[:-1] + gama[:, None] * (passos[:-1] % periodo == 0)
+    variancia = desvio[:, None] ** 2 * (1 + np.concatenate([np.zeros((len(y), 1)), np.cumsum(c * c, axis=1)], axis=1))
+    margem = Z_INTERVALO * np.sqrt(variancia)
+
+    ultimo = pd.Period(series.columns[-1], freq='M')
+    meses = [str(ultimo + p) for p in passos.tolist()]
+    tipo, serie = series.index.get_level_values('tipo'), series.index.get_level_values('serie')
+    # Gastos e entradas não ficam negativos
+    return pd.DataFrame({
+        'tipo': np.repeat(np.asarray(tipo, dtype=object), horizonte),
+        'serie': np.repeat(np.asarray(serie, dtype=object), horizonte),
+        'mes_ano': np.tile(np.array(meses, dtype=object), len(y)),
+        'previsto': np.maximum(previsto, 0).ravel(),
+        'inferior': np.maximum(previsto - margem, 0).ravel(),
+        'superior': np.maximum(previsto + margem, 0).ravel(),
+    })
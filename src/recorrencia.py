@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from src.cubo import NS_POR_DIA, agrupar, ordem_por_grupo, valores_e_escala
+
+# Ruído que muda entre cobranças da mesma assinatura: datas, marcadores de
+# parcela e números em geral (pedido, loja, NSU). Aplicados em ordem.
+PADROES_RUIDO = [
+    r'\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b',           # 05/03, 05/03/2024
+    r'\bparc(?:ela)?s?\.?\s*\d+\s*(?:/|de)\s*\d+\b',     # parcela 3/12, parc 3 de 12
+    r'\d+',
+    r'\bparc(?:ela)?s?\b',
+    r'[^\w]+',
+    r'_+',
+]
+
+# Periodicidades reconhecidas: (nome, intervalo mínimo e máximo em dias,
+# mínimo de cobranças). As faixas absorvem meses de 28 a 31 dias e
+# cobranças adiadas para o próximo dia útil
+CADENCIAS = [
+    ('semanal', 5, 9, 4),
+    ('mensal', 25, 35, 3),
+    ('anual', 350, 380, 2),
+]
+
+# Fração mínima dos intervalos do grupo dentro da faixa da periodicidade
+LIMIAR_REGULARIDADE = 0.75
+
+# Coeficiente de variação máximo do valor (desvio / média) de uma recorrência
+LIMIAR_VARIACAO_VALOR = 0.3
+
+# Com um intervalo só não dá para medir a regularidade: o valor precisa
+# praticamente se repetir
+LIMIAR_VARIACAO_UM_INTERVALO = 0.02
+
+# Na segunda passada (mesmo valor exato), duas coincidências são comuns em
+# extratos grandes: exige pelo menos três cobranças
+MINIMO_COBRANCAS_POR_VALOR = 3
+
+COLUNAS = [
+    'descricao', 'frequencia', 'valor_medio', 'total_gasto', 'periodicidade',
+    'intervalo_dias', 'variacao_valor', 'ultima_data', 'proxima_data', 'ativa', 'linha',
+]
+
+
+def normalizar_descricoes(descricoes):
+    """
+    Descrição sem datas, parcelas e números, em minúsculas e com espaços
+    simples; as que ficariam vazias (só números) continuam como estavam
+    """
+    base = descricoes.astype(str).str.lower().str.strip()
+    normalizadas = base
+    for padrao in PADROES_RUIDO:
+        normalizadas = normalizadas.str.replace(padrao, ' ', regex=True)
+    normalizadas = normalizadas.str.split().str.join(' ')
+    return normalizadas.where(normalizadas != '', base)
+
+
+def assinaturas(descricoes):
+    """
+    Assinatura (hash de 64 bits da descrição normalizada) de cada
+    descrição. A normalização roda uma vez por descrição distinta.
+    """
+    codigos, unicas = pd.factorize(descricoes)
+    normalizadas = normalizar_descricoes(pd.Series(unicas, dtype=object))
+    por_unica = pd.util.hash_array(normalizadas.to_numpy(dtype=object))
+    # Descrição vazia (código -1) fica com a assinatura 0
+    return np.where(codigos >= 0, por_unica[np.maximum(codigos, 0)], 0).astype(np.uint64)
+
+
+def _mediana_por_grupo(valores, grupos, inicios, tamanhos):
+    """Mediana de `valores` em cada grupo (grupos contíguos e não vazios)"""
+    ordenados = valores[ordem_por_grupo(grupos, valores)]
+    baixo = ordenados[inicios + (tamanhos - 1) // 2]
+    alto = ordenados[inicios + tamanhos // 2]
+    return (baixo + alto) / 2
+
+
+def _proximas_datas(ultimas, periodicidade):
+    """Próxima cobrança: uma semana, um mês ou um ano após a última"""
+    ultimas = pd.DatetimeIndex(ultimas)
+    return np.select(
+        [periodicidade == 'semanal', periodicidade == 'mensal'],
+        [
+            (ultimas + pd.Timedelta(days=7)).to_numpy(),
+            (ultimas + pd.DateOffset(months=1)).to_numpy(),
+        ],
+        (ultimas + pd.DateOffset(years=1)).to_numpy(),
+    )
+
+
+def _grupos_recorrentes(chave, dias, valor, min_frequencia):
+    """
+    Agrupa as cobranças por `chave` (ordenando por chave e data, cada grupo
+    vira uma faixa contígua) e mede cada grupo com operações por faixa.
+
+    Retorna um DataFrame com os grupos recorrentes (`linha` é a posição, na
+    entrada, da cobrança mais recente) e a máscara das cobranças que
+    ficaram em grupos não recorrentes.
+    """
+    ordem, grupo, inicios = agrupar(chave, dias)
+    dias, valor = dias[ordem], valor[ordem]
+    tamanhos = np.diff(np.append(inicios, len(ordem)))
+    finais = inicios + tamanhos - 1
+    num_grupos = len(inicios)
+
+    # Intervalos entre cobranças consecutivas do mesmo grupo
+    dentro = grupo[1:] == grupo[:-1]
+    intervalos = np.diff(dias)[dentro]
+    grupo_intervalo = grupo[1:][dentro]
+    n_intervalos = tamanhos - 1
+    com_intervalo = n_intervalos > 0
+    inicios_intervalo = np.cumsum(n_intervalos) - n_intervalos
+    mediana = np.full(num_grupos, np.nan)
+    mediana[com_intervalo] = _mediana_por_grupo(
+        intervalos, grupo_intervalo, inicios_intervalo[com_intervalo], n_intervalos[com_intervalo]
+    )
+
+    periodicidade = np.full(num_grupos, '', dtype=object)
+    regulares = np.zeros(num_grupos)
+    suficientes = np.zeros(num_grupos, dtype=bool)
+    for nome, minimo, maximo, cobrancas in CADENCIAS:
+        da_cadencia = (mediana >= minimo) & (mediana <= maximo)
+        periodicidade[da_cadencia] = nome
+        suficientes |= da_cadencia & (tamanhos >= max(min_frequencia, cobrancas))
+        na_faixa = (intervalos >= minimo) & (intervalos <= maximo) & da_cadencia[grupo_intervalo]
+        regulares += np.bincount(grupo_intervalo[na_faixa], minlength=num_grupos)
+    regularidade = np.divide(regulares, n_intervalos, out=np.zeros(num_grupos), where=com_intervalo)
+
+    soma = np.add.reduceat(valor, inicios)
+    media = soma / tamanhos
+    variancia = np.maximum(np.add.reduceat(valor * valor, inicios) / tamanhos - media * media, 0)
+    variacao = np.sqrt(variancia) / media
+    limite_variacao = np.where(n_intervalos == 1, LIMIAR_VARIACAO_UM_INTERVALO, LIMIAR_VARIACAO_VALOR)
+
+    recorrente = suficientes & (regularidade >= LIMIAR_REGULARIDADE) & (variacao <= limite_variacao)
+    resto = np.empty(len(ordem), dtype=bool)
+    resto[ordem] = ~recorrente[grupo]
+
+    selecionados = np.flatnonzero(recorrente)
+    grupos = pd.DataFrame({
+        'linha': ordem[finais[selecionados]],
+        'frequencia': tamanhos[selecionados],
+        'soma': soma[selecionados],
+        'media': media[selecionados],
+        'periodicidade': periodicidade[selecionados],
+        'intervalo_dias': mediana[selecionados],
+        'variacao_valor': variacao[selecionados],
+        'ultimo_dia': dias[finais[selecionados]],
+    })
+    return grupos, resto
+
+
+def detectar_recorrencias(df, min_frequencia=2):
+    """
+    Gastos recorrentes: descrições agrupadas pela assinatura normalizada,
+    com periodicidade (semanal, mensal ou anual) tirada dos intervalos
+    entre cobranças e valor estável.
+
+    Tudo por ordenação: as linhas são ordenadas por (assinatura, data) e
+    cada grupo vira uma faixa contígua, agregada com `reduceat`/`bincount`.
+    Um grupo entra quando tem cobranças suficientes para a periodicidade
+    (e `min_frequencia`), a mediana dos intervalos cai numa das faixas de
+    CADENCIAS, pelo menos LIMIAR_REGULARIDADE dos intervalos ficam nessa
+    faixa e o valor varia menos que LIMIAR_VARIACAO_VALOR. O que sobra é
+    reagrupado por (assinatura, valor exato), o que acha assinaturas de
+    preço fixo no meio de compras avulsas no mesmo estabelecimento.
+
+    Para cada recorrência, prevê a próxima cobrança; `ativa` diz se a
+    última ainda está dentro da faixa da periodicidade no fim do extrato;
+    `linha` é a posição (para `iloc`) dessa última cobrança em `df`.
+    """
+    valores, escala = valores_e_escala(df)
+    valores = valores.to_numpy(dtype=np.int64 if escala != 1 else np.float64)
+    gasto = valores < 0
+    if not gasto.any():
+        return pd.DataFrame(columns=COLUNAS)
+
+    datas = df['data'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    fim_extrato = datas.max() // NS_POR_DIA
+    posicoes = np.flatnonzero(gasto)
+    assinatura = assinaturas(df['descricao'].iloc[posicoes])
+    dias = datas[posicoes] // NS_POR_DIA
+    valor = -valores[posicoes].astype(np.float64)
+
+    grupos, resto = _grupos_recorrentes(assinatura, dias, valor, min_frequencia)
+    grupos['linha'] = posicoes[grupos['linha'].to_numpy()]
+    # Segunda passada só com os pares (assinatura, valor) que se repetem o
+    # bastante, para não reordenar o extrato inteiro de novo
+    minimo_por_valor = max(min_frequencia, MINIMO_COBRANCAS_POR_VALOR)
+    codigos_assinatura, _ = pd.factorize(assinatura)
+    codigos_valor, _ = pd.factorize(valor)
+    par = codigos_assinatura.astype(np.int64) * (int(codigos_valor.max()) + 1) + codigos_valor
+    codigos_par, _ = pd.factorize(par)
+    sobra = np.flatnonzero(resto & (np.bincount(codigos_par)[codigos_par] >= minimo_por_valor))
+    if len(sobra):
+        por_valor, _ = _grupos_recorrentes(par[sobra], dias[sobra], valor[sobra], minimo_por_valor)
+        por_valor['linha'] = posicoes[sobra[por_valor['linha'].to_numpy()]]
+        grupos = pd.concat([grupos, por_valor], ignore_index=True)
+    if grupos.empty:
+        return pd.DataFrame(columns=COLUNAS)
+
+    periodicidade = grupos['periodicidade'].to_numpy()
+    ultimo_dia = grupos['ultimo_dia'].to_numpy()
+    ultimas = (ultimo_dia * NS_POR_DIA).astype('datetime64[ns]')
+    folga = np.select(
+        [periodicidade == nome for nome, _, _, _ in CADENCIAS], [maximo for _, _, maximo, _ in CADENCIAS]
+    )
+    recorrentes = pd.DataFrame({
+        # Descrição como apareceu na cobrança mais recente
+        'descricao': df['descricao'].iloc[grupos['linha'].to_numpy()].astype(object).to_numpy(),
+        'frequencia': grupos['frequencia'].to_numpy(),
+        'valor_medio': grupos['media'].to_numpy() / escala,
+        'total_gasto': grupos['soma'].to_numpy() / escala,
+        'periodicidade': periodicidade,
+        'intervalo_dias': grupos['intervalo_dias'].to_numpy(),
+        'variacao_valor': grupos['variacao_valor'].to_numpy(),
+        'ultima_data': ultimas,
+        'proxima_data': _proximas_datas(ultimas, periodicidade),
+        'ativa': ultimo_dia + folga >= fim_extrato,
+        'linha': grupos['linha'].to_numpy(),
+    })
+    return recorrentes.sort_values('total_gasto', ascending=False, kind='stable', ignore_index=True)
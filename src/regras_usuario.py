@@ -0,0 +1,320 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+from src.categorizacao import _construir_automato, categorizar_unicas, prioridade_palavras_chave
+from src.classificador import reclassificar_outros
+
+# Arquivo com as regras do usuário (pode ser trocado pela variável de ambiente)
+ARQUIVO_REGRAS = Path(os.environ.get('LUMEN_REGRAS', Path.home() / '.config' / 'lumen' / 'regras.json'))
+
+# 'palavra': a palavra aparece em qualquer ponto da descrição (como nas
+# regras fixas); 'descricao': a descrição inteira é exatamente o texto
+TIPOS_REGRA = ('palavra', 'descricao')
+
+# Tamanho dos n-gramas indexados por `IndiceTokens`
+TAMANHO_NGRAMA = 3
+
+
+def _normalizar(texto):
+    return texto.lower().strip()
+
+
+def _ngramas(texto, n):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+@contextmanager
+def _trava_arquivo(caminho):
+    """Trava exclusiva entre processos, num arquivo `.lock` ao lado de `caminho`"""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho.with_name(caminho.name + '.lock'), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RegrasUsuario:
+    """
+    Regras de categorização criadas pelo usuário, gravadas em JSON.
+
+    As regras do usuário vêm antes das regras fixas de `src.categorizacao`.
+    Entre elas vence a de maior `prioridade` e, no empate, a mais recente.
+    Todas as palavras são compiladas num único autômato, refeito só quando
+    as regras mudam.
+
+    O arquivo é compartilhado por todas as sessões do app: cada alteração
+    relê o arquivo sob uma trava entre processos, aplica só a própria
+    mudança e grava. Assim regras criadas em outra sessão não se perdem
+    (e passam a valer nesta); os textos delas ficam em `alteradas_fora`
+    para o `recategorizar` também refazer as linhas que elas afetam.
+    """
+
+    def __init__(self, caminho=ARQUIVO_REGRAS):
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+        self._compiladas = None
+        self.regras = []
+        self._proximo_id = 1
+        self._textos_alterados_fora = set()
+        self._carregar()
+        # A primeira leitura não é alteração: o extrato é categorizado com ela
+        self._textos_alterados_fora.clear()
+
+    def __len__(self):
+        return len(self.regras)
+
+    def _carregar(self):
+        antigas = {r['id']: r for r in self.regras}
+        if self.caminho.exists():
+            dados = json.loads(self.caminho.read_text(encoding='utf-8'))
+            self.regras = dados.get('regras', [])
+            self._proximo_id = dados.get('proximo_id', len(self.regras) + 1)
+        self._compiladas = None
+
+        # Regras criadas, removidas ou editadas por outra sessão desde a
+        # última leitura: tanto o texto antigo quanto o novo afetam linhas
+        novas = {r['id']: r for r in self.regras}
+        self._textos_alterados_fora.update(
+            regra['texto'] for id_regra, regra in chain(antigas.items(), novas.items())
+            if antigas.get(id_regra) != novas.get(id_regra)
+        )
+
+    def alteradas_fora(self):
+        """
+        Textos das regras que outras sessões criaram, removeram ou editaram,
+        percebidas ao reler o arquivo. Esvazia a lista a cada chamada.
+        """
+        with self._trava:
+            textos = sorted(self._textos_alterados_fora)
+            self._textos_alterados_fora.clear()
+        return textos
+
+    def salvar(self):
+        """Grava as regras de forma atômica (arquivo temporário + rename)"""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        dados = {'proximo_id': self._proximo_id, 'regras': self.regras}
+        fd, temporario = tempfile.mkstemp(dir=self.caminho.parent, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho)
+
+    @contextmanager
+    def _alterando(self):
+        """
+        Relê o arquivo sob as travas (thread e processo), deixa o bloco
+        alterar as regras e grava o resultado. Se o bloco falhar, nada é
+        gravado.
+        """
+        with self._trava, _trava_arquivo(self.caminho):
+            self._carregar()
+            yield
+            self.salvar()
+
+    def _buscar(self, id_regra):
+        for regra in self.regras:
+            if regra['id'] == id_regra:
+                return regra
+        raise KeyError(f'Regra {id_regra} não existe')
+
+    def adicionar(self, texto, categoria, prioridade=0, tipo='palavra'):
+        """Cria uma regra e grava o arquivo. Retorna a regra criada."""
+        if tipo not in TIPOS_REGRA:
+            raise ValueError(f'Tipo de regra inválido: {tipo}')
+        if not _normalizar(texto) or not categoria.strip():
+            raise ValueError('A regra precisa de um texto e de uma categoria')
+        with self._alterando():
+            regra = {
+                'id': self._proximo_id,
+                'tipo': tipo,
+                'texto': _normalizar(texto),
+                'categoria': categoria.strip(),
+                'prioridade': int(prioridade),
+            }
+            self._proximo_id += 1
+            self.regras.append(regra)
+        return regra
+
+    def editar(self, id_regra, **campos):
+        """Altera campos de uma regra. Retorna (regra antiga, regra nova)."""
+        with self._alterando():
+            regra = self._buscar(id_regra)
+            antiga = dict(regra)
+            if 'texto' in campos:
+                campos['texto'] = _normalizar(campos['texto'])
+            regra.update({k: v for k, v in campos.items() if k in ('texto', 'categoria', 'prioridade', 'tipo')})
+        return antiga, dict(regra)
+
+    def remover(self, id_regra):
+        """Remove uma regra. Retorna a regra removida."""
+        with self._alterando():
+            regra = self._buscar(id_regra)
+            self.regras.remove(regra)
+        return regra
+
+    def _compilar(self):
+        """
+        Ordena as regras por precedência e monta o autômato das regras de
+        palavra e o dicionário das regras de descrição exata. A posição na
+        ordem é a prioridade usada no autômato (menor vence).
+        """
+        if self._compiladas is None:
+            ordem = sorted(self.regras, key=lambda r: (-r['prioridade'], -r['id']))
+            sem_regra = len(ordem)
+            palavras = [(r['texto'], i) for i, r in enumerate(ordem) if r['tipo'] == 'palavra']
+            exatas = {}
+            for i, r in enumerate(ordem):
+                if r['tipo'] == 'descricao':
+                    exatas.setdefault(r['texto'], i)
+            automato = _construir_automato(palavras, sem_regra) if palavras else None
+            categorias = np.array([r['categoria'] for r in ordem] + [None], dtype=object)
+            self._compiladas = (automato, exatas, categorias, sem_regra)
+        return self._compiladas
+
+    def categorizar(self, descricoes, categorias_base):
+        """
+        Aplica as regras do usuário por cima das categorias de base: onde
+        alguma regra casa, a categoria dela substitui a de base. Trabalha
+        sobre as descrições distintas.
+        """
+        descricoes = pd.Series(descricoes)
+        base = pd.Series(categorias_base, index=descricoes.index).astype(object)
+        if not self.regras:
+            return base
+
+        automato, exatas, categorias, sem_regra = self._compilar()
+        codigos, unicas = pd.factorize(descricoes)
+        normalizadas = [_normalizar(d) for d in np.asarray(unicas, dtype=object)]
+
+        posicao = np.full(len(normalizadas), sem_regra, dtype=np.int32)
+        if automato is not None:
+            posicao = prioridade_palavras_chave(normalizadas, automato)
+        if exatas:
+            exata = np.array([exatas.get(d, sem_regra) for d in normalizadas], dtype=np.int32)
+            posicao = np.minimum(posicao, exata)
+
+        # Código -1 (descrição vazia) nunca casa regra
+        por_linha = np.append(posicao, sem_regra)[codigos]
+        resultado = base.to_numpy(copy=True)
+        casou = por_linha < sem_regra
+        resultado[casou] = categorias[por_linha[casou]]
+        return pd.Series(resultado, index=descricoes.index, name=base.name)
+
+
+class IndiceTokens:
+    """
+    Índice invertido palavra → linhas de um DataFrame, montado sobre as
+    descrições distintas. Serve para achar, sem varrer o frame inteiro,
+    as linhas que uma regra nova ou alterada pode afetar.
+
+    As palavras também são indexadas pelos seus trigramas, então procurar
+    um trecho só olha as palavras que contêm o trigrama mais raro dele
+    (trechos mais curtos que um trigrama, raros em regras, varrem as
+    palavras).
+    """
+
+    def __init__(self, descricoes):
+        codigos, unicas = pd.factorize(pd.Series(descricoes))
+        por_token = {}
+        for i, descricao in enumerate(np.asarray(unicas, dtype=object)):
+            for token in set(_normalizar(descricao).split()):
+                por_token.setdefault(token, []).append(i)
+        self._tokens = list(por_token)
+        self._descricoes_do_token = list(por_token.values())
+        self._ngramas = {}
+        for t, token in enumerate(self._tokens):
+            for ngrama in _ngramas(token, TAMANHO_NGRAMA):
+                self._ngramas.setdefault(ngrama, []).append(t)
+        # Linhas agrupadas por descrição: cada uma vira uma fatia contígua
+        self._ordem = np.argsort(codigos, kind='stable')
+        self._inicios = np.searchsorted(codigos[self._ordem], np.arange(len(unicas) + 1))
+
+    def _tokens_com(self, parte):
+        """Palavras (posições em `_tokens`) que contêm `parte`"""
+        if len(parte) < TAMANHO_NGRAMA:
+            return [t for t, token in enumerate(self._tokens) if parte in token]
+        menor = min((self._ngramas.get(g, []) for g in _ngramas(parte, TAMANHO_NGRAMA)), key=len)
+        if len(parte) == TAMANHO_NGRAMA:
+            return menor
+        return [t for t in menor if parte in self._tokens[t]]
+
+    def _descricoes_com(self, parte):
+        """Descrições distintas com alguma palavra contendo `parte`"""
+        return set(chain.from_iterable(self._descricoes_do_token[t] for t in self._tokens_com(parte)))
+
+    def candidatas(self, texto):
+        """
+        Posições das linhas cuja descrição pode conter `texto`. É um
+        superconjunto: cada palavra do texto precisa aparecer dentro de
+        alguma palavra da descrição.
+        """
+        partes = _normalizar(texto).split()
+        if not partes:
+            return np.array([], dtype=np.int64)
+        descricoes = set.intersection(*(self._descricoes_com(p) for p in partes))
+        if not descricoes:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate([
+            self._ordem[self._inicios[d]:self._inicios[d + 1]] for d in descricoes
+        ]))
+
+
+def recategorizar(df, regras, indice, textos_alterados, classificador=None):
+    """
+    Refaz a categoria só das linhas afetadas por regras novas, alteradas ou
+    removidas (`textos_alterados` traz os textos antigos e novos), incluindo
+    as que outras sessões mudaram (`regras.alteradas_fora`). Com um
+    `classificador`, o que ficar em 'Outros' passa por ele, como no upload.
+    Altera `df['categoria']` no lugar e retorna as posições que mudaram.
+    """
+    textos_alterados = [*textos_alterados, *regras.alteradas_fora()]
+    posicoes = [indice.candidatas(t) for t in textos_alterados]
+    posicoes = np.unique(np.concatenate(posicoes)) if posicoes else np.array([], dtype=np.int64)
+    if not len(posicoes):
+        return posicoes
+
+    descricoes = df['descricao'].iloc[posicoes]
+    base = categorizar_unicas(descricoes)
+    if classificador is not None:
+        base, _ = reclassificar_outros(descricoes, base, classificador)
+    novas = regras.categorizar(descricoes, base).to_numpy()
+    atuais = df['categoria'].iloc[posicoes].astype(object).to_numpy()
+    mudaram = novas != atuais
+    if not mudaram.any():
+        return posicoes[:0]
+
+    coluna = df['categoria']
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        faltantes = sorted(set(novas[mudaram]) - set(coluna.cat.categories))
+        if faltantes:
+            df['categoria'] = coluna.cat.add_categories(faltantes)
+    df.iloc[posicoes[mudaram], df.columns.get_loc('categoria')] = novas[mudaram]
+    return posicoes[mudaram]
+
+
+def regras_padrao():
+    """Regras do usuário gravadas no local padrão"""
+    return RegrasUsuario()
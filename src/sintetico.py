@@ -0,0 +1,257 @@
+"""
+Gerador de extratos sintéticos no formato CSV do Banco Inter.
+
+Serve para reproduzir problemas de desempenho sem extratos reais: o
+arquivo tem o preâmbulo de 5 linhas, separador `;`, valores em formatos
+BR e US misturados, saldo corrente consistente, estabelecimentos tirados
+das palavras-chave de `src.categorizacao`, PIX para nomes de pessoas e
+cobranças recorrentes mensais. O resultado só depende da semente, e as
+linhas são escritas em blocos, então arquivos de 10 milhões de linhas não
+passam inteiros pela memória.
+
+Uso:
+    python -m src.sintetico extrato.csv --linhas 10000000 --semente 42
+"""
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.categorizacao import CATEGORIAS, NOMES_COMUNS
+
+# Linhas geradas por bloco. Fixo (e não um parâmetro) porque cada bloco tem
+# o próprio gerador aleatório: mudar o tamanho mudaria o arquivo
+BLOCO_GERACAO = 100_000
+
+COLUNAS = ['Data Lançamento', 'Histórico', 'Descrição', 'Valor', 'Saldo']
+
+# Tipo de lançamento: (histórico, peso, sinal, média do log do valor)
+TIPOS = [
+    ('Compra no debito ', 0.55, -1, 3.8),        # estabelecimento conhecido
+    ('Compra no debito ', 0.12, -1, 3.8),        # comércio sem palavra-chave
+    ('Pix enviado ', 0.15, -1, 4.5),
+    ('Pix recebido ', 0.12, 1, 5.0),
+    ('Pagamento efetuado ', 0.03, -1, 6.5),      # fatura do cartão
+    ('Aplicacao ', 0.03, -1, 6.0),               # investimento
+]
+_CONHECIDO, _DESCONHECIDO, _PIX_ENVIADO, _PIX_RECEBIDO, _FATURA, _APLICACAO = range(len(TIPOS))
+
+# Cobranças mensais: (histórico, descrição, dia do mês, valor em centavos)
+RECORRENTES = [
+    ('Pix recebido ', 'Salario EMPRESA EXEMPLO LTDA', 5, 850_000),
+    ('Pagamento efetuado ', 'Aluguel Imobiliaria', 10, -180_000),
+    ('Pagamento efetuado ', 'Condominio Residencial', 10, -45_000),
+    ('Compra no debito ', 'Netflix.com', 7, -5_590),
+    ('Compra no debito ', 'Spotify', 12, -2_190),
+    ('Compra no debito ', 'Smartfit', 15, -10_990),
+    ('Pagamento efetuado ', 'Claro Celular', 20, -9_990),
+    ('Pagamento efetuado ', 'Unimed Plano de Saude', 25, -62_000),
+]
+
+# Formato do valor: (proporção, separador de milhar, marca decimal)
+FORMATOS = [
+    (0.60, '.', ','),   # 1.234,56
+    (0.20, '', ','),    # 1234,56
+    (0.15, ',', '.'),   # 1,234.56
+    (0.05, '', '.'),    # 1234.56
+]
+
+
+def _estabelecimentos():
+    """Nomes de estabelecimento montados com as palavras-chave das categorias"""
+    nomes = []
+    for palavras in CATEGORIAS.values():
+        for palavra in palavras:
+            nomes.append(palavra.upper())
+            nomes.append(f'{palavra.title()} *{len(nomes) % 97:02d}')
+    return np.array(sorted(set(nomes)), dtype=object)
+
+
+def _pesos_zipf(n, rng, expoente=1.1):
+    """Popularidade tipo Zipf em ordem aleatória (poucos muito frequentes)"""
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    pesos = pesos[rng.permutation(n)]
+    return pesos / pesos.sum()
+
+
+class _Tabelas:
+    """Listas de descrições e suas probabilidades, sorteadas uma vez por semente"""
+
+    def __init__(self, semente):
+        rng = np.random.default_rng([semente, 0])
+        self.estabelecimentos = _estabelecimentos()
+        self.p_estabelecimentos = _pesos_zipf(len(self.estabelecimentos), rng)
+
+        nomes = sorted(n.title() for n in NOMES_COMUNS)
+        # Pessoas de 2 ou 3 nomes; cada uma recebe uma popularidade
+        partes = rng.choice(nomes, (2_000, 3))
+        tamanhos = rng.choice([2, 3], 2_000, p=[0.6, 0.4])
+        self.pessoas = np.array(
+            sorted({' '.join(p[:t]) for p, t in zip(partes, tamanhos)}), dtype=object
+        )
+        self.p_pessoas = _pesos_zipf(len(self.pessoas), rng)
+
+        self.desconhecidos = np.array(
+            [f'{base} {i:04d}' for base in ('LOJA', 'COMERCIAL', 'EMPORIO', 'ABC COMERCIO LTDA')
+             for i in range(250)], dtype=object
+        )
+        self.p_desconhecidos = _pesos_zipf(len(self.desconhecidos), rng)
+
+
+def formatar_centavos(centavos, formatos):
+    """
+    Valores em centavos como texto, cada um no formato de `FORMATOS`
+    indicado em `formatos` (índice por linha)
+    """
+    textos = []
+    for valor, formato in zip(centavos.tolist(), formatos.tolist()):
+        _, milhar, decimal = FORMATOS[formato]
+        sinal = '-' if valor < 0 else ''
+        reais, resto = divmod(abs(valor), 100)
+        inteiro = f'{reais:,}'.replace(',', milhar) if milhar else str(reais)
+        textos.append(f'{sinal}{inteiro}{decimal}{resto:02d}')
+    return textos
+
+
+def _bloco(indice, inicio, fim_linhas, linhas, dias, tabelas, semente):
+    """
+    Linhas [inicio, fim_linhas) do extrato, da mais recente para a mais
+    antiga: deslocamento em dias a partir do fim, histórico, descrição e
+    valor em centavos. Inclui as cobranças recorrentes dos dias do bloco.
+    """
+    rng = np.random.default_rng([semente, 1, indice])
+    k = np.arange(inicio, fim_linhas)
+    n = len(k)
+    # (k + u) / linhas cresce com k, então os dias já saem ordenados
+    deslocamento = ((k + rng.random(n)) * dias // linhas).astype(np.int64)
+
+    tipos = rng.choice(len(TIPOS), n, p=[t[1] for t in TIPOS])
+    descricoes = np.empty(n, dtype=object)
+    for tipo, lista, pesos in [
+        (_CONHECIDO, tabelas.estabelecimentos, tabelas.p_estabelecimentos),
+        (_DESCONHECIDO, tabelas.desconhecidos, tabelas.p_desconhecidos),
+        (_PIX_ENVIADO, tabelas.pessoas, tabelas.p_pessoas),
+        (_PIX_RECEBIDO, tabelas.pessoas, tabelas.p_pessoas),
+    ]:
+        linhas_tipo = tipos == tipo
+        descricoes[linhas_tipo] = rng.choice(lista, int(linhas_tipo.sum()), p=pesos)
+    descricoes[tipos == _FATURA] = 'Pagamento fatura'
+    descricoes[tipos == _APLICACAO] = 'Aplicacao CDB'
+
+    sinais = np.array([t[2] for t in TIPOS])[tipos]
+    medias = np.array([t[3] for t in TIPOS])[tipos]
+    centavos = np.maximum(np.round(rng.lognormal(medias, 1.0) * 100), 1).astype(np.int64) * sinais
+    historicos = np.array([t[0] for t in TIPOS], dtype=object)[tipos]
+
+    # Recorrentes: cada bloco fica com os dias entre o seu primeiro e o
+    # primeiro do bloco seguinte, para nenhum dia ser contado duas vezes
+    primeiro = (inicio * dias) // linhas
+    ultimo = dias if fim_linhas == linhas else (fim_linhas * dias) // linhas
+    return deslocamento, historicos, descricoes, centavos, np.arange(primeiro, ultimo)
+
+
+def _recorrentes(dias_do_bloco, fim):
+    """Lançamentos recorrentes que caem nos dias dados (deslocamentos)"""
+    datas = fim - pd.to_timedelta(dias_do_bloco, unit='D')
+    dia_mes = datas.day.to_numpy()
+    deslocamentos, historicos, descricoes, centavos = [], [], [], []
+    for historico, descricao, dia, valor in RECORRENTES:
+        caem = dias_do_bloco[dia_mes == dia]
+        deslocamentos.append(caem)
+        historicos.extend([historico] * len(caem))
+        descricoes.extend([descricao] * len(caem))
+        centavos.append(np.full(len(caem), valor, dtype=np.int64))
+    return (np.concatenate(deslocamentos), np.array(historicos, dtype=object),
+            np.array(descricoes, dtype=object), np.concatenate(centavos))
+
+
+def gerar_blocos(linhas, semente=42, dias=3 * 365, fim='2024-12-31', saldo_final=500_000):
+    """
+    Gera o extrato em DataFrames de até BLOCO_GERACAO linhas (mais as
+    recorrentes), com as colunas em texto, como no CSV do Inter: da data
+    mais recente para a mais antiga, com o saldo após cada lançamento.
+
+    `linhas` conta os lançamentos avulsos; as cobranças recorrentes vêm a
+    mais. `saldo_final` (em centavos) é o saldo do lançamento mais recente.
+    """
+    fim = pd.Timestamp(fim)
+    datas_texto = (fim - pd.to_timedelta(np.arange(dias + 1), unit='D')).strftime('%d/%m/%Y').to_numpy()
+    tabelas = _Tabelas(semente)
+    saldo = saldo_final
+
+    for indice, inicio in enumerate(range(0, linhas, BLOCO_GERACAO)):
+        deslocamento, historicos, descricoes, centavos, dias_bloco = _bloco(
+            indice, inicio, min(inicio + BLOCO_GERACAO, linhas), linhas, dias, tabelas, semente
+        )
+        rec = _recorrentes(dias_bloco, fim)
+        deslocamento = np.concatenate([deslocamento, rec[0]])
+        ordem = np.argsort(deslocamento, kind='stable')
+        deslocamento = deslocamento[ordem]
+        historicos = np.concatenate([historicos, rec[1]])[ordem]
+        descricoes = np.concatenate([descricoes, rec[2]])[ordem]
+        centavos = np.concatenate([centavos, rec[3]])[ordem]
+
+        # Do mais recente para o mais antigo: o saldo da linha seguinte é
+        # o desta menos o valor desta
+        saldos = saldo - np.concatenate([[0], np.cumsum(centavos[:-1])])
+        saldo = int(saldos[-1] - centavos[-1]) if len(centavos) else saldo
+
+        rng = np.random.default_rng([semente, 2, indice])
+        proporcoes = [f[0] for f in FORMATOS]
+        yield pd.DataFrame({
+            'Data Lançamento': datas_texto[deslocamento],
+            'Histórico': historicos,
+            'Descrição': descricoes,
+            'Valor': formatar_centavos(centavos, rng.choice(len(FORMATOS), len(centavos), p=proporcoes)),
+            'Saldo': formatar_centavos(saldos, rng.choice(len(FORMATOS), len(saldos), p=proporcoes)),
+        })
+
+
+def preambulo(dias=3 * 365, fim='2024-12-31', saldo_final=500_000, conta='12345678'):
+    """As 5 linhas antes do cabeçalho (a última em branco)"""
+    fim = pd.Timestamp(fim)
+    inicio = fim - pd.Timedelta(days=dias)
+    saldo = formatar_centavos(np.array([saldo_final]), np.array([0]))[0]
+    return [
+        'Extrato Conta Corrente ',
+        f'Conta ;{conta}',
+        f'Período ;{inicio:%d/%m/%Y} a {fim:%d/%m/%Y}',
+        f'Saldo ;{saldo}',
+        '',
+    ]
+
+
+def escrever_extrato(destino, linhas, semente=42, dias=3 * 365, fim='2024-12-31',
+                     saldo_final=500_000, encoding='utf-8'):
+    """
+    Escreve um extrato sintético em `destino` (caminho ou arquivo texto
+    aberto), bloco a bloco. Retorna o número de linhas de dados escritas.
+    """
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, 'w', encoding=encoding, newline='') as f:
+            return escrever_extrato(f, linhas, semente, dias, fim, saldo_final)
+
+    destino.write('\n'.join(preambulo(dias, fim, saldo_final) + [';'.join(COLUNAS)]) + '\n')
+    escritas = 0
+    for bloco in gerar_blocos(linhas, semente, dias, fim, saldo_final):
+        bloco.to_csv(destino, sep=';', header=False, index=False, lineterminator='\n')
+        escritas += len(bloco)
+    return escritas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('destino', type=Path)
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--dias', type=int, default=3 * 365)
+    parser.add_argument('--fim', default='2024-12-31')
+    args = parser.parse_args()
+    escritas = escrever_extrato(args.destino, args.linhas, args.semente, args.dias, args.fim)
+    print(f"{escritas} linhas escritas em {args.destino} ({args.destino.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import pytest
+
+from src.categorizacao import categorizar_serie
+from src.data_loader import load_csv
+from src.indice_temporal import ordenar_por_data
+from src.pipeline import processar_extrato
+from src.preprocessing import preprocess
+from src.sintetico import escrever_extrato
+
+
+@pytest.fixture(scope='session')
+def arquivo_extrato(tmp_path_factory):
+    """Extrato sintético de três anos no formato CSV do Inter"""
+    caminho = tmp_path_factory.mktemp('extratos') / 'extrato.csv'
+    escrever_extrato(caminho, 20_000, semente=7)
+    return caminho
+
+
+@pytest.fixture(scope='session')
+def extrato(arquivo_extrato):
+    """Extrato como o app usa: compacto, com centavos e em ordem cronológica"""
+    return processar_extrato(arquivo_extrato)
+
+
+@pytest.fixture(scope='session')
+def extrato_simples(arquivo_extrato):
+    """O mesmo extrato pelo preprocess padrão (valores em float, textos em object)"""
+    df = preprocess(load_csv(arquivo_extrato))
+    df['categoria'] = categorizar_serie(df['descricao'])
+    return ordenar_por_data(df)
+
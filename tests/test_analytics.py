@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import calcular_saude_financeira, serie_saude_financeira
+
+CATEGORIAS = ['Alimentação', 'Transporte', 'Saúde', 'Lazer', 'Moradia', 'Educação', 'Online']
+
+
+@pytest.fixture(scope='module')
+def extrato_variado():
+    """
+    Dois anos com entradas, gastos e número de categorias sorteados por mês
+    (alguns meses sem entrada), para cobrir todas as faixas de pontos
+    """
+    rng = np.random.default_rng(4)
+    linhas = []
+    for mes in pd.period_range('2023-01', '2024-12', freq='M'):
+        dias = pd.date_range(mes.start_time, mes.end_time.normalize())
+        entrada = round(rng.uniform(2_000, 6_000), 2)
+        if rng.random() < 0.9:
+            linhas.append((dias[4], entrada, 'Salario', 'Transferências'))
+        # Gasto total do mês a partir de uma taxa de poupança sorteada
+        taxa = rng.uniform(-0.3, 0.5)
+        pesos = rng.lognormal(0, 1, rng.integers(3, 15))
+        categorias = rng.choice(CATEGORIAS, rng.integers(1, len(CATEGORIAS) + 1), replace=False)
+        for peso in pesos:
+            valor = -round(entrada * (1 - taxa) * peso / pesos.sum(), 2)
+            linhas.append((rng.choice(dias), valor, 'Compra', rng.choice(categorias)))
+    df = pd.DataFrame(linhas, columns=['data', 'valor', 'descricao', 'categoria']).sort_values('data', kind='stable')
+    df['ano'] = df['data'].dt.year
+    df['mes'] = df['data'].dt.month
+    df['mes_ano'] = df['data'].dt.strftime('%Y-%m')
+    return df.reset_index(drop=True)
+
+
+def _meses(df):
+    return sorted(df['mes_ano'].astype(str).unique())
+
+
+def _janelas(df, janela):
+    """(último mês, recorte do extrato) de cada janela de `janela` meses corridos"""
+    periodos = pd.PeriodIndex(df['data'], freq='M')
+    fim = periodos.max()
+    mes = periodos.min() + (janela - 1)
+    while mes <= fim:
+        yield str(mes), df[(periodos > mes - janela) & (periodos <= mes)]
+        mes += 1
+
+
+@pytest.mark.parametrize('nome', ['extrato', 'extrato_simples', 'extrato_variado'])
+@pytest.mark.parametrize('janela', [1, 3, 12])
+def test_serie_igual_ao_score_de_cada_janela(request, nome, janela):
+    df = request.getfixturevalue(nome)
+    serie = serie_saude_financeira(df, janela=janela).set_index('mes_ano')['score']
+
+    esperado = {mes: calcular_saude_financeira(recorte) for mes, recorte in _janelas(df, janela)}
+    assert serie.to_dict() == esperado
+
+
+def test_serie_em_centavos(extrato_variado):
+    em_centavos = extrato_variado.assign(valor_centavos=(extrato_variado['valor'] * 100).round().astype(np.int64))
+    pd.testing.assert_frame_equal(
+        serie_saude_financeira(em_centavos, janela=3), serie_saude_financeira(extrato_variado, janela=3),
+    )
+
+
+def test_serie_cobre_todas_as_faixas(extrato_variado):
+    serie = serie_saude_financeira(extrato_variado)
+    assert set(serie['pontos_poupanca']) == {0, 10, 25, 40, 50}
+    assert set(serie['pontos_diversificacao']) == {5, 15, 25}
+    assert set(serie_saude_financeira(extrato_variado, janela=3)['pontos_consistencia']) >= {5, 15}
+
+
+def test_serie_com_mes_sem_transacoes(extrato_variado):
+    # Sem o terceiro mês: ele continua no eixo e conta na janela, vazio
+    sem_mes = extrato_variado[extrato_variado['mes_ano'] != _meses(extrato_variado)[2]]
+    serie = serie_saude_financeira(sem_mes, janela=3).set_index('mes_ano')['score']
+
+    esperado = {mes: calcular_saude_financeira(recorte) for mes, recorte in _janelas(sem_mes, 3)}
+    assert serie.to_dict() == esperado
+
+
+def test_serie_sem_entradas(extrato_simples):
+    so_gastos = extrato_simples[extrato_simples['valor'] < 0]
+    serie = serie_saude_financeira(so_gastos)
+    assert (serie['score'] == 0).all()
+    assert calcular_saude_financeira(so_gastos) == 0
+
+
+def test_serie_janela_maior_que_o_extrato(extrato_simples):
+    janela = len(_meses(extrato_simples)) + 1
+    assert serie_saude_financeira(extrato_simples, janela=janela).empty
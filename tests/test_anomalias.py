@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomalias import COLUNAS_MESES, COLUNAS_TRANSACOES, MotorAnomalias, detectar_anomalias
+
+
+def _cortes(df, partes):
+    """Posições que dividem o extrato em `partes` pedaços sem separar um dia"""
+    datas = df['data'].to_numpy()
+    return [int(np.searchsorted(datas, datas[len(df) * i // partes], 'left')) for i in range(1, partes)]
+
+
+def _incremental(df, cortes):
+    motor = MotorAnomalias()
+    encontradas = [motor.atualizar(df.iloc[inicio:fim]) for inicio, fim in zip([0, *cortes], [*cortes, len(df)])]
+    return motor, encontradas
+
+
+@pytest.mark.parametrize('nome', ['extrato', 'extrato_simples'])
+@pytest.mark.parametrize('partes', [2, 7])
+def test_incremental_igual_ao_lote(request, nome, partes):
+    df = request.getfixturevalue(nome)
+    transacoes, meses = detectar_anomalias(df)
+    assert len(transacoes) and len(meses)
+
+    motor, encontradas = _incremental(df, _cortes(df, partes))
+    pd.testing.assert_frame_equal(motor.transacoes, transacoes)
+    pd.testing.assert_frame_equal(motor.meses, meses)
+    # Cada atualização devolve só as anomalias das transações novas
+    pd.testing.assert_frame_equal(
+        pd.concat([e for e in encontradas if len(e)], ignore_index=True), transacoes
+    )
+
+
+def test_incremental_no_mesmo_dia(extrato_simples):
+    # Cortes no meio de um dia: as transações do dia seguem em ordem
+    df = extrato_simples
+    repetidos = np.flatnonzero(df['data'].to_numpy()[1:] == df['data'].to_numpy()[:-1]) + 1
+    motor, _ = _incremental(df, [int(repetidos[len(repetidos) // 3]), int(repetidos[2 * len(repetidos) // 3])])
+    transacoes, meses = detectar_anomalias(df)
+    pd.testing.assert_frame_equal(motor.transacoes, transacoes)
+    pd.testing.assert_frame_equal(motor.meses, meses)
+
+
+def test_colunas_e_ordem(extrato):
+    transacoes, meses = detectar_anomalias(extrato)
+    assert list(transacoes.columns) == COLUNAS_TRANSACOES
+    assert list(meses.columns) == COLUNAS_MESES
+    assert set(transacoes['referencia']) <= {'categoria', 'estabelecimento'}
+    assert (transacoes['valor'] > 0).all()
+    assert meses['mes_ano'].is_monotonic_increasing
+
+
+def test_transacoes_antigas_sao_recusadas(extrato):
+    motor = MotorAnomalias(extrato.iloc[len(extrato) // 2:])
+    with pytest.raises(ValueError):
+        motor.atualizar(extrato.iloc[:10])
+
+
+def test_unidade_diferente_e_recusada(extrato, extrato_simples):
+    metade = len(extrato) // 2
+    motor = MotorAnomalias(extrato.iloc[:metade])
+    with pytest.raises(ValueError):
+        motor.atualizar(extrato_simples.iloc[metade:])
+
+
+def test_sem_gastos(extrato_simples):
+    entradas = extrato_simples[extrato_simples['valor'] > 0]
+    transacoes, meses = detectar_anomalias(entradas)
+    assert transacoes.empty and meses.empty
@@ -0,0 +1,79 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import (
+    analisar_tendencias, calcular_metricas_avancadas, calcular_saude_financeira, gasto_anual, gasto_mensal,
+    gasto_por_categoria, resumo_arquivo,
+)
+from src.arquivo import ArquivoTransacoes, salvar_arquivo
+from src.cubo import montar_cubo
+from src.metricas import nucleo_metricas
+
+
+def _mesmo_extrato(lido, esperado):
+    # A cópia troca as colunas np.memmap do arquivo (que o assert_frame_equal
+    # recusa só pela classe) por arrays comuns; as categorias podem vir em
+    # outra ordem
+    pd.testing.assert_frame_equal(lido.copy(), esperado, check_categorical=False)
+
+
+@pytest.fixture(scope='module')
+def arquivo(tmp_path_factory, extrato):
+    return salvar_arquivo(extrato, tmp_path_factory.mktemp('arquivo') / 'extrato')
+
+
+def test_arquivo_ida_e_volta(arquivo, extrato):
+    lido = ArquivoTransacoes(arquivo.diretorio).frame(com_descricao=True)
+    _mesmo_extrato(lido, extrato)
+    assert len(arquivo) == len(extrato)
+
+
+def test_arquivo_por_periodo(arquivo, extrato):
+    periodo = arquivo.frame('2024-03-01', '2024-03-31', com_descricao=True)
+    esperado = extrato[extrato['data'].between('2024-03-01', '2024-03-31')].reset_index(drop=True)
+    _mesmo_extrato(periodo, esperado)
+
+
+@pytest.mark.parametrize('inicio, fim', [(None, None), ('2023-03-05', '2024-02-10'), ('2030-01-01', None)])
+@pytest.mark.parametrize('tamanho', [997, 1_000_000])
+def test_agregacao_em_blocos_igual_ao_frame(arquivo, inicio, fim, tamanho):
+    periodo = arquivo.frame(inicio, fim)
+    pd.testing.assert_frame_equal(arquivo.cubo(inicio, fim, tamanho), montar_cubo(periodo))
+    assert arquivo.nucleo(inicio, fim, tamanho) == nucleo_metricas(periodo)
+
+
+def test_agregacao_em_blocos_sem_categoria(tmp_path, extrato):
+    arquivo = salvar_arquivo(extrato.drop(columns='categoria'), tmp_path / 'sem_categoria')
+    pd.testing.assert_frame_equal(arquivo.cubo(tamanho=777), montar_cubo(arquivo.frame()))
+    assert arquivo.nucleo(tamanho=777) == nucleo_metricas(arquivo.frame())
+
+
+def test_resumo_do_arquivo(arquivo, extrato):
+    resumo = resumo_arquivo(arquivo, tamanho=2_000)
+    pd.testing.assert_frame_equal(resumo['gasto_mensal'], gasto_mensal(extrato))
+    pd.testing.assert_frame_equal(resumo['gasto_anual'], gasto_anual(extrato))
+    pd.testing.assert_frame_equal(resumo['gasto_por_categoria'], gasto_por_categoria(extrato))
+    assert resumo['metricas'] == calcular_metricas_avancadas(extrato)
+    assert resumo['tendencias'] == analisar_tendencias(extrato)
+    assert resumo['saude'] == calcular_saude_financeira(extrato)
+
+
+def test_memoria_da_agregacao_limitada_ao_bloco(tmp_path, extrato):
+    grande = salvar_arquivo(pd.concat([extrato] * 10, ignore_index=True), tmp_path / 'grande')
+    coluna_inteira = 8 * len(grande)
+
+    tracemalloc.start()
+    try:
+        cubo = grande.cubo(tamanho=5_000)
+        nucleo = grande.nucleo(tamanho=5_000)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Nem uma coluna de centavos do arquivo inteiro chega a ser alocada
+    assert pico < coluna_inteira / 4
+    assert cubo['transacoes'].sum() == nucleo['transacoes'] == len(grande)
+    assert np.isclose(nucleo['total_gastos'], 10 * nucleo_metricas(extrato)['total_gastos'])
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import src.pipeline as pipeline
+from src.cache import CacheComerciantes, CacheExtratos, cache_padrao, comerciantes_padrao, ler_frame, salvar_frame
+from src.pipeline import processar_extrato
+
+
+def _mesmo_extrato(lido, esperado):
+    # A cópia troca as colunas np.memmap do arquivo (que o assert_frame_equal
+    # recusa só pela classe) por arrays comuns; as categorias podem vir em
+    # outra ordem
+    pd.testing.assert_frame_equal(lido.copy(), esperado, check_categorical=False)
+
+
+def test_cache_de_extratos(tmp_path, arquivo_extrato, extrato):
+    cache = CacheExtratos(tmp_path / 'cache')
+    novo = processar_extrato(arquivo_extrato, cache=cache)
+    do_cache = processar_extrato(arquivo_extrato, cache=cache)
+
+    assert novo.attrs['cache'] == 'novo'
+    assert do_cache.attrs['cache'] == 'completo'
+    for df in (novo, do_cache):
+        _mesmo_extrato(df, extrato)
+
+
+def test_regras_novas_so_refazem_a_categorizacao(tmp_path, monkeypatch, arquivo_extrato, extrato):
+    cache = CacheExtratos(tmp_path / 'cache')
+    processar_extrato(arquivo_extrato, cache=cache)
+    monkeypatch.setattr(pipeline, 'versao_regras', lambda: 'outras-regras')
+
+    df = processar_extrato(arquivo_extrato, cache=cache)
+    assert df.attrs['cache'] == 'base'
+    _mesmo_extrato(df, extrato)
+    entrada, = (tmp_path / 'cache').iterdir()
+    assert [f.name for f in entrada.glob('categorias-*.npz')] == ['categorias-outras-regras.npz']
+
+
+def test_descarte_por_ultimo_uso(tmp_path, extrato):
+    cache = CacheExtratos(tmp_path / 'cache')
+    base = extrato.drop(columns='categoria').head(2_000)
+    for i, chave in enumerate(['a', 'b', 'c']):
+        cache.salvar_base(chave, base)
+        os.utime(tmp_path / 'cache' / chave, (i, i))
+    cache.ler_base('a')
+
+    tamanho = sum(f.stat().st_size for f in (tmp_path / 'cache' / 'a').rglob('*') if f.is_file())
+    cache.tamanho_maximo = 2 * tamanho
+    cache.podar()
+    assert sorted(p.name for p in (tmp_path / 'cache').iterdir()) == ['a', 'c']
+
+
+def test_frame_npz_ida_e_volta(tmp_path, extrato_simples):
+    df = extrato_simples.head(500).copy()
+    df['nulavel'] = pd.array(np.where(np.arange(len(df)) % 3, np.arange(len(df)), 0), dtype='Int64')
+    df.loc[df.index[::7], 'nulavel'] = pd.NA
+    df['categoria'] = df['categoria'].astype('category')
+    df.attrs['origem'] = 'teste'
+    salvar_frame(tmp_path / 'frame.npz', df)
+    lido = ler_frame(tmp_path / 'frame.npz')
+    pd.testing.assert_frame_equal(lido, df, check_index_type=False)
+    assert lido.attrs['origem'] == 'teste'
+
+
+def test_comerciantes_por_versao_das_regras(tmp_path):
+    comerciantes = CacheComerciantes(tmp_path / 'comerciantes.sqlite3')
+    comerciantes.guardar([('ifood', 'Alimentação'), ('uber', 'Transporte')], 'v1')
+    assert comerciantes.buscar(['ifood', 'uber', 'zara', 'ifood'], 'v1') == {
+        'ifood': 'Alimentação', 'uber': 'Transporte',
+    }
+    assert comerciantes.buscar(['ifood'], 'v2') == {}
+    assert comerciantes.estatisticas() == {'acertos': 2, 'faltas': 2, 'taxa_acerto': 0.5}
+
+    # Outra instância (outra sessão ou processo) vê o mesmo banco
+    comerciantes.guardar([('ifood', 'Delivery')], 'v2')
+    assert CacheComerciantes(tmp_path / 'comerciantes.sqlite3').buscar(['ifood', 'uber'], 'v2') == {'ifood': 'Delivery'}
+
+
+def test_comerciantes_descarta_os_menos_usados(tmp_path, monkeypatch):
+    relogio = iter(range(100))
+    monkeypatch.setattr('src.cache.time.time', lambda: next(relogio))
+    comerciantes = CacheComerciantes(tmp_path / 'comerciantes.sqlite3', tamanho_maximo=3)
+    comerciantes.guardar([('a', 'A'), ('b', 'B'), ('c', 'C')], 'v1')
+    comerciantes.buscar(['a'], 'v1')
+    comerciantes.guardar([('d', 'D')], 'v1')
+    assert comerciantes.buscar(['a', 'b', 'c', 'd'], 'v1') == {'a': 'A', 'c': 'C', 'd': 'D'}
+
+
+def test_caches_em_disco_sao_opcionais(monkeypatch, tmp_path):
+    monkeypatch.delenv('LUMEN_CACHE', raising=False)
+    assert cache_padrao() is None
+    assert comerciantes_padrao() is None
+
+    monkeypatch.setenv('LUMEN_CACHE', '1')
+    assert isinstance(cache_padrao(), CacheExtratos)
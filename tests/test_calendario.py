@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from src.calendario import (
+    NOMES_DIAS_SEMANA, NOMES_MESES, atributo_calendario, atributos_calendario, construir_calendario,
+    dias_desde_epoca,
+)
+
+
+def test_dias_desde_epoca():
+    datas = pd.to_datetime(['1970-01-01', '1970-01-02', '2024-02-29', '1969-12-31'])
+    assert dias_desde_epoca(datas).tolist() == [0, 1, 19782, -1]
+    assert dias_desde_epoca(datas).dtype == np.int32
+
+
+def test_calendario_igual_ao_acessor_dt():
+    inicio, fim = dias_desde_epoca(pd.to_datetime(['2019-12-25', '2025-01-05']))
+    calendario = construir_calendario(int(inicio), int(fim))
+    datas = pd.Series(pd.date_range('2019-12-25', '2025-01-05'))
+
+    assert len(calendario) == len(datas)
+    assert calendario['data'].tolist() == datas.tolist()
+    assert (calendario['ano'].to_numpy() == datas.dt.year).all()
+    assert (calendario['mes'].to_numpy() == datas.dt.month).all()
+    assert (calendario['semestre'].to_numpy() == np.where(datas.dt.month <= 6, 1, 2)).all()
+    assert (calendario['semana_iso'].to_numpy() == datas.dt.isocalendar().week).all()
+    assert (calendario['dia_semana'].to_numpy() == datas.dt.dayofweek).all()
+    assert calendario['mes_ano'].astype(str).tolist() == datas.dt.strftime('%Y-%m').tolist()
+    assert calendario['nome_dia_semana'].astype(str).tolist() == [NOMES_DIAS_SEMANA[d] for d in datas.dt.dayofweek]
+    assert calendario['nome_mes'].astype(str).tolist() == [NOMES_MESES[m - 1] for m in datas.dt.month]
+
+
+def test_atributos_pela_posicao_do_dia():
+    datas = pd.Series(pd.to_datetime(['2024-03-10', '2023-07-01', '2024-03-10', '2024-12-31']), index=[5, 6, 7, 8])
+    dias = pd.Series(dias_desde_epoca(datas), index=datas.index)
+
+    atributos = atributos_calendario(dias.to_numpy(), ['ano', 'mes_ano', 'semestre'])
+    assert list(atributos['ano']) == [2024, 2023, 2024, 2024]
+    assert list(atributos['mes_ano']) == ['2024-03', '2023-07', '2024-03', '2024-12']
+    assert list(atributos['semestre']) == [1, 2, 1, 2]
+
+    mes = atributo_calendario(dias, 'mes')
+    assert mes.name == 'mes'
+    assert mes.index.tolist() == [5, 6, 7, 8]
+    assert mes.tolist() == [3, 7, 3, 12]
+
+
+def test_colunas_do_extrato_batem_com_as_datas(extrato):
+    datas = extrato['data']
+    assert (extrato['dia'].to_numpy() == dias_desde_epoca(datas)).all()
+    assert (extrato['ano'].to_numpy() == datas.dt.year).all()
+    assert (extrato['mes'].to_numpy() == datas.dt.month).all()
+    assert extrato['mes_ano'].astype(str).tolist() == datas.dt.strftime('%Y-%m').tolist()
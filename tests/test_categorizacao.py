@@ -0,0 +1,161 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.categorizacao as categorizacao
+from src.cache import CacheComerciantes
+from src.categorizacao import (
+    AUTOMATO, CATEGORIAS, NOMES_PRIORIDADE, PALAVRAS_TRANSFERENCIA, SEM_REGRA, MemoCategorias,
+    _construir_automato, _contar_digitos, categorizar_paralelo, categorizar_serie, categorizar_transacao,
+    categorizar_unicas, eh_nome_pessoa, eh_nome_pessoa_serie, prioridade_palavras_chave,
+)
+
+# Casos de borda das regras: prioridade entre categorias, transferências,
+# nomes de pessoa, maiúsculas, espaços e descrições vazias
+DESCRICOES = [
+    'IFOOD *RESTAURANTE', 'Uber *trip', 'UBER   *TRIP', 'Netflix.com', 'POSTO SHELL',
+    'Pagamento fatura', 'Farmacia Pague Menos', 'Aplicacao CDB', 'Supermercado Extra',
+    'Mc Donalds Taguatinga', 'Pix enviado', 'Transferencia', 'Maria Silva Santos',
+    'Joao Pedro Oliveira', 'maria', 'ABC COMERCIO LTDA', 'LOJA 0042', '  Spotify  ', 'Smartfit',
+    '', ' ', '12345', None, np.nan,
+]
+
+
+@pytest.fixture
+def memo():
+    """Memo novo por teste, para os acertos não dependerem da ordem"""
+    return MemoCategorias()
+
+
+def _escalar(descricoes):
+    return pd.Series(descricoes, dtype=object).apply(categorizar_transacao)
+
+
+def _prioridade_ingenua(texto):
+    palavras = [p for palavras in CATEGORIAS.values() for p in palavras] + PALAVRAS_TRANSFERENCIA
+    prioridades = [i for i, palavras in enumerate(CATEGORIAS.values()) for _ in palavras]
+    prioridades += [SEM_REGRA - 1] * len(PALAVRAS_TRANSFERENCIA)
+    return min((pr for p, pr in zip(palavras, prioridades) if p in texto), default=SEM_REGRA)
+
+
+def test_automato_igual_a_busca_por_substring(extrato_simples):
+    textos = [str(d).lower() for d in DESCRICOES] + extrato_simples['descricao'].str.lower().unique().tolist()
+    esperado = [_prioridade_ingenua(t) for t in textos]
+    assert prioridade_palavras_chave(np.array(textos, dtype=object)).tolist() == esperado
+
+
+def test_automato_com_palavras_sobrepostas():
+    automato = _construir_automato([('abcd', 2), ('bc', 1), ('c', 3), ('xbcy', 0)], sem_regra=9)
+    textos = np.array(['abcd', 'xbcy', 'abc', 'zzc', 'xbc', 'xbcabcd', '', 'é ç ñ'], dtype=object)
+    assert prioridade_palavras_chave(textos, automato).tolist() == [1, 0, 1, 3, 1, 1, 9, 9]
+    assert AUTOMATO.sem_regra == SEM_REGRA == len(NOMES_PRIORIDADE)
+
+
+def test_serie_igual_ao_escalar():
+    descricoes = pd.Series(DESCRICOES * 2, dtype=object)
+    pd.testing.assert_series_equal(categorizar_serie(descricoes), _escalar(descricoes), check_dtype=False)
+
+
+def test_serie_no_extrato(extrato_simples):
+    descricoes = extrato_simples['descricao']
+    assert (categorizar_serie(descricoes).to_numpy() == _escalar(descricoes).to_numpy()).all()
+
+
+def test_unicas_igual_ao_escalar(memo):
+    descricoes = pd.Series(DESCRICOES * 3, index=np.arange(len(DESCRICOES) * 3) * 2, dtype=object)
+    categorias = categorizar_unicas(descricoes, memo=memo, processos=1)
+    pd.testing.assert_series_equal(categorias, _escalar(descricoes), check_dtype=False)
+
+
+def test_unicas_no_extrato(extrato_simples, memo):
+    descricoes = extrato_simples['descricao']
+    categorias = categorizar_unicas(descricoes, memo=memo, processos=1)
+    assert (categorias.to_numpy() == _escalar(descricoes).to_numpy()).all()
+    estatisticas = categorias.attrs['categorizacao']
+    assert estatisticas['linhas'] == len(descricoes)
+    assert estatisticas['unicas'] == descricoes.nunique()
+
+
+def test_unicas_com_memo_cheio(memo):
+    descricoes = pd.Series(DESCRICOES, dtype=object)
+    primeira = categorizar_unicas(descricoes, memo=memo, processos=1)
+    segunda = categorizar_unicas(descricoes, memo=memo, processos=1)
+    pd.testing.assert_series_equal(primeira, segunda)
+    assert primeira.attrs['categorizacao']['acertos_memo'] == 0
+    assert segunda.attrs['categorizacao']['acertos_memo'] == segunda.attrs['categorizacao']['unicas']
+
+
+def test_unicas_categorica(memo):
+    descricoes = pd.Series(DESCRICOES, dtype=object)
+    categorias = categorizar_unicas(descricoes.astype('category'), memo=memo, processos=1)
+    assert categorias.tolist() == _escalar(descricoes).tolist()
+
+
+def test_unicas_com_cache_de_comerciantes(tmp_path):
+    descricoes = pd.Series(DESCRICOES, dtype=object)
+    comerciantes = CacheComerciantes(tmp_path / 'comerciantes.sqlite3')
+    primeira = categorizar_unicas(descricoes, memo=None, comerciantes=comerciantes, processos=1)
+    segunda = categorizar_unicas(descricoes, memo=None, comerciantes=comerciantes, processos=1)
+
+    esperado = _escalar(descricoes).tolist()
+    assert primeira.tolist() == esperado
+    assert segunda.tolist() == esperado
+    assert primeira.attrs['categorizacao']['acertos_disco'] == 0
+    assert segunda.attrs['categorizacao']['acertos_disco'] == segunda.attrs['categorizacao']['consultas_disco']
+
+
+def test_memo_descarta_o_menos_usado():
+    memo = MemoCategorias(tamanho_maximo=2)
+    memo.guardar(['a', 'b'], ['Lazer', 'Saúde'])
+    memo.buscar(['a'])
+    memo.guardar(['c'], ['Outros'])
+    assert memo.buscar(['a', 'b', 'c']) == (['Lazer', None, 'Outros'], 2)
+    assert (memo.consultas, memo.acertos) == (4, 3)
+
+
+# Separadores e dígitos fora do ASCII, palavras no limite de tamanho e
+# nomes comuns colados em outras letras
+NOMES = [
+    'Maria Silva', 'joao\tpedro  x', 'ana costa', '  ab cd  ', 'nascimento xy', 'nascimentos abc',
+    'jose\u3000da silva', 'jose\xa0silva', 'ÁNGELO MÜLLER', 'x\x1cy zzz', 'a b', 'Joao Pedro Oliveira Souza Lima',
+    '𝟏𝟐𝟑 joao silva', '①②③④ ana', 'maria 12345678', 'mariasilva', 'ana', 'SILVA LTDA', '', None,
+]
+
+
+def test_nome_pessoa_serie_igual_ao_escalar(extrato_simples):
+    descricoes = pd.Series(NOMES + extrato_simples['descricao'].unique().tolist(), dtype=object)
+    esperado = [eh_nome_pessoa(d) for d in descricoes]
+    assert eh_nome_pessoa_serie(descricoes).tolist() == esperado
+
+
+def test_contar_digitos():
+    textos = np.array(['abc', '12a3', '²³', '①x', '𝟏𝟐', '٣', ''], dtype=str)
+    assert _contar_digitos(textos).tolist() == [sum(c.isdigit() for c in t) for t in textos]
+
+
+def test_paralelo_igual_ao_escalar():
+    descricoes = pd.Series(DESCRICOES * 4, dtype=object)
+    categorias = categorizar_paralelo(descricoes.to_numpy(), processos=2, minimo=1)
+    assert categorias.tolist() == _escalar(descricoes).tolist()
+
+
+def test_paralelo_abaixo_do_minimo_fica_no_processo(monkeypatch):
+    def sem_pool(processos):
+        raise AssertionError('não deveria abrir um pool')
+
+    monkeypatch.setattr(categorizacao, '_pool', sem_pool)
+    descricoes = np.array(DESCRICOES, dtype=object)
+    assert categorizar_paralelo(descricoes, processos=4).tolist() == _escalar(descricoes).tolist()
+    assert categorizar_paralelo(descricoes, processos=1, minimo=1).tolist() == _escalar(descricoes).tolist()
+
+
+def test_pool_quebrado_cai_para_o_processo_atual(monkeypatch):
+    class PoolQuebrado:
+        def map(self, funcao, fatias):
+            raise BrokenProcessPool('worker morto')
+
+    monkeypatch.setattr(categorizacao, '_pool', lambda processos: PoolQuebrado())
+    descricoes = np.array(DESCRICOES, dtype=object)
+    assert categorizar_paralelo(descricoes, processos=2, minimo=1).tolist() == _escalar(descricoes).tolist()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from src.classificador import LIMIAR_CONFIANCA, ClassificadorNB, reclassificar_outros
+
+
+def test_probabilidades(extrato_simples):
+    modelo = ClassificadorNB.treinar(extrato_simples['descricao'], extrato_simples['categoria'])
+    assert modelo.calibrado
+    assert 'Outros' not in set(modelo.classes)
+
+    descricoes = np.array(['UBER *TRIP', '', 'x', 'descricao bem mais longa que as outras ' * 5], dtype=object)
+    prob = modelo.probabilidades(descricoes)
+    assert prob.shape == (len(descricoes), len(modelo.classes))
+    np.testing.assert_allclose(prob.sum(axis=1), 1)
+    classes, confianca = modelo.prever(descricoes)
+    np.testing.assert_array_equal(classes, modelo.classes[prob.argmax(axis=1)])
+    np.testing.assert_array_equal(confianca, prob.max(axis=1))
+
+
+def test_previsoes_confiantes_acertam(extrato_simples):
+    rotulos = extrato_simples[extrato_simples['categoria'] != 'Outros'].drop_duplicates('descricao')
+    modelo = ClassificadorNB.treinar(rotulos['descricao'], rotulos['categoria'])
+    classes, confianca = modelo.prever(rotulos['descricao'].to_numpy(dtype=object))
+    confiantes = confianca >= LIMIAR_CONFIANCA
+    assert confiantes.any()
+    assert (classes[confiantes] == rotulos['categoria'].to_numpy()[confiantes]).mean() >= 0.95
+
+
+def test_reclassifica_so_outros(extrato_simples):
+    descricoes, categorias = extrato_simples['descricao'], extrato_simples['categoria']
+    modelo = ClassificadorNB.treinar(descricoes, categorias)
+    novas, mudaram = reclassificar_outros(descricoes, categorias, modelo, limiar=0.5, margem=0)
+
+    trocadas = novas != categorias
+    assert mudaram == trocadas.sum() > 0
+    assert (categorias[trocadas] == 'Outros').all()
+    assert set(novas[trocadas]) <= set(modelo.classes)
+    # Mesma descrição, mesma categoria nova
+    assert (novas[trocadas].groupby(descricoes[trocadas]).nunique() == 1).all()
+    pd.testing.assert_index_equal(novas.index, categorias.index)
+
+
+def test_limiar_e_margem(extrato_simples):
+    descricoes, categorias = extrato_simples['descricao'], extrato_simples['categoria']
+    modelo = ClassificadorNB.treinar(descricoes, categorias)
+    _, com_margem = reclassificar_outros(descricoes, categorias, modelo, limiar=0.5, margem=0.3)
+    _, sem_margem = reclassificar_outros(descricoes, categorias, modelo, limiar=0.5, margem=0)
+    assert com_margem <= sem_margem
+    assert reclassificar_outros(descricoes, categorias, modelo, limiar=1.01)[1] == 0
+
+
+def test_sem_calibracao_nao_troca_nada():
+    # Poucas descrições rotuladas: não sobram descrições para calibrar
+    descricoes = pd.Series(['UBER *TRIP', 'IFOOD', 'UBER X', 'LOJA 1', 'Uber viagem'], dtype=object)
+    categorias = pd.Series(['Transporte', 'Alimentação', 'Transporte', 'Outros', 'Outros'], dtype=object)
+    modelo = ClassificadorNB.treinar(descricoes, categorias)
+    assert not modelo.calibrado
+
+    novas, mudaram = reclassificar_outros(descricoes, categorias, modelo, limiar=0, margem=0)
+    assert mudaram == 0
+    pd.testing.assert_series_equal(novas, categorias)
+
+
+def test_salvar_e_carregar(tmp_path, extrato_simples):
+    modelo = ClassificadorNB.treinar(extrato_simples['descricao'], extrato_simples['categoria'])
+    modelo.salvar(tmp_path / 'modelo.npz')
+    lido = ClassificadorNB.carregar(tmp_path / 'modelo.npz')
+
+    assert lido.classes.tolist() == modelo.classes.tolist()
+    assert lido.temperatura == modelo.temperatura
+    descricoes = extrato_simples['descricao'].unique()[:500].astype(str)
+    np.testing.assert_array_equal(lido.probabilidades(descricoes), modelo.probabilidades(descricoes))
+
+
+def test_salvar_sem_calibracao(tmp_path):
+    modelo = ClassificadorNB.treinar(pd.Series(['UBER *TRIP', 'IFOOD']), pd.Series(['Transporte', 'Alimentação']))
+    modelo.salvar(tmp_path / 'modelo.npz')
+    lido = ClassificadorNB.carregar(tmp_path / 'modelo.npz')
+    assert not lido.calibrado
+    np.testing.assert_array_equal(lido.contagens, modelo.contagens)
@@ -0,0 +1,90 @@
+import io
+
+import pandas as pd
+import pytest
+
+import src.data_loader as data_loader
+from src.data_loader import detectar_formato, load_csv
+
+PREAMBULO = ['Extrato Conta Corrente ', 'Conta ;12345678', 'Período ;01/01/2024 a 31/01/2024', 'Saldo ;1.234,56', '']
+DADOS = [
+    'Data Lançamento;Histórico;Descrição;Valor;Saldo',
+    '31/01/2024;Pix enviado ;Maria Silva;-50,00;1.234,56',
+    '30/01/2024;Compra no debito ;IFOOD *RESTAURANTE;-35,90;1.284,56',
+    '29/01/2024;Pix recebido ;Joao Souza;1.000,00;1.320,46',
+]
+
+
+def _extrato(linhas, encoding='utf-8', fim='\n'):
+    return fim.join(linhas).encode(encoding) + fim.encode(encoding)
+
+
+@pytest.mark.parametrize('preambulo', [0, 3, 5, 9])
+def test_cabecalho_depois_do_preambulo(preambulo):
+    linhas = (PREAMBULO * 2)[:preambulo] + DADOS
+    formato = detectar_formato(_extrato(linhas))
+    assert formato['sep'] == ';'
+    assert formato['decimal'] == ','
+    assert formato['linha_cabecalho'] == preambulo
+    assert formato['inicio_cabecalho'] == (len(_extrato(linhas[:preambulo])) if preambulo else 0)
+
+
+@pytest.mark.parametrize('encoding, esperado', [
+    ('utf-8', 'utf-8-sig'), ('utf-8-sig', 'utf-8-sig'), ('cp1252', 'cp1252'),
+])
+def test_encoding(encoding, esperado):
+    amostra = _extrato(PREAMBULO + DADOS, encoding)
+    formato = detectar_formato(amostra)
+    assert formato['encoding'] == esperado
+    df = load_csv(io.BytesIO(amostra))
+    assert list(df.columns) == DADOS[0].split(';')
+    assert df['Descrição'].tolist() == ['Maria Silva', 'IFOOD *RESTAURANTE', 'Joao Souza']
+
+
+def test_amostra_corta_caractere_multibyte():
+    amostra = _extrato(PREAMBULO + DADOS)
+    corte = amostra.index('ç'.encode()) + 1
+    assert detectar_formato(amostra[:corte])['encoding'] == 'utf-8-sig'
+
+
+def test_virgula_separador_e_ponto_decimal():
+    linhas = [linha.replace('.', '').replace(',', '.').replace(';', ',') for linha in DADOS]
+    formato = detectar_formato(_extrato(linhas, fim='\r\n'))
+    assert (formato['sep'], formato['decimal'], formato['linha_cabecalho']) == (',', '.', 0)
+    df = load_csv(io.BytesIO(_extrato(linhas, fim='\r\n')))
+    assert df['Valor'].tolist() == [-50.0, -35.9, 1000.0]
+
+
+def test_upload_igual_ao_arquivo(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_bytes(_extrato(PREAMBULO + DADOS))
+    do_arquivo = load_csv(caminho)
+    do_upload = load_csv(io.BytesIO(caminho.read_bytes()))
+    pd.testing.assert_frame_equal(do_arquivo, do_upload)
+    assert do_arquivo.attrs['leitura']['engine'] == data_loader._motores_disponiveis()[0]
+    assert do_arquivo.attrs['leitura']['tentativas'] == []
+
+
+def test_engine_que_falha_cai_para_o_proximo(monkeypatch):
+    read_csv = pd.read_csv
+
+    def so_python(*args, engine=None, **kwargs):
+        if engine != 'python':
+            raise pd.errors.ParserError(f'{engine} falhou')
+        return read_csv(*args, engine=engine, **kwargs)
+
+    monkeypatch.setattr(pd, 'read_csv', so_python)
+    df = load_csv(io.BytesIO(_extrato(PREAMBULO + DADOS)))
+    leitura = df.attrs['leitura']
+    assert leitura['engine'] == 'python'
+    assert [t['engine'] for t in leitura['tentativas']] == data_loader._motores_disponiveis()[:-1]
+    assert len(df) == 3
+
+
+def test_nenhum_engine_consegue(monkeypatch):
+    def falha(*args, **kwargs):
+        raise pd.errors.ParserError('ilegível')
+
+    monkeypatch.setattr(pd, 'read_csv', falha)
+    with pytest.raises(ValueError, match='Não foi possível ler o extrato'):
+        load_csv(io.BytesIO(_extrato(PREAMBULO + DADOS)))
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cubo import gastos_por, montar_cubo
+from src.indice_temporal import IndiceTemporal, _maximo_na_tabela, _tabela_esparsa, ordenar_por_data
+from src.metricas import nucleo_metricas
+
+
+def _janelas(df, quantidade, semente=0):
+    """Janelas aleatórias de datas (algumas fora do extrato ou de um dia só)"""
+    rng = np.random.default_rng(semente)
+    dias = pd.date_range(df['data'].min() - pd.Timedelta(days=5), df['data'].max() + pd.Timedelta(days=5))
+    janelas = [(None, None), (dias[0], dias[3]), (dias[10], dias[10])]
+    for _ in range(quantidade):
+        inicio, fim = np.sort(rng.choice(len(dias), 2))
+        janelas.append((dias[inicio], dias[fim]))
+    return janelas
+
+
+def _recorte(df, inicio, fim):
+    dentro = np.ones(len(df), dtype=bool)
+    if inicio is not None:
+        dentro &= (df['data'] >= inicio).to_numpy()
+    if fim is not None:
+        dentro &= (df['data'] <= fim).to_numpy()
+    return df[dentro]
+
+
+@pytest.mark.parametrize('nome', ['extrato', 'extrato_simples'])
+def test_nucleo_igual_ao_recalculo(nome, request):
+    df = request.getfixturevalue(nome)
+    indice = IndiceTemporal(df)
+    for inicio, fim in _janelas(df, 60):
+        recorte = _recorte(df, inicio, fim)
+        assert indice.nucleo(inicio, fim) == pytest.approx(nucleo_metricas(recorte)), (inicio, fim)
+
+
+def test_somas_iguais_ao_recalculo(extrato):
+    indice = IndiceTemporal(extrato)
+    for inicio, fim in _janelas(extrato, 20, semente=1):
+        recorte = _recorte(extrato, inicio, fim)
+        somas = indice.somas(inicio, fim)
+        valores = recorte['valor_centavos']
+        assert somas['gastos'] == -valores[valores < 0].sum() / 100
+        assert somas['entradas'] == valores[valores > 0].sum() / 100
+        assert (somas['n_gastos'], somas['n_entradas'], somas['transacoes']) == (
+            (valores < 0).sum(), (valores > 0).sum(), len(recorte),
+        )
+
+        por_categoria = indice.somas_por_categoria(inicio, fim)
+        if recorte.empty:
+            assert por_categoria.empty
+            continue
+        esperado = gastos_por(montar_cubo(recorte), 'categoria')
+        np.testing.assert_allclose(por_categoria['gastos'][esperado.index].to_numpy(), esperado.to_numpy())
+        assert por_categoria['transacoes'].sum() == len(recorte)
+
+
+def test_tabela_esparsa_igual_ao_maximo_direto():
+    rng = np.random.default_rng(3)
+    valores = rng.integers(0, 10_000, 1_000)
+    niveis = _tabela_esparsa(valores)
+    for _ in range(500):
+        i, j = np.sort(rng.choice(len(valores) + 1, 2, replace=False))
+        assert _maximo_na_tabela(niveis, i, j) == valores[i:j].max()
+
+
+def test_maior_gasto_nas_pontas_e_no_meio():
+    # Um gasto grande em cada posição relevante para os blocos de BLOCO_MAXIMO
+    datas = pd.date_range('2024-01-01', periods=1_000, freq='h').floor('D')
+    for posicao in (0, 63, 64, 500, 959, 999):
+        valores = np.full(1_000, -100, dtype=np.int64)
+        valores[posicao] = -99_999
+        indice = IndiceTemporal(pd.DataFrame({'data': datas, 'valor': valores / 100, 'valor_centavos': valores}))
+        for i, j in [(0, 1_000), (posicao, posicao + 1), (max(posicao - 70, 0), min(posicao + 70, 1_000))]:
+            assert indice._maior_gasto(i, j) == -valores[i:j].min()
+        assert indice._maior_gasto(posicao + 1, min(posicao + 200, 1_000)) in (0, 100)
+
+
+def test_exige_ordem_por_data(extrato_simples):
+    with pytest.raises(ValueError, match='ordenado por data'):
+        IndiceTemporal(extrato_simples.iloc[::-1])
+    assert ordenar_por_data(extrato_simples) is extrato_simples
@@ -0,0 +1,55 @@
+import io
+
+import pandas as pd
+import pytest
+
+from src.data_loader import load_csv, load_csv_em_blocos
+from src.pipeline import LIMIAR_STREAMING_BYTES, processar_em_blocos, processar_extrato
+from src.sintetico import escrever_extrato
+
+
+@pytest.fixture(scope='module')
+def extrato_grande(tmp_path_factory):
+    """Extrato sintético acima de LIMIAR_STREAMING_BYTES"""
+    caminho = tmp_path_factory.mktemp('grande') / 'extrato.csv'
+    escrever_extrato(caminho, 360_000, semente=3)
+    assert caminho.stat().st_size > LIMIAR_STREAMING_BYTES
+    return caminho
+
+
+def _sem_atributos(df):
+    df = df.copy()
+    df.attrs = {}
+    return df
+
+
+def test_blocos_iguais_a_leitura_inteira(arquivo_extrato):
+    blocos = list(load_csv_em_blocos(arquivo_extrato, tamanho_bloco=3_000))
+    assert [len(b) for b in blocos[:-1]] == [3_000] * (len(blocos) - 1)
+    inteiro = load_csv(arquivo_extrato)
+    pd.testing.assert_frame_equal(_sem_atributos(pd.concat(blocos, ignore_index=True)), _sem_atributos(inteiro))
+
+
+def test_processamento_em_blocos_igual_ao_inteiro(arquivo_extrato):
+    em_blocos = processar_extrato(arquivo_extrato, tamanho_bloco=3_000)
+    inteiro = processar_extrato(arquivo_extrato, tamanho_bloco=0)
+    assert em_blocos.attrs['leitura']['blocos'] == -(-len(inteiro) // 3_000)
+    assert em_blocos.attrs['categorizacao']['linhas'] == len(inteiro)
+    pd.testing.assert_frame_equal(_sem_atributos(em_blocos), _sem_atributos(inteiro))
+
+
+def test_upload_em_blocos(arquivo_extrato):
+    upload = io.BytesIO(arquivo_extrato.read_bytes())
+    pd.testing.assert_frame_equal(
+        _sem_atributos(processar_em_blocos(upload, 5_000)),
+        _sem_atributos(processar_em_blocos(arquivo_extrato, 5_000)),
+    )
+
+
+def test_arquivo_grande_vai_por_streaming(extrato_grande):
+    automatico = processar_extrato(extrato_grande)
+    assert automatico.attrs['leitura']['blocos'] > 1
+
+    inteiro = processar_extrato(extrato_grande, tamanho_bloco=0)
+    assert 'blocos' not in inteiro.attrs['leitura']
+    pd.testing.assert_frame_equal(_sem_atributos(automatico), _sem_atributos(inteiro))
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing import converter_valor_monetario, converter_valores_monetarios
+
+# (texto, valor esperado) para cada formato aceito por converter_valor_monetario
+FORMATOS = [
+    ('1.234,56', 1234.56),          # brasileiro com milhar
+    ('40,00', 40.0),                # brasileiro sem milhar
+    ('-40,00', -40.0),
+    ('+5,10', 5.1),
+    ('0,01', 0.01),
+    ('1,234.56', 1234.56),          # americano com milhar
+    ('545.76', 545.76),             # americano sem milhar
+    ('-40.00', -40.0),
+    ('1.234.567', 1234567.0),       # só pontos de milhar
+    ('1,234,567', 1234567.0),       # só vírgulas de milhar
+    ('1.234.567,89', 1234567.89),   # misto, vírgula decimal
+    ('1,234,567.89', 1234567.89),   # misto, ponto decimal
+    ('-1.234.567,89', -1234567.89),
+    (' 1 234,56 ', 1234.56),        # espaços no meio e nas pontas
+    ('1234', 1234.0),
+    ('.5', 0.5),
+    ('5,', 5.0),
+    ('1e3', 1000.0),                # notação científica (caminho de strings)
+    ('12345678901234567,89', 12345678901234567.89),  # mais de 15 dígitos
+    ('\u00a01.234,56', 1234.56),  # espaço não separável
+]
+
+# Textos que não são valores: viram NaN e entram no relatório de erros
+INVALIDOS = ['abc', 'R$ 10,00', '1,2,3.4.5', '--5', '5-', '1.2.3,4,5']
+
+
+@pytest.mark.parametrize('texto, esperado', FORMATOS)
+def test_formato_escalar(texto, esperado):
+    assert converter_valor_monetario(texto) == pytest.approx(esperado, rel=1e-15)
+
+
+@pytest.mark.parametrize('texto, esperado', FORMATOS)
+def test_formato_vetorizado_igual_ao_escalar(texto, esperado):
+    convertido, erros = converter_valores_monetarios(pd.Series([texto], dtype=object))
+    assert convertido.iat[0] == converter_valor_monetario(texto)
+    assert erros.empty
+
+
+@pytest.mark.parametrize('texto, esperado', FORMATOS)
+def test_formato_em_centavos(texto, esperado):
+    convertido, _ = converter_valores_monetarios(pd.Series([texto], dtype=object), centavos=True)
+    assert convertido.dtype == 'Int64'
+    assert convertido.iat[0] == round(converter_valor_monetario(texto) * 100)
+
+
+def test_coluna_mista_igual_ao_escalar():
+    textos = [t for t, _ in FORMATOS] * 3 + INVALIDOS + [None, np.nan, '']
+    serie = pd.Series(textos, index=np.arange(len(textos)) * 10, dtype=object)
+    convertido, _ = converter_valores_monetarios(serie)
+    esperado = serie.apply(converter_valor_monetario)
+    pd.testing.assert_series_equal(convertido, esperado, check_dtype=False)
+
+
+def test_relatorio_de_erros():
+    serie = pd.Series(['10,00'] + INVALIDOS + ['abc'], index=np.arange(len(INVALIDOS) + 2) + 100, dtype=object)
+    convertido, erros = converter_valores_monetarios(serie, coluna='valor')
+
+    assert convertido.iloc[1:].isna().all()
+    assert list(erros.columns) == ['coluna', 'linha', 'valor_original', 'valor_normalizado']
+    assert (erros['coluna'] == 'valor').all()
+    # Uma linha do relatório por linha do extrato, mesmo repetindo o valor
+    assert sorted(erros['linha']) == list(serie.index[1:])
+    assert set(erros['valor_original']) == set(INVALIDOS)
+
+
+def test_vazios_nao_sao_erro():
+    convertido, erros = converter_valores_monetarios(pd.Series([None, np.nan, '1,00'], dtype=object))
+    assert convertido.isna().tolist() == [True, True, False]
+    assert erros.empty
+
+
+def test_coluna_numerica():
+    serie = pd.Series([1.5, -2.25, np.nan])
+    convertido, _ = converter_valores_monetarios(serie)
+    pd.testing.assert_series_equal(convertido, serie)
+    em_centavos, _ = converter_valores_monetarios(serie, centavos=True)
+    assert em_centavos.tolist() == [150, -225, pd.NA]
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('5,930.04', 5930.04), ('-1,234.56', -1234.56), ('1,234.5', 1234.5), ('12,345.678', 12345.678),
+])
+def test_milhar_americano(texto, esperado):
+    # Uma vírgula antes do ponto é separador de milhar, não decimal
+    assert converter_valor_monetario(texto) == esperado
+    convertido, erros = converter_valores_monetarios(pd.Series([texto, texto], dtype=object))
+    assert convertido.tolist() == [esperado, esperado]
+    assert erros.empty
+    em_centavos, _ = converter_valores_monetarios(pd.Series([texto], dtype=object), centavos=True)
+    assert em_centavos.iat[0] == round(esperado * 100)
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from src.cubo import montar_cubo
+from src.previsao import COLUNAS, HORIZONTE_MAXIMO, MINIMO_MESES, mes_incompleto, prever_mensal, series_mensais
+
+
+def _verificar_formato(previsao, df, horizonte, ultimo_mes):
+    """Uma linha por (série, mês) dos `horizonte` meses após `ultimo_mes`, intervalo em volta da previsão"""
+    series = series_mensais(montar_cubo(df))
+    series = series[series.loc[:, :ultimo_mes].to_numpy().any(axis=1)]
+
+    assert list(previsao.columns) == COLUNAS
+    assert len(previsao) == len(series) * horizonte
+    assert list(previsao.groupby(['tipo', 'serie'], sort=False).size()) == [horizonte] * len(series)
+    assert set(zip(previsao['tipo'], previsao['serie'])) == set(series.index)
+
+    meses = [str(pd.Period(ultimo_mes, freq='M') + p) for p in range(1, horizonte + 1)]
+    for _, grupo in previsao.groupby(['tipo', 'serie'], sort=False):
+        assert grupo['mes_ano'].tolist() == meses
+
+    assert previsao[['previsto', 'inferior', 'superior']].notna().all().all()
+    assert (previsao['inferior'] >= 0).all()
+    assert (previsao['inferior'] <= previsao['previsto']).all()
+    assert (previsao['previsto'] <= previsao['superior']).all()
+
+
+@pytest.mark.parametrize('horizonte', [1, 6, HORIZONTE_MAXIMO])
+def test_formato_sazonal(extrato, horizonte):
+    # Três anos de histórico: ajuste com sazonalidade anual
+    previsao = prever_mensal(extrato, horizonte)
+    _verificar_formato(previsao, extrato, horizonte, '2024-12')
+
+
+@pytest.mark.parametrize('horizonte', [1, 6])
+def test_formato_sem_sazonalidade(extrato_simples, horizonte):
+    ultimo_ano = extrato_simples[extrato_simples['data'] >= '2024-01-01']
+    previsao = prever_mensal(ultimo_ano, horizonte)
+    _verificar_formato(previsao, ultimo_ano, horizonte, '2024-12')
+
+
+def test_mes_incompleto_fica_de_fora(extrato_simples):
+    ate_meio_do_mes = extrato_simples[extrato_simples['data'] <= '2024-10-15']
+    previsao = prever_mensal(ate_meio_do_mes, 3)
+    _verificar_formato(previsao, ate_meio_do_mes, 3, '2024-09')
+    assert previsao['mes_ano'].iloc[0] == '2024-10'
+
+
+def test_mes_incompleto(extrato_simples):
+    assert mes_incompleto(extrato_simples) is None
+    assert mes_incompleto(extrato_simples[extrato_simples['data'] <= '2024-10-15']) == '2024-10'
+    assert mes_incompleto(extrato_simples[extrato_simples['data'] <= '2024-02-29']) is None
+    assert mes_incompleto(extrato_simples.head(0)) is None
+
+
+def test_sem_categoria(extrato_simples):
+    previsao = prever_mensal(extrato_simples.drop(columns='categoria'), 4)
+    assert set(previsao['serie']) == {'Total'}
+    assert len(previsao) == 2 * 4
+
+
+def test_com_cubo_igual_sem_cubo(extrato):
+    pd.testing.assert_frame_equal(prever_mensal(extrato, 6), prever_mensal(extrato, 6, cubo=montar_cubo(extrato)))
+
+
+def test_historico_curto(extrato_simples):
+    inicio = extrato_simples['data'].max() - pd.DateOffset(months=MINIMO_MESES - 1)
+    curto = extrato_simples[extrato_simples['data'] > inicio]
+    previsao = prever_mensal(curto, 6)
+    assert previsao.empty
+    assert list(previsao.columns) == COLUNAS
+
+
+@pytest.mark.parametrize('horizonte', [0, HORIZONTE_MAXIMO + 1])
+def test_horizonte_invalido(extrato, horizonte):
+    with pytest.raises(ValueError):
+        prever_mensal(extrato, horizonte)
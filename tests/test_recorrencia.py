@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.recorrencia import COLUNAS, detectar_recorrencias, normalizar_descricoes
+from src.sintetico import RECORRENTES
+
+
+def _extrato(linhas):
+    """Extrato mínimo a partir de (data, descrição, valor)"""
+    datas, descricoes, valores = zip(*linhas)
+    return pd.DataFrame({'data': pd.to_datetime(datas), 'descricao': descricoes, 'valor': valores})
+
+
+def _mensais(descricao, valor, meses, dia=10, ano=2024):
+    return [(f'{ano}-{mes:02d}-{dia:02d}', descricao, valor) for mes in meses]
+
+
+@pytest.mark.parametrize('nome', ['extrato', 'extrato_simples'])
+def test_acha_as_assinaturas_do_gerador(request, nome):
+    df = request.getfixturevalue(nome)
+    recorrentes = detectar_recorrencias(df)
+    assert list(recorrentes.columns) == COLUNAS
+
+    # Só gastos: o salário recorrente fica de fora
+    esperadas = {descricao: -valor / 100 for _, descricao, _, valor in RECORRENTES if valor < 0}
+    assert set(recorrentes['descricao']) == set(esperadas)
+    assert (recorrentes['periodicidade'] == 'mensal').all()
+    assert recorrentes['ativa'].all()
+    for linha in recorrentes.itertuples():
+        assert linha.valor_medio == pytest.approx(esperadas[linha.descricao])
+        assert linha.variacao_valor == pytest.approx(0, abs=1e-6)
+    assert recorrentes['total_gasto'].is_monotonic_decreasing
+
+
+def test_linha_aponta_a_ultima_cobranca(extrato):
+    recorrentes = detectar_recorrencias(extrato)
+    ultimas = extrato.iloc[recorrentes['linha']]
+    np.testing.assert_array_equal(ultimas['descricao'].astype(object), recorrentes['descricao'])
+    np.testing.assert_array_equal(ultimas['data'].to_numpy(), recorrentes['ultima_data'].to_numpy())
+    for linha in recorrentes.itertuples():
+        mesmas = extrato[extrato['descricao'] == linha.descricao]
+        assert mesmas['data'].max() == linha.ultima_data
+
+
+def test_normalizacao_junta_parcelas_e_numeros():
+    descricoes = pd.Series(['NETFLIX 05/03', 'Netflix  12/04/2024', 'Curso parcela 3/12', 'Curso PARC 4 DE 12', '1234'])
+    assert normalizar_descricoes(descricoes).tolist() == ['netflix', 'netflix', 'curso', 'curso', '1234']
+
+    df = _extrato([
+        (f'2024-{mes:02d}-07', f'NETFLIX.COM {mes:02d}/{mes + 1:02d} PEDIDO {mes * 997}', -55.90)
+        for mes in range(1, 7)
+    ])
+    recorrentes = detectar_recorrencias(df)
+    assert len(recorrentes) == 1
+    assert recorrentes.loc[0, 'frequencia'] == 6
+    # Descrição da cobrança mais recente
+    assert recorrentes.loc[0, 'descricao'] == df['descricao'].iloc[-1]
+
+
+def test_periodicidades_e_proxima_cobranca():
+    semanal = [(str(d.date()), 'Feira', -80.0) for d in pd.date_range('2024-10-04', '2024-12-27', freq='7D')]
+    anual = [('2022-03-01', 'Seguro auto', -2_400.0), ('2023-03-01', 'Seguro auto', -2_400.0),
+             ('2024-03-01', 'Seguro auto', -2_400.0)]
+    # Parou em setembro: continua recorrente, mas não está mais ativa
+    cancelada = _mensais('Academia', -99.9, range(1, 10), dia=15)
+    df = _extrato(semanal + anual + _mensais('Aluguel', -1_800.0, range(1, 13)) + cancelada)
+
+    recorrentes = detectar_recorrencias(df).set_index('descricao')
+    assert recorrentes['periodicidade'].to_dict() == {
+        'Aluguel': 'mensal', 'Seguro auto': 'anual', 'Feira': 'semanal', 'Academia': 'mensal',
+    }
+    assert recorrentes.loc['Aluguel', 'proxima_data'] == pd.Timestamp('2025-01-10')
+    assert recorrentes.loc['Feira', 'proxima_data'] == pd.Timestamp('2025-01-03')
+    assert recorrentes.loc['Seguro auto', 'proxima_data'] == pd.Timestamp('2025-03-01')
+    assert recorrentes['ativa'].to_dict() == {
+        'Aluguel': True, 'Seguro auto': True, 'Feira': True, 'Academia': False,
+    }
+
+
+def test_rejeita_irregulares_e_valores_variaveis():
+    irregular = [(data, 'Padaria', -15.0) for data in ['2024-01-03', '2024-01-09', '2024-03-20', '2024-03-22']]
+    variavel = [(f'2024-{mes:02d}-05', 'Mercado', -valor) for mes, valor in zip(range(1, 7), [90, 400, 35, 610, 150, 20])]
+    # Duas cobranças (anuais) só contam se o valor praticamente se repete
+    duas = [('2023-06-10', 'IPVA', -1_200.0), ('2024-06-10', 'IPVA', -1_200.0),
+            ('2023-08-01', 'Anuidade', -300.0), ('2024-08-01', 'Anuidade', -340.0)]
+    df = _extrato(irregular + variavel + duas)
+    assert detectar_recorrencias(df)['descricao'].tolist() == ['IPVA']
+    assert detectar_recorrencias(df, min_frequencia=3).empty
+
+
+def test_preco_fixo_no_meio_de_compras_avulsas():
+    rng = np.random.default_rng(5)
+    dias = pd.date_range('2024-01-01', '2024-06-30')
+    avulsas = [(str(d.date()), 'Amazon Marketplace', -float(v)) for d, v in zip(dias[::3], rng.integers(20, 900, 61))]
+    assinatura = _mensais('Amazon Marketplace', -19.9, range(1, 7), dia=14)
+    recorrentes = detectar_recorrencias(_extrato(avulsas + assinatura))
+    assert len(recorrentes) == 1
+    assert recorrentes.loc[0, 'valor_medio'] == pytest.approx(19.9)
+    assert recorrentes.loc[0, 'frequencia'] == 6
+
+
+def test_sem_gastos():
+    df = _extrato(_mensais('Salario', 5_000.0, range(1, 13)))
+    recorrentes = detectar_recorrencias(df)
+    assert recorrentes.empty
+    assert list(recorrentes.columns) == COLUNAS
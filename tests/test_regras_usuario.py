@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.categorizacao import categorizar_unicas
+from src.regras_usuario import IndiceTokens, RegrasUsuario, recategorizar
+
+DESCRICOES = [
+    'IFOOD *RESTAURANTE', 'Padaria Pao Quente', 'PADARIA PAO QUENTE', 'Academia Bluefit', 'Maria Silva',
+    'Posto Shell Asa Sul', 'Mercado Livre', 'pao de queijo', 'Uber *trip', 'Farmacia Pague Menos', '',
+    'Pao Quente Asa Norte',
+]
+
+
+@pytest.fixture
+def regras(tmp_path):
+    return RegrasUsuario(tmp_path / 'regras.json')
+
+
+def _categorizado(descricoes, regras):
+    """Extrato categorizado do zero, como no upload"""
+    df = pd.DataFrame({'descricao': descricoes})
+    df['categoria'] = regras.categorizar(df['descricao'], categorizar_unicas(df['descricao'], memo=None))
+    return df
+
+
+def test_precedencia_das_regras(regras):
+    regras.adicionar('pao', 'Padaria')
+    regras.adicionar('quente', 'Calor')
+    regras.adicionar('PADARIA PAO QUENTE ', 'Exata', tipo='descricao')
+    regras.adicionar('ifood', 'Delivery', prioridade=-1)
+    categorias = _categorizado(DESCRICOES, regras)['categoria'].tolist()
+    # Descrição exata vence as palavras quando vem depois delas
+    assert categorias[1:3] == ['Exata', 'Exata']
+    # Empate de prioridade: vence a regra mais recente
+    assert categorias[11] == 'Calor'
+    assert categorias[7] == 'Padaria'
+    # Prioridade menor que a padrão ainda vem antes das regras fixas
+    assert categorias[0] == 'Delivery'
+    assert categorias[3] == 'Serviços'
+
+
+def test_regra_invalida(regras):
+    with pytest.raises(ValueError):
+        regras.adicionar('  ', 'Lazer')
+    with pytest.raises(ValueError):
+        regras.adicionar('cinema', 'Lazer', tipo='regex')
+    with pytest.raises(KeyError):
+        regras.remover(42)
+    assert len(regras) == 0
+
+
+def test_regras_de_outra_sessao_nao_se_perdem(tmp_path):
+    uma = RegrasUsuario(tmp_path / 'regras.json')
+    outra = RegrasUsuario(tmp_path / 'regras.json')
+    primeira = uma.adicionar('pao', 'Padaria')
+    segunda = outra.adicionar('uber', 'Carro')
+    assert primeira['id'] != segunda['id']
+    assert [r['texto'] for r in RegrasUsuario(tmp_path / 'regras.json').regras] == ['pao', 'uber']
+    # A sessão que gravou por último já releu a regra da outra
+    assert outra.alteradas_fora() == ['pao']
+    assert outra.alteradas_fora() == []
+
+
+def test_indice_igual_a_busca_direta(extrato_simples):
+    descricoes = pd.Series(DESCRICOES + extrato_simples['descricao'].tolist()[:3_000], dtype=object)
+    indice = IndiceTokens(descricoes)
+    normalizadas = descricoes.str.lower().str.strip()
+    for texto in ['pao', 'p', 'ue', 'padaria pao', 'aria qu', 'shell sul', 'ifood *rest', 'zzz', 'uber', 'ltda', '*']:
+        palavras = normalizadas.str.split()
+        esperado = np.flatnonzero([
+            all(any(parte in p for p in ps) for parte in texto.split()) for ps in palavras
+        ])
+        assert indice.candidatas(texto).tolist() == esperado.tolist(), texto
+
+
+def test_recategorizar_igual_ao_recalculo(regras, extrato_simples):
+    descricoes = pd.Series(DESCRICOES * 3 + extrato_simples['descricao'].tolist()[:2_000], dtype=object)
+    df = _categorizado(descricoes, regras)
+    indice = IndiceTokens(df['descricao'])
+
+    regra = regras.adicionar('pao', 'Padaria')
+    assert len(recategorizar(df, regras, indice, [regra['texto']])) > 0
+    pd.testing.assert_frame_equal(df, _categorizado(descricoes, regras))
+
+    antiga, nova = regras.editar(regra['id'], texto='shell')
+    recategorizar(df, regras, indice, [antiga['texto'], nova['texto']])
+    pd.testing.assert_frame_equal(df, _categorizado(descricoes, regras))
+
+    regras.remover(regra['id'])
+    recategorizar(df, regras, indice, ['shell'])
+    pd.testing.assert_frame_equal(df, _categorizado(descricoes, regras))
+
+
+def test_recategorizar_inclui_regras_de_outra_sessao(tmp_path):
+    descricoes = pd.Series(DESCRICOES * 2, dtype=object)
+    esta = RegrasUsuario(tmp_path / 'regras.json')
+    outra = RegrasUsuario(tmp_path / 'regras.json')
+    df = _categorizado(descricoes, esta)
+    df['categoria'] = df['categoria'].astype('category')
+    indice = IndiceTokens(df['descricao'])
+
+    editada = outra.adicionar('bluefit', 'Ginástica')
+    outra.adicionar('mercado livre', 'Marketplace', tipo='descricao')
+    outra.editar(editada['id'], texto='shell')
+    regra = esta.adicionar('pao', 'Padaria')
+    recategorizar(df, esta, indice, [regra['texto']])
+
+    esperado = _categorizado(descricoes, RegrasUsuario(tmp_path / 'regras.json'))
+    assert df['categoria'].astype(object).tolist() == esperado['categoria'].tolist()
+    assert set(df['categoria']) >= {'Padaria', 'Ginástica', 'Marketplace'}
@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_csv
+from src.preprocessing import preprocess
+from src.sintetico import BLOCO_GERACAO, RECORRENTES, escrever_extrato, formatar_centavos
+
+
+def _texto(linhas, **kwargs):
+    destino = io.StringIO()
+    escritas = escrever_extrato(destino, linhas, **kwargs)
+    return destino.getvalue(), escritas
+
+
+@pytest.fixture(scope='module')
+def dois_blocos():
+    """Extrato que passa de um bloco de geração, já pelo preprocess (na ordem do arquivo)"""
+    texto, _ = _texto(BLOCO_GERACAO + 20_000, semente=5, dias=400)
+    return preprocess(load_csv(io.BytesIO(texto.encode('utf-8'))), centavos=True)
+
+
+def test_mesma_semente_mesmo_arquivo():
+    primeiro, escritas = _texto(3_000, semente=11)
+    segundo, _ = _texto(3_000, semente=11)
+    outro, _ = _texto(3_000, semente=12)
+    assert primeiro == segundo
+    assert primeiro != outro
+    assert len(primeiro.splitlines()) == 6 + escritas
+
+
+def test_escrever_em_arquivo_igual_ao_texto(tmp_path):
+    texto, escritas = _texto(2_000, semente=3)
+    assert escrever_extrato(tmp_path / 'extrato.csv', 2_000, semente=3) == escritas
+    assert (tmp_path / 'extrato.csv').read_text(encoding='utf-8') == texto
+
+
+def test_formatar_centavos():
+    centavos = np.array([123456, -123456, 5, -100, 100000000])
+    assert formatar_centavos(centavos, np.array([0, 1, 2, 3, 0])) == [
+        '1.234,56', '-1234,56', '0.05', '-1.00', '1.000.000,00',
+    ]
+
+
+def test_saldo_corrente_consistente(dois_blocos):
+    saldo = dois_blocos['saldo_centavos'].to_numpy(dtype=np.int64)
+    valor = dois_blocos['valor_centavos'].to_numpy(dtype=np.int64)
+    # Do mais recente para o mais antigo: o saldo anterior é este menos o valor
+    assert (saldo[1:] == saldo[:-1] - valor[:-1]).all()
+    assert saldo[0] == 500_000
+
+
+def test_datas_e_recorrentes(dois_blocos):
+    datas = dois_blocos['data']
+    assert datas.is_monotonic_decreasing
+    assert datas.iloc[0] == pd.Timestamp('2024-12-31')
+    assert datas.iloc[-1] >= pd.Timestamp('2024-12-31') - pd.Timedelta(days=400)
+
+    meses = datas.dt.to_period('M').nunique()
+    for _, descricao, dia, valor in RECORRENTES:
+        cobrancas = dois_blocos[dois_blocos['descricao'] == descricao]
+        assert meses - 1 <= len(cobrancas) <= meses
+        assert (cobrancas['data'].dt.day == dia).all()
+        assert (cobrancas['valor_centavos'] == valor).all()